@@ -1,16 +1,33 @@
-from fastapi import APIRouter, UploadFile, File, Request
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, UploadFile, File, Query, Request, WebSocket
+from app.core.metrics import TimedJSONResponse
+from app.core.registry import registry
 from app.services.audio_service import AudioService
-from app.schemas.audio_schema import AudioResponse, AudioUploadResponse
-from typing import Dict, Any
+from app.services.audio_stream import stream_manager
+from app.utils.upload import read_base64_field, read_upload
+from app.schemas.audio_schema import AudioBatchResponse, AudioResponse, AudioUploadResponse
+from typing import Dict, Any, List, Optional
 
 router = APIRouter()
-audio_service = AudioService()
+
+
+def load_audio_service() -> AudioService:
+    service = AudioService()
+    service._load_model(warmup=False)
+    return service
+
+
+# AudioService (model + scaler + encoder) is loaded by the model registry
+registry.register("audio", load_audio_service, warmup=AudioService.warmup)
+
+
+async def get_audio_service() -> AudioService:
+    return await registry.get("audio")
 
 
 @router.post("/upload", response_model=AudioUploadResponse)
 async def upload_audio(file: UploadFile = File(...)):
     """Upload an audio file"""
+    audio_service = await get_audio_service()
     result = await audio_service.process_audio(file)
     return result
 
@@ -18,8 +35,69 @@ async def upload_audio(file: UploadFile = File(...)):
 @router.post("/predict")
 async def predict_audio(file: UploadFile = File(...)) -> Dict[str, Any]:
     """Predict emotion from uploaded audio file"""
+    audio_service = await get_audio_service()
     result = await audio_service.predict(file)
-    return JSONResponse(content=result)
+    return TimedJSONResponse(content=result)
+
+
+@router.post("/predict-batch", response_model=AudioBatchResponse)
+async def predict_audio_batch(files: List[UploadFile] = File(...)) -> Dict[str, Any]:
+    """
+    Predict emotions for many audio clips in one request (offline scoring).
+
+    Clips are decoded and featurized in parallel, scaled with one scaler call
+    and scored in a single batched forward pass. Results come back in upload
+    order; a clip that cannot be decoded gets an "error" field instead of
+    failing the whole batch. At most AUDIO_BATCH_MAX_FILES files per request.
+    """
+    audio_service = await get_audio_service()
+    clips = [(file.filename, await read_upload(file)) for file in files]
+    results = await audio_service.predict_batch(clips)
+    failed = sum(1 for result in results if "error" in result)
+    return TimedJSONResponse(content={"results": results, "total": len(results), "failed": failed})
+
+
+@router.post("/timeline")
+async def predict_audio_timeline(
+    file: UploadFile = File(...),
+    hop: Optional[float] = Query(None, gt=0.05, le=60.0, description="Seconds between window starts")
+) -> Dict[str, Any]:
+    """
+    Emotion timeline of a long recording.
+
+    The whole file is analyzed in overlapping 2.5 s windows every `hop`
+    seconds (default AUDIO_TIMELINE_HOP_SECONDS), decoded in blocks so memory
+    does not grow with the file length. Returns `windows` (start, end,
+    emotion, confidence, all_emotions), a `summary` (dominant emotion,
+    counts, mean probabilities, changes) and throughput in audio-seconds per
+    wall-second.
+    """
+    audio_service = await get_audio_service()
+    result = await audio_service.predict_timeline(file, hop)
+    return TimedJSONResponse(content=result)
+
+
+@router.websocket("/stream")
+async def audio_stream(websocket: WebSocket):
+    """
+    Realtime microphone stream: send raw PCM chunks, receive emotion updates.
+
+    Binary messages are mono float32 little-endian PCM at 22050 Hz, or another
+    format / rate / hop after sending {"type": "config", "format": "s16",
+    "sample_rate": 48000, "hop": 0.5}. Every 2.5 s window (one every hop
+    seconds) is answered with {"type": "result", "window_id", "start", "end",
+    "emotion", "confidence", "all_emotions", "latency_ms", "inference_ms",
+    "windows_dropped"}; latency_ms runs from the arrival of the window's last
+    sample. Send {"type": "flush"} at the end of an utterance and
+    {"type": "stats"} for this connection's latency / memory.
+    """
+    await stream_manager.serve(websocket, await get_audio_service())
+
+
+@router.get("/stream/stats")
+async def stream_stats() -> Dict[str, Any]:
+    """Open /audio/stream connections with per-connection latency percentiles and memory"""
+    return TimedJSONResponse(content=stream_manager.stats())
 
 
 @router.post("/predict-base64")
@@ -27,20 +105,14 @@ async def predict_audio_base64(request: Request) -> Dict[str, Any]:
     """Predict emotion from base64-encoded audio in JSON body.
 
     JSON body should be: { "audio_base64": "data:audio/wav;base64,..." }
+    The body is decoded while it streams in (no JSON string / base64 text
+    copies); the decoded audio is capped at MAX_UPLOAD_SIZE (413).
     """
     try:
-        data = await request.json()
-        audio_b64 = data.get("audio_base64", "")
-        if not audio_b64:
-            return JSONResponse(status_code=400, content={"detail": "Missing audio_base64 field"})
-
-        # remove data:...;base64, prefix if present
-        b64_data = audio_b64.split(",", 1)[1] if "," in audio_b64 else audio_b64
-        import base64
-
-        audio_bytes = base64.b64decode(b64_data)
+        audio_bytes = await read_base64_field(request, "audio_base64")
+    except ValueError as e:
+        return TimedJSONResponse(status_code=400, content={"detail": str(e)})
 
-        result = await audio_service.predict(audio_bytes)
-        return JSONResponse(content=result)
-    except Exception as e:
-        return JSONResponse(status_code=400, content={"detail": str(e)})
+    audio_service = await get_audio_service()
+    result = await audio_service.predict(audio_bytes)
+    return TimedJSONResponse(content=result)
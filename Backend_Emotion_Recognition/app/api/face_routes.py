@@ -1,23 +1,24 @@
-from fastapi import APIRouter, UploadFile, File, Query
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, UploadFile, File, Query, WebSocket
+from app.core.metrics import TimedJSONResponse
+from app.core.registry import registry
+from app.core.result_writer import get_result_writer
 from app.services.face_service import FaceService
-from app.schemas.face_schema import FaceDetectResponse
-from typing import Dict, Any, List
+from app.services.face_stream import stream_manager
+from app.schemas.face_schema import FaceAnalyzeResponse, FaceDetectResponse
+from typing import Dict, Any, List, Optional
 
 router = APIRouter()
-# Lazily create FaceService to avoid heavy model load at import/startup
-face_service = None
+# FaceService is loaded and warmed up by the model registry (at startup unless MODEL_LOADING=lazy)
+registry.register("face", lambda: FaceService(warmup=False), warmup=FaceService.warmup)
 
-def get_face_service() -> FaceService:
-    global face_service
-    if face_service is None:
-        face_service = FaceService()
-    return face_service
+async def get_face_service() -> FaceService:
+    return await registry.get("face")
 
 @router.post("/detect", response_model=FaceDetectResponse)
 async def detect_faces(
     file: UploadFile = File(...),
-    include_cropped: bool = Query(False, description="Include base64 encoded cropped faces in response")
+    include_cropped: bool = Query(False, description="Include base64 encoded cropped faces in response"),
+    profile: Optional[str] = Query(None, description="Detection profile: fast, balanced or accurate (default from settings)")
 ) -> Dict[str, Any]:
     """
     Detect all faces in uploaded image.
@@ -28,6 +29,7 @@ async def detect_faces(
     Parameters:
     - file: Image file to detect faces in
     - include_cropped: If True, include base64 encoded cropped faces in response
+    - profile: Detection profile ("fast", "balanced", "accurate")
     
     Returns:
     - faces: List of detected faces with locations
@@ -35,15 +37,44 @@ async def detect_faces(
     - image_width: Width of original image
     - image_height: Height of original image
     """
-    svc = get_face_service()
-    result = await svc.detect_faces(file, include_cropped_base64=include_cropped)
-    return JSONResponse(content=result)
+    svc = await get_face_service()
+    result = await svc.detect_faces(file, include_cropped_base64=include_cropped, profile=profile)
+    return TimedJSONResponse(content=result)
+
+@router.post("/analyze", response_model=FaceAnalyzeResponse)
+async def analyze_faces(
+    file: UploadFile = File(...),
+    profile: Optional[str] = Query(None, description="Detection profile: fast, balanced or accurate (default from settings)")
+) -> Dict[str, Any]:
+    """
+    Detect all faces and predict their emotions in one request.
+
+    Equivalent to /face/detect?include_cropped=true followed by
+    /face/predict-batch with the crops, without the JPEG/base64 round trip:
+    the frame is decoded once and all faces share one batched prediction.
+
+    Parameters:
+    - file: Image file (e.g. a webcam frame)
+    - profile: Detection profile ("fast", "balanced", "accurate")
+
+    Returns:
+    - faces: List of faces, each with face_id, location, emotion, confidence and all_emotions
+    - total_faces: Number of faces detected
+    - image_width: Width of original image
+    - image_height: Height of original image
+    """
+    svc = await get_face_service()
+    result = await svc.analyze_faces(file, profile=profile)
+    return TimedJSONResponse(content=result)
 
 @router.post("/predict")
 async def predict_emotion(
     file: UploadFile = File(...), 
     skip_save: bool = Query(False, description="Skip saving result image"),
-    is_cropped_face: bool = Query(False, description="If True, treat input as already cropped face")
+    is_cropped_face: bool = Query(False, description="If True, treat input as already cropped face"),
+    profile: Optional[str] = Query(None, description="Detection profile: fast, balanced or accurate (default from settings)"),
+    result_format: Optional[str] = Query(None, pattern="^(jpeg|webp)$", description="Result image format: jpeg or webp (default from settings)"),
+    result_quality: Optional[int] = Query(None, ge=1, le=100, description="Result image encoder quality (default from settings)")
 ) -> Dict[str, Any]:
     """
     Predict emotion from face image.
@@ -58,24 +89,31 @@ async def predict_emotion(
     - file: Image file to analyze (full image or cropped face)
     - skip_save: If True, skip saving result image (for realtime mode)
     - is_cropped_face: If True, treat input as already cropped face
+    - profile: Detection profile ("fast", "balanced", "accurate"), ignored for cropped faces
+    - result_format / result_quality: Encoding of the result image ("jpeg" or "webp", 1-100)
 
     Returns:
     - emotion: Predicted emotion
     - confidence: Confidence score (0..1)
     - face_location: Bounding box coordinates (only if is_cropped_face=False)
     - all_emotions: Probability scores for all emotions
-    - result_image: Path to the result image (only if skip_save=False and is_cropped_face=False)
+    - result_url: URL of the result image under /static/results, written in the background
+      (only if skip_save=False and is_cropped_face=False, and not dropped under load)
+    - result_image: Server path of the result image
     """
-    svc = get_face_service()
+    svc = await get_face_service()
     
     if is_cropped_face:
         # Analyze cropped face directly
         result = await svc.predict_emotion_from_cropped_face(file)
-        return JSONResponse(content=result)
+        return TimedJSONResponse(content=result)
     else:
         # Legacy mode: detect and predict
-        result = await svc.predict_emotion(file, skip_save=skip_save)
-        return JSONResponse(content=result)
+        result = await svc.predict_emotion(
+            file, skip_save=skip_save, profile=profile,
+            result_format=result_format, result_quality=result_quality
+        )
+        return TimedJSONResponse(content=result)
 
 @router.post("/predict-batch")
 async def predict_emotion_batch(
@@ -97,6 +135,52 @@ async def predict_emotion_batch(
         - confidence: Confidence score (0..1)
         - all_emotions: Probability scores for all emotions
     """
-    svc = get_face_service()
+    svc = await get_face_service()
     results = await svc.predict_emotion_batch(files)
-    return JSONResponse(content={"results": results})
+    return TimedJSONResponse(content={"results": results})
+
+
+@router.get("/batch-stats")
+async def batch_stats() -> Dict[str, Any]:
+    """
+    Micro-batching metrics for face emotion inference.
+
+    Returns the batch-size distribution, queue wait and batch run time
+    percentiles, used to tune FACE_BATCH_MAX_SIZE / FACE_BATCH_MAX_WAIT_MS
+    against p99 latency.
+    """
+    svc = await get_face_service()
+    return TimedJSONResponse(content=svc.batch_stats())
+
+
+@router.get("/result-stats")
+async def result_stats() -> Dict[str, Any]:
+    """
+    Background result-image writer: submitted / written / coalesced / dropped
+    counts, pending queue, and queue wait, render and write time percentiles.
+    """
+    return TimedJSONResponse(content=get_result_writer().stats())
+
+
+
+@router.websocket("/stream")
+async def face_stream(websocket: WebSocket):
+    """
+    Realtime webcam stream: send frames, receive face boxes + emotions.
+
+    Binary messages are JPEG/PNG frames, or raw 8-bit grayscale buffers after
+    sending {"type": "config", "format": "gray", "width": W, "height": H}.
+    Each processed frame is answered with {"type": "result", "frame_id", "faces",
+    "total_faces", "image_width", "image_height", "lag_ms", "frames_dropped"}.
+    When inference falls behind, stale frames are dropped and only the newest
+    one is analyzed. Send {"type": "stats"} for this connection's fps / lag.
+    """
+    await stream_manager.serve(websocket, await get_face_service())
+
+
+@router.get("/stream/stats")
+async def stream_stats() -> Dict[str, Any]:
+    """
+    Per-connection fps, lag and dropped-frame counters for open /face/stream sockets.
+    """
+    return TimedJSONResponse(content=stream_manager.stats())
@@ -0,0 +1,233 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from app.core.logger import setup_logger
+from app.core.metrics import summarize_durations
+
+logger = setup_logger(__name__)
+
+
+class BatchMetrics:
+    """Batch-size distribution and queue-wait statistics for a MicroBatcher."""
+
+    def __init__(self, window: int = 2048):
+        self.batches = 0
+        self.items = 0
+        self.errors = 0
+        self.item_retries = 0
+        self.rejected = 0
+        self.batch_sizes: Dict[int, int] = {}
+        self._queue_waits = deque(maxlen=window)
+        self._run_times = deque(maxlen=window)
+
+    def record_batch(self, size: int, queue_waits: List[float], run_time: float):
+        self.batches += 1
+        self.items += size
+        self.batch_sizes[size] = self.batch_sizes.get(size, 0) + 1
+        self._queue_waits.extend(queue_waits)
+        self._run_times.append(run_time)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "errors": self.errors,
+            "item_retries": self.item_retries,
+            "rejected": self.rejected,
+            "mean_batch_size": (self.items / self.batches) if self.batches else 0.0,
+            "batch_sizes": {str(k): v for k, v in sorted(self.batch_sizes.items())},
+            "queue_wait": summarize_durations(self._queue_waits),
+            "batch_run_time": summarize_durations(self._run_times),
+        }
+
+
+class MicroBatcher:
+    """Coalesce single-item inference calls from concurrent requests into batches.
+
+    Callers ``await submit(item)``; items are collected until either
+    ``max_batch_size`` items are queued or ``max_wait_ms`` has elapsed since the
+    first item of the batch arrived. ``batch_fn`` is then called once with the
+    list of items, on ``executor`` (an InferenceExecutor, so batches count
+    against its admission limit like any other inference call), and must
+    return one result per item, in order. Each caller gets its own result
+    back through a future.
+
+    At most ``max_queue`` items wait for a batch: a request that does not fit
+    is rejected at once with 503 + Retry-After (a request larger than the
+    bound is still admitted into an empty queue). When a batch fails, its
+    items are retried one by one, so a bad input only fails its own caller;
+    an executor rejection (503) is passed on to every caller of the batch.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        executor,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        max_queue: int = 256,
+        name: str = "batcher",
+    ):
+        self.batch_fn = batch_fn
+        self.executor = executor
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.max_queue = max(1, int(max_queue))
+        self.name = name
+        self.metrics = BatchMetrics()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------ #
+    # Public API
+    # ------------------------------------------------------------------ #
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its result."""
+        return (await self.submit_many([item]))[0]
+
+    async def submit_many(self, items: List[Any]) -> List[Any]:
+        """Queue several items (they may be split across batches) and gather results in order.
+
+        All items are admitted or none: raises HTTPException 503 when the queue
+        has no room for them.
+        """
+        if not items:
+            return []
+        loop = self._ensure_worker()
+        self._admit(len(items))
+        queued_at = time.perf_counter()
+        futures = []
+        for item in items:
+            future = loop.create_future()
+            self._queue.put_nowait((item, future, queued_at))
+            futures.append(future)
+        return list(await asyncio.gather(*futures))
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self.metrics.snapshot()
+        snapshot.update({
+            "name": self.name,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "max_queue": self.max_queue,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+        })
+        return snapshot
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+        self._queue = None
+        self._loop = None
+
+    # ------------------------------------------------------------------ #
+    # Internals
+    # ------------------------------------------------------------------ #
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            # (Re)bind to the running loop; a new loop (e.g. app restart in tests)
+            # cannot reuse a queue created on the previous one.
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+        return loop
+
+    def _admit(self, count: int):
+        depth = self._queue.qsize()
+        if depth and depth + count > self.max_queue:
+            self.metrics.rejected += 1
+            logger.warning(f"{self.name} batch queue full ({depth} waiting), rejecting {count} items")
+            raise HTTPException(
+                status_code=503,
+                detail=f"{self.name} inference is busy, please retry later",
+                headers={"Retry-After": str(self.executor.retry_after)},
+            )
+
+    async def _collect(self) -> list:
+        """Wait for the first item, then fill the batch until it is full or the window closes."""
+        queue = self._queue
+        batch = [await queue.get()]
+        deadline = self._loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not queue.empty():
+                batch.append(queue.get_nowait())
+                continue
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            # Drop callers that went away (client disconnect) before running the batch
+            batch = [entry for entry in batch if not entry[1].done()]
+            if not batch:
+                continue
+
+            items = [entry[0] for entry in batch]
+            started = time.perf_counter()
+            waits = [started - entry[2] for entry in batch]
+            try:
+                results = await self._run_batch(items)
+            except HTTPException as e:
+                # Executor saturated: every caller gets the 503
+                self._fail(batch, e)
+                continue
+            except Exception as e:
+                self.metrics.errors += 1
+                logger.error(f"Error running {self.name} batch of {len(items)}: {e}")
+                if len(batch) == 1:
+                    self._fail(batch, e)
+                    continue
+                # One after another: concurrent retries would compete for executor slots
+                for entry in batch:
+                    await self._run_single(entry)
+                continue
+
+            self.metrics.record_batch(len(items), waits, time.perf_counter() - started)
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def _run_batch(self, items: list) -> list:
+        results = await self.executor.run(self.batch_fn, items)
+        if len(results) != len(items):
+            raise RuntimeError(f"{self.name}: batch_fn returned {len(results)} results for {len(items)} items")
+        return results
+
+    async def _run_single(self, entry: tuple):
+        """Retry one item of a failed batch on its own; only its caller sees a failure."""
+        item, future, _ = entry
+        if future.done():
+            return
+        self.metrics.item_retries += 1
+        try:
+            result = (await self._run_batch([item]))[0]
+        except Exception as e:
+            self._fail([entry], e)
+            return
+        if not future.done():
+            future.set_result(result)
+
+    @staticmethod
+    def _fail(batch: list, error: Exception):
+        for _, future, _ in batch:
+            if not future.done():
+                future.set_exception(error)
@@ -0,0 +1,255 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def model_fingerprint(*parts) -> str:
+    """Short version string for cache keys: changes when any model file (size/mtime) or part changes.
+
+    ``parts`` may be paths (fingerprinted by name, size and mtime when the file
+    exists) or plain values such as the backend kind and precision.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for part in parts:
+        if isinstance(part, Path):
+            try:
+                stat = part.stat()
+                part = f"{part.name}:{stat.st_size}:{stat.st_mtime_ns}"
+            except OSError:
+                part = f"{part.name}:missing"
+        digest.update(str(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def make_key(namespace: str, data: bytes, version: str, **options) -> str:
+    """Cache key from the raw upload bytes, the model version and the request options."""
+    content = hashlib.blake2b(data, digest_size=16).hexdigest()
+    opts = json.dumps(options, sort_keys=True, default=str, separators=(",", ":"))
+    return f"{namespace}:{version}:{content}:{hashlib.blake2b(opts.encode(), digest_size=8).hexdigest()}"
+
+
+class _DiskTier:
+    """SQLite key/value store so cached results survive restarts (bounded by entry count)."""
+
+    def __init__(self, path: Path, max_entries: int):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max(1, int(max_entries))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS predictions ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS predictions_accessed ON predictions (accessed_at)")
+        self._writes = 0
+
+    def get(self, key: str, now: float) -> Optional[tuple]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM predictions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM predictions WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE predictions SET accessed_at = ? WHERE key = ?", (now, key))
+            return row
+
+    def set(self, key: str, value: str, expires_at: float, now: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO predictions (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, now),
+            )
+            self._writes += 1
+            # Trim occasionally rather than on every write
+            if self._writes % 256 == 0:
+                self._trim(now)
+
+    def _trim(self, now: float):
+        self._conn.execute("DELETE FROM predictions WHERE expires_at <= ?", (now,))
+        self._conn.execute(
+            "DELETE FROM predictions WHERE key IN ("
+            "SELECT key FROM predictions ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def clear(self, prefix: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM predictions WHERE key LIKE ?", (f"{prefix}%",))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class PredictionCache:
+    """In-memory LRU + TTL cache of JSON-serializable prediction results.
+
+    Values are stored as JSON strings, so memory use is bounded by
+    ``max_bytes`` (and ``max_entries``) and every ``get`` returns a fresh copy
+    that callers may mutate. Entries older than ``ttl`` seconds are treated as
+    misses. When ``disk_path`` is set, results are also written to a SQLite
+    file shared by all caches; memory misses fall back to it and disk hits are
+    promoted back into memory.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 2048,
+        max_bytes: int = 32 * 1024 * 1024,
+        ttl: float = 3600.0,
+        disk_path: Optional[Path] = None,
+        disk_max_entries: int = 100_000,
+    ):
+        self.name = name
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(1, int(max_bytes))
+        self.ttl = float(ttl)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, json)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._disk = None
+        if disk_path:
+            try:
+                self._disk = _DiskTier(disk_path, disk_max_entries)
+            except sqlite3.Error as e:
+                logger.warning(f"Prediction cache '{name}': disk tier disabled ({e})")
+
+    def _store(self, key: str, expires_at: float, value: str):
+        """Insert into memory and evict least recently used entries over budget (lock held)."""
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= len(old[1])
+        if len(value) > self.max_bytes:
+            return
+        self._entries[key] = (expires_at, value)
+        self.bytes += len(value)
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.bytes -= len(evicted)
+            self.evictions += 1
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return json.loads(entry[1])
+                del self._entries[key]
+                self.bytes -= len(entry[1])
+                self.expirations += 1
+
+        if self._disk is not None:
+            try:
+                row = self._disk.get(key, now)
+            except sqlite3.Error as e:
+                logger.warning(f"Prediction cache '{self.name}': disk read failed ({e})")
+                row = None
+            if row is not None:
+                value, expires_at = row
+                with self._lock:
+                    self._store(key, expires_at, value)
+                    self.hits += 1
+                    self.disk_hits += 1
+                return json.loads(value)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: Any):
+        now = time.time()
+        expires_at = now + self.ttl
+        serialized = json.dumps(value, separators=(",", ":"))
+        with self._lock:
+            self._store(key, expires_at, serialized)
+        if self._disk is not None:
+            try:
+                self._disk.set(key, serialized, expires_at, now)
+            except sqlite3.Error as e:
+                logger.warning(f"Prediction cache '{self.name}': disk write failed ({e})")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+        if self._disk is not None:
+            self._disk.clear(f"{self.name}.")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "disk_tier": self._disk is not None,
+        }
+
+    def close(self):
+        if self._disk is not None:
+            self._disk.close()
+            self._disk = None
+
+
+_caches: Dict[str, PredictionCache] = {}
+
+
+def get_cache(subsystem: str) -> Optional[PredictionCache]:
+    """Return the shared prediction cache for a subsystem, or None when caching is disabled."""
+    if not settings.PREDICTION_CACHE_ENABLED:
+        return None
+    cache = _caches.get(subsystem)
+    if cache is None:
+        cache = PredictionCache(
+            name=subsystem,
+            max_entries=settings.PREDICTION_CACHE_MAX_ENTRIES,
+            max_bytes=settings.PREDICTION_CACHE_MAX_BYTES,
+            ttl=settings.PREDICTION_CACHE_TTL_SECONDS,
+            disk_path=settings.PREDICTION_CACHE_DISK_PATH,
+            disk_max_entries=settings.PREDICTION_CACHE_DISK_MAX_ENTRIES,
+        )
+        _caches[subsystem] = cache
+    return cache
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+
+def close_caches():
+    for cache in _caches.values():
+        cache.close()
+    _caches.clear()
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from pathlib import Path
+from typing import Optional
 
 class Settings(BaseSettings):
     # App settings
@@ -15,10 +16,22 @@ class Settings(BaseSettings):
     # Model paths
     FACE_MODEL_PATH: Path = MODEL_DIR / "faces/face_emotion_model.keras"
     AUDIO_MODEL_PATH: Path = MODEL_DIR / "audio/best_model1_weights.h5"
+    FACE_ONNX_PATH: Path = MODEL_DIR / "faces/face_emotion_model.onnx"
+    FACE_TFLITE_PATH: Path = MODEL_DIR / "faces/face_emotion_model.tflite"
+    AUDIO_ONNX_PATH: Path = MODEL_DIR / "audio/CNN_model.onnx"
+    AUDIO_TFLITE_PATH: Path = MODEL_DIR / "audio/CNN_model.tflite"
     # FUSION_MODEL_PATH: Path = MODEL_DIR / "fusion_model.pth"
     
     # API settings
-    MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
+    MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB per file
+    # Request bodies are cut off at this size while they stream in (413), before
+    # multipart parsing spools them; longer path prefixes below override it
+    MAX_REQUEST_SIZE: int = 16 * 1024 * 1024  # one file + multipart / base64 overhead
+    REQUEST_SIZE_LIMITS: dict = {
+        "/face/predict-batch": 128 * 1024 * 1024,
+        "/audio/predict-batch": 512 * 1024 * 1024,
+        "/audio/timeline": 1024 * 1024 * 1024,  # long recordings are decoded from the spooled file
+    }
     ALLOWED_IMAGE_TYPES: list = ["image/jpeg", "image/png"]
     ALLOWED_AUDIO_TYPES: list = [
         "audio/wav",
@@ -31,6 +44,153 @@ class Settings(BaseSettings):
         "audio/mp3",
     ]
 
+    # Model loading: "eager" loads and warms up every model at startup (in
+    # parallel) before serving; "lazy" loads each model on first use (dev)
+    MODEL_LOADING: str = "eager"
+    # After a failed load, requests get 503 + Retry-After for this long before
+    # the next attempt; doubles with every consecutive failure up to the max
+    MODEL_RETRY_BACKOFF_SECONDS: float = 5.0
+    MODEL_RETRY_BACKOFF_MAX_SECONDS: float = 300.0
+    # Subsystems this process serves ("face", "audio"). A face-only worker
+    # never imports the audio stack (librosa) and vice versa
+    SERVICE_ROLES: list = ["face", "audio"]
+    # Production runner (python -m app.runner): upstream timeout of the dispatcher
+    DISPATCHER_TIMEOUT_SECONDS: float = 60.0
+
+    # Micro-batching settings (face emotion inference)
+    FACE_BATCHING_ENABLED: bool = True
+    FACE_BATCH_MAX_SIZE: int = 32
+    FACE_BATCH_MAX_WAIT_MS: float = 5.0
+    # Faces waiting for a batch; a request that does not fit gets 503 + Retry-After
+    FACE_BATCH_MAX_QUEUE: int = 256
+
+    # Face detector backend: "haar" (OpenCV cascade, bundled), "yunet"
+    # (cv2.FaceDetectorYN ONNX model) or "ssd" (cv2.dnn res10 300x300 Caffe model)
+    FACE_DETECTOR_BACKEND: str = "haar"
+    FACE_YUNET_MODEL_PATH: Path = MODEL_DIR / "faces/face_detection_yunet_2023mar.onnx"
+    FACE_SSD_PROTOTXT_PATH: Path = MODEL_DIR / "faces/deploy.prototxt"
+    FACE_SSD_MODEL_PATH: Path = MODEL_DIR / "faces/res10_300x300_ssd_iter_140000.caffemodel"
+    FACE_DNN_SCORE_THRESHOLD: float = 0.6
+
+    # Face detection resolution policy: detect on a copy downscaled so its longest
+    # side is at most FACE_DETECTION_MAX_SIDE px (0 = full resolution), map boxes
+    # back to the original image; emotion crops keep at least model-input resolution.
+    FACE_DETECTION_MAX_SIDE: int = 640
+    # Decode planner for uploads: grayscale unless the detector needs colour, and
+    # JPEGs at 1/2, 1/4 or 1/8 scale in the DCT domain (IMREAD_REDUCED_*) while
+    # the longest side stays >= the profile's max side. A face under 48 px in the
+    # reduced image is cropped from a full-resolution decode; colour artefacts
+    # (result image, cropped_face_base64) are decoded at full size on demand.
+    FACE_DECODE_REDUCED: bool = True
+    # Detector parameters per profile (min_size in original-image pixels; an
+    # optional max_side overrides FACE_DETECTION_MAX_SIDE; scale_factor and
+    # min_neighbors are Haar-only, an optional score_threshold is DNN-only).
+    # Selectable per request.
+    FACE_DETECTION_PROFILE: str = "balanced"
+    FACE_DETECTION_PROFILES: dict = {
+        "fast": {"scale_factor": 1.2, "min_neighbors": 4, "min_size": 40, "max_side": 480},
+        "balanced": {"scale_factor": 1.1, "min_neighbors": 5, "min_size": 30},
+        "accurate": {"scale_factor": 1.05, "min_neighbors": 6, "min_size": 30, "max_side": 1280},
+    }
+
+    # WebSocket /face/stream settings
+    FACE_STREAM_MAX_CONNECTIONS: int = 64
+    FACE_STREAM_MAX_FRAME_BYTES: int = 2 * 1024 * 1024
+
+    # Face tracking for streams: full detection every N frames (or after a lost
+    # track), ROI-restricted detection in between, EMA-smoothed emotions per track
+    FACE_STREAM_TRACKING: bool = True
+    FACE_TRACK_DETECT_EVERY: int = 10
+    FACE_TRACK_ROI_MARGIN: float = 0.5
+    FACE_TRACK_IOU_THRESHOLD: float = 0.3
+    FACE_TRACK_MAX_MISSED: int = 2
+    FACE_TRACK_SMOOTHING: float = 0.6
+
+    # Prediction result cache, keyed by a hash of the upload bytes + model version
+    # + request options. Optional SQLite tier (e.g. BASE_DIR / "cache" / "predictions.sqlite3")
+    # keeps results across restarts.
+    PREDICTION_CACHE_ENABLED: bool = True
+    PREDICTION_CACHE_MAX_ENTRIES: int = 2048
+    PREDICTION_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    PREDICTION_CACHE_TTL_SECONDS: float = 3600.0
+    PREDICTION_CACHE_DISK_PATH: Optional[Path] = None
+    PREDICTION_CACHE_DISK_MAX_ENTRIES: int = 100_000
+
+    # Result images (/face/predict) are rendered and written by a background
+    # writer and named after their content; the response only carries the URL.
+    # Beyond MAX_PENDING queued images (or MAX_PENDING_BYTES of held uploads)
+    # new ones are dropped and the response has no result_url.
+    RESULT_IMAGE_FORMAT: str = "jpeg"  # "jpeg" or "webp"
+    RESULT_IMAGE_QUALITY: int = 90
+    RESULT_WRITER_MAX_PENDING: int = 32
+    RESULT_WRITER_MAX_PENDING_BYTES: int = 128 * 1024 * 1024
+
+    # Storage janitor: uploads (audio role) and result images (face role) are
+    # indexed in memory (size, time) and evicted oldest first once older than the
+    # TTL or while the directory is over its byte quota (0 disables either limit).
+    # The index is built by an incremental background scan at startup, repeated
+    # every RESCAN interval (0 = never) for files written by other workers.
+    # Dotfiles, *.tmp files (writes in progress) and names matching a pattern
+    # in STORAGE_EXCLUDE (files shipped in the repo) are never evicted.
+    STORAGE_JANITOR_ENABLED: bool = True
+    STORAGE_EXCLUDE: list = ["result_upload.jpg"]
+    UPLOAD_TTL_SECONDS: float = 24 * 3600.0
+    UPLOAD_MAX_BYTES: int = 1024 * 1024 * 1024
+    RESULTS_TTL_SECONDS: float = 24 * 3600.0
+    RESULTS_MAX_BYTES: int = 1024 * 1024 * 1024
+    STORAGE_SWEEP_INTERVAL_SECONDS: float = 60.0
+    STORAGE_RESCAN_INTERVAL_SECONDS: float = 6 * 3600.0
+    STORAGE_SCAN_BATCH: int = 1000
+
+    # Metrics: per-stage latency histograms, counters and in-flight gauges served
+    # as Prometheus text on /metrics (percentiles over the last METRICS_WINDOW
+    # values per series on /stage-stats) and per-response Server-Timing headers
+    METRICS_ENABLED: bool = True
+    METRICS_SERVER_TIMING: bool = True
+    METRICS_WINDOW: int = 2048
+
+    # Inference executor settings ("thread" or "process" pool per subsystem).
+    # Requests beyond WORKERS + MAX_QUEUE are rejected with 503 + Retry-After.
+    FACE_EXECUTOR_KIND: str = "thread"
+    FACE_EXECUTOR_WORKERS: int = 4
+    FACE_EXECUTOR_MAX_QUEUE: int = 32
+    AUDIO_EXECUTOR_KIND: str = "thread"
+    AUDIO_EXECUTOR_WORKERS: int = 2
+    AUDIO_EXECUTOR_MAX_QUEUE: int = 8
+    # Feature extraction of /audio/predict-batch: one task per worker per request
+    AUDIO_BATCH_EXECUTOR_KIND: str = "process"
+    AUDIO_BATCH_EXECUTOR_WORKERS: int = 4
+    AUDIO_BATCH_EXECUTOR_MAX_QUEUE: int = 8
+    AUDIO_BATCH_MAX_FILES: int = 256
+    # WebSocket /audio/stream: raw PCM in, an emotion per 2.5 s window every HOP
+    # seconds out (hop rounded to a multiple of 512 samples so windows share STFT frames)
+    AUDIO_STREAM_MAX_CONNECTIONS: int = 32
+    AUDIO_STREAM_HOP_SECONDS: float = 0.5
+    AUDIO_STREAM_MAX_CHUNK_BYTES: int = 256 * 1024
+    AUDIO_STREAM_MAX_PENDING: int = 4  # windows waiting for inference; oldest dropped beyond this
+    # soxr resampler for uploads not at 22050 Hz: soxr_vhq / soxr_hq (librosa's
+    # default, used in training) / soxr_mq / soxr_lq / soxr_qq (fastest)
+    AUDIO_RESAMPLER: str = "soxr_hq"
+    # /audio/timeline: 2.5 s windows every HOP seconds over the whole recording
+    AUDIO_TIMELINE_HOP_SECONDS: float = 1.0
+    AUDIO_TIMELINE_BATCH_SIZE: int = 32  # windows per forward pass
+    AUDIO_TIMELINE_BLOCK_SECONDS: float = 10.0  # decode granularity
+    AUDIO_TIMELINE_MAX_SECONDS: float = 3 * 3600
+    EXECUTOR_RETRY_AFTER_SECONDS: int = 1
+
+    # Inference backend settings:
+    # "graph" = traced tf.function, "keras" = model.predict,
+    # "onnx" / "tflite" = exported models (python -m app.models.export), no TensorFlow needed
+    INFERENCE_BACKEND: str = "graph"
+    INFERENCE_BATCH_BUCKETS: list = [1, 8, 32]
+    INFERENCE_WARMUP: bool = True
+    INFERENCE_NUM_THREADS: int = 0  # 0 = runtime default (onnx / tflite)
+
+    # Per-model precision: "float32" (as trained) or a quantized TFLite variant
+    # exported with `python -m app.models.export --quantize ...`: "dynamic", "float16", "int8"
+    FACE_MODEL_PRECISION: str = "float32"
+    AUDIO_MODEL_PRECISION: str = "float32"
+
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,158 @@
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def _picklable(value):
+    # memoryviews (app.utils.upload) can't be pickled: ship their bytes to the worker
+    if isinstance(value, memoryview):
+        return value.tobytes()
+    if isinstance(value, list):
+        return [_picklable(item) for item in value]
+    if isinstance(value, tuple):
+        return tuple(_picklable(item) for item in value)
+    return value
+
+
+class InferenceExecutor:
+    """Bounded executor that keeps blocking decode/inference work off the event loop.
+
+    Every call is admitted against a fixed capacity (``max_workers`` running plus
+    ``max_queue`` waiting). When the executor is saturated the call is rejected
+    immediately with ``503 Service Unavailable`` and a ``Retry-After`` header,
+    instead of queueing without bound and stalling every other client.
+
+    ``run`` always uses threads and is meant for work that touches in-process
+    state such as loaded models (OpenCV, NumPy and TensorFlow release the GIL).
+    ``run_cpu`` uses a process pool when ``kind="process"``; the callable and its
+    arguments must then be picklable (module-level functions, bytes, arrays).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        kind: str = "thread",
+        max_workers: int = 2,
+        max_queue: int = 16,
+        retry_after: int = 1,
+    ):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unsupported executor kind: {kind}")
+        self.name = name
+        self.kind = kind
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue = max(0, int(max_queue))
+        self.retry_after = retry_after
+
+        self.thread_pool = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix=f"{name}-infer"
+        )
+        self._process_pool = None
+
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        if self._process_pool is None:
+            # spawn, not fork: forking a process that already runs TensorFlow / BLAS
+            # threads can deadlock the child (the app imports cheaply, see SERVICE_ROLES)
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._process_pool
+
+    def _admit(self):
+        if self.in_flight >= self.capacity:
+            self.rejected += 1
+            logger.warning(f"{self.name} executor saturated ({self.in_flight} in flight), rejecting request")
+            raise HTTPException(
+                status_code=503,
+                detail=f"{self.name} inference is busy, please retry later",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+        self.in_flight += 1
+
+    async def _submit(self, pool, fn: Callable, *args, **kwargs) -> Any:
+        self._admit()
+        try:
+            loop = asyncio.get_running_loop()
+            call = functools.partial(fn, *args, **kwargs)
+            if pool is self.thread_pool:
+                # Threads see the caller's context (request stage timings, app.core.metrics)
+                call = functools.partial(contextvars.copy_context().run, call)
+            return await loop.run_in_executor(pool, call)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run ``fn`` on the thread pool."""
+        return await self._submit(self.thread_pool, fn, *args, **kwargs)
+
+    async def run_cpu(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run pure CPU-bound ``fn`` on the process pool (or threads for ``kind="thread"``)."""
+        if self.kind == "process":
+            args = _picklable(args)
+            return await self._submit(self._get_process_pool(), fn, *args, **kwargs)
+        return await self._submit(self.thread_pool, fn, *args, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self, wait: bool = False):
+        self.thread_pool.shutdown(wait=wait, cancel_futures=True)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=wait, cancel_futures=True)
+            self._process_pool = None
+
+
+_executors: Dict[str, InferenceExecutor] = {}
+
+
+def get_executor(subsystem: str) -> InferenceExecutor:
+    """Return the shared executor for a subsystem ("face" or "audio"), configured from settings."""
+    executor = _executors.get(subsystem)
+    if executor is None:
+        prefix = subsystem.upper()
+        executor = InferenceExecutor(
+            name=subsystem,
+            kind=getattr(settings, f"{prefix}_EXECUTOR_KIND"),
+            max_workers=getattr(settings, f"{prefix}_EXECUTOR_WORKERS"),
+            max_queue=getattr(settings, f"{prefix}_EXECUTOR_MAX_QUEUE"),
+            retry_after=settings.EXECUTOR_RETRY_AFTER_SECONDS,
+        )
+        _executors[subsystem] = executor
+    return executor
+
+
+def executor_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: executor.stats() for name, executor in _executors.items()}
+
+
+def shutdown_executors():
+    for executor in _executors.values():
+        executor.shutdown()
+    _executors.clear()
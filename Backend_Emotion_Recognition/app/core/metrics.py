@@ -0,0 +1,398 @@
+import bisect
+import contextvars
+import functools
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi.responses import JSONResponse
+
+from app.core.config import settings
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Histogram bucket upper bounds: seconds for durations, counts for faces per image
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 4, 5, 8, 10, 20, 50)
+
+METRIC_PREFIX = "emotion_"
+
+
+def summarize_values(values) -> Dict[str, float]:
+    """p50 / p95 / p99 / max of raw values, e.g. counts (zeros when empty)."""
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    arr = np.fromiter(values, dtype=np.float64)
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99), "max": float(arr.max())}
+
+
+def summarize_durations(values) -> Dict[str, float]:
+    """p50 / p95 / p99 / max in milliseconds of durations given in seconds (zeros when empty)."""
+    return {f"{key}_ms": value * 1000.0 for key, value in summarize_values(values).items()}
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus) plus a window of recent values for percentiles."""
+
+    __slots__ = ("buckets", "counts", "sum", "count", "recent")
+
+    def __init__(self, buckets: tuple, window: int):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot: +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.recent.append(value)
+
+
+def _summarize_histogram(is_duration: bool, recent: list, count: int, total: float) -> Dict[str, float]:
+    """Durations (seconds) in milliseconds with ``_ms`` keys; other histograms (counts) unscaled."""
+    mean = total / count if count else 0.0
+    if is_duration:
+        return {"count": count, "mean_ms": mean * 1000.0, **summarize_durations(recent)}
+    return {"count": count, "mean": mean, **summarize_values(recent)}
+
+
+def _labels_key(labels: Dict[str, Any]) -> tuple:
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def _format_labels(key: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """Process-wide counters, gauges and histograms, rendered in the Prometheus text format.
+
+    Metrics are created on first use (``inc`` / ``add`` / ``observe`` with a
+    name and labels); ``describe`` attaches help text. Stats that other
+    components already keep (executors, caches, ...) are exported through
+    collectors: callables returning ``(name, type, help, labels, value)``
+    samples, run only when /metrics is scraped.
+    """
+
+    def __init__(self, window: int = 2048):
+        self.window = window
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[tuple, float]] = {}
+        self._gauges: Dict[str, Dict[tuple, float]] = {}
+        self._histograms: Dict[str, Dict[tuple, Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self._buckets: Dict[str, tuple] = {}
+        self._collectors: List[Callable[[], list]] = []
+
+    def describe(self, name: str, help_text: str, buckets: tuple = None):
+        self._help[name] = help_text
+        if buckets is not None:
+            self._buckets[name] = buckets
+
+    def register_collector(self, collector: Callable[[], list]):
+        self._collectors.append(collector)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _labels_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def add(self, name: str, value: float, **labels):
+        """Move a gauge up or down (in-flight counts)."""
+        key = _labels_key(labels)
+        with self._lock:
+            series = self._gauges.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = _labels_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self._buckets.get(name, DURATION_BUCKETS), self.window)
+            histogram.observe(value)
+
+    def summary(self) -> Dict[str, Any]:
+        """Percentiles (recent window) and totals per histogram series, plus counters and gauges."""
+        with self._lock:
+            histograms = {
+                name: {
+                    _series_name(key): (h.buckets is DURATION_BUCKETS, list(h.recent), h.count, h.sum)
+                    for key, h in series.items()
+                }
+                for name, series in self._histograms.items()
+            }
+            counters = {name: {_series_name(k): v for k, v in series.items()} for name, series in self._counters.items()}
+            gauges = {name: {_series_name(k): v for k, v in series.items()} for name, series in self._gauges.items()}
+        return {
+            "histograms": {
+                name: {
+                    label: _summarize_histogram(is_duration, recent, count, total)
+                    for label, (is_duration, recent, count, total) in series.items()
+                }
+                for name, series in histograms.items()
+            },
+            "counters": counters,
+            "gauges": gauges,
+        }
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (0.0.4)."""
+        lines: List[str] = []
+
+        def header(name: str, kind: str, help_text: str = None):
+            full = METRIC_PREFIX + name
+            lines.append(f"# HELP {full} {help_text or self._help.get(name, name.replace('_', ' '))}")
+            lines.append(f"# TYPE {full} {kind}")
+            return full
+
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                full = header(name, "counter")
+                lines.extend(f"{full}{_format_labels(key)} {_format_value(v)}" for key, v in series.items())
+            for name, series in sorted(self._gauges.items()):
+                full = header(name, "gauge")
+                lines.extend(f"{full}{_format_labels(key)} {_format_value(v)}" for key, v in series.items())
+            for name, series in sorted(self._histograms.items()):
+                full = header(name, "histogram")
+                for key, histogram in series.items():
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                        cumulative += count
+                        le = 'le="' + _format_value(float(bound)) + '"'
+                        lines.append(f"{full}_bucket{_format_labels(key, le)} {cumulative}")
+                    lines.append(f"{full}_sum{_format_labels(key)} {_format_value(histogram.sum)}")
+                    lines.append(f"{full}_count{_format_labels(key)} {histogram.count}")
+
+        collected: Dict[str, Tuple[str, str, list]] = {}
+        for collector in self._collectors:
+            try:
+                samples = collector()
+            except Exception as e:
+                logger.warning(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+                continue
+            for name, kind, help_text, labels, value in samples:
+                if value is None:
+                    continue
+                collected.setdefault(name, (kind, help_text, []))[2].append((_labels_key(labels), value))
+        for name, (kind, help_text, samples) in sorted(collected.items()):
+            full = header(name, kind, help_text)
+            lines.extend(f"{full}{_format_labels(key)} {_format_value(value)}" for key, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+def _series_name(key: tuple) -> str:
+    return ",".join(f"{name}={value}" for name, value in key) or "total"
+
+
+metrics = MetricsRegistry(settings.METRICS_WINDOW)
+metrics.describe("stage_duration_seconds", "Time spent per request processing stage")
+metrics.describe("stage_errors_total", "Stages that ended with an exception")
+metrics.describe("stage_in_flight", "Stages currently running")
+metrics.describe("http_request_duration_seconds", "HTTP request latency until the response is complete")
+metrics.describe("http_requests_total", "HTTP requests by route, method and status")
+metrics.describe("http_requests_in_flight", "HTTP requests being handled")
+metrics.describe("faces_per_image", "Faces detected per image", buckets=COUNT_BUCKETS)
+metrics.describe("faces_detected_total", "Faces detected in uploaded images")
+
+# Stage timings of the current request, for its Server-Timing header; executor
+# threads see it because InferenceExecutor runs calls in a copy of the context
+_request_stages: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("request_stages", default=None)
+
+
+class _StageSeries:
+    """The histogram and in-flight slot of one stage, resolved once per stage name."""
+
+    __slots__ = ("name", "key", "histogram", "in_flight")
+
+    def __init__(self, registry: MetricsRegistry, name: str):
+        self.name = name
+        self.key = _labels_key({"stage": name})
+        with registry._lock:
+            histograms = registry._histograms.setdefault("stage_duration_seconds", {})
+            self.histogram = histograms.setdefault(self.key, Histogram(DURATION_BUCKETS, registry.window))
+            self.in_flight = registry._gauges.setdefault("stage_in_flight", {})
+            self.in_flight.setdefault(self.key, 0)
+
+
+_stage_series: Dict[str, _StageSeries] = {}
+
+
+class _StageTimer:
+    __slots__ = ("series", "started")
+
+    def __init__(self, series: _StageSeries):
+        self.series = series
+
+    def __enter__(self):
+        series = self.series
+        with metrics._lock:
+            series.in_flight[series.key] += 1
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        series = self.series
+        with metrics._lock:
+            series.in_flight[series.key] -= 1
+            series.histogram.observe(elapsed)
+        if exc_type is not None:
+            metrics.inc("stage_errors_total", stage=series.name)
+        stages = _request_stages.get()
+        if stages is not None:
+            stages.append((series.name, elapsed))
+        return False
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopTimer()
+
+
+def stage(name: str):
+    """Time a block as a processing stage: ``with stage("face.decode"): ...``.
+
+    The duration goes to the ``stage_duration_seconds{stage=name}`` histogram
+    and, when the block runs for an HTTP request, to its Server-Timing header.
+    Exceptions are counted in ``stage_errors_total`` and re-raised.
+    """
+    if not settings.METRICS_ENABLED:
+        return _NOOP
+    series = _stage_series.get(name)
+    if series is None:
+        series = _stage_series.setdefault(name, _StageSeries(metrics, name))
+    return _StageTimer(series)
+
+
+def timed(name: str):
+    """Decorator form of ``stage``."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def observe_faces(count: int):
+    """Record the number of faces found in one image."""
+    if settings.METRICS_ENABLED:
+        metrics.observe("faces_per_image", count)
+        metrics.inc("faces_detected_total", count)
+
+
+def server_timing(stages: List[Tuple[str, float]], total: float) -> str:
+    """Server-Timing header value: durations (ms) summed per stage name, in first-seen order, then total."""
+    durations: Dict[str, float] = {}
+    for name, elapsed in stages:
+        durations[name] = durations.get(name, 0.0) + elapsed
+    durations["total"] = total
+    return ", ".join(f"{name};dur={elapsed * 1000.0:.1f}" for name, elapsed in durations.items())
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse whose serialization is timed as the ``serialize`` stage."""
+
+    def render(self, content: Any) -> bytes:
+        with stage("serialize"):
+            return super().render(content)
+
+
+class MetricsMiddleware:
+    """Per-request latency, status counts, in-flight gauge and Server-Timing header.
+
+    The stages a request runs (``stage``) are collected in a context variable
+    and sent as ``Server-Timing`` with the response headers, together with
+    ``upload`` (until the request body has been received, i.e. multipart
+    parsing) and ``total`` (until the response starts). Requests are labelled
+    with their route template, so path parameters do not create new series.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._routes: Dict[Any, str] = {}
+
+    def _route(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is not None:
+            route = self._routes.get(endpoint)
+            if route is None:
+                app = scope.get("app")
+                for candidate in getattr(getattr(app, "router", None), "routes", []):
+                    if getattr(candidate, "endpoint", None) is endpoint:
+                        route = candidate.path
+                        break
+                route = self._routes[endpoint] = route or getattr(endpoint, "__name__", "unknown")
+            return route
+        return "/static" if scope["path"].startswith("/static/") else "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        stages: list = []
+        token = _request_stages.set(stages)
+        status = 500
+        received = False
+
+        async def timed_receive():
+            nonlocal received
+            message = await receive()
+            if not received and message["type"] == "http.request" and not message.get("more_body", False):
+                received = True
+                stages.insert(0, ("upload", time.perf_counter() - started))
+            return message
+
+        async def timed_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if settings.METRICS_SERVER_TIMING:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", server_timing(stages, time.perf_counter() - started).encode()))
+                    # Lets cross-origin pages (the frontend) read it through the Performance API
+                    headers.append((b"timing-allow-origin", b"*"))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        metrics.add("http_requests_in_flight", 1)
+        try:
+            await self.app(scope, timed_receive, timed_send)
+        finally:
+            metrics.add("http_requests_in_flight", -1)
+            _request_stages.reset(token)
+            route = self._route(scope)
+            metrics.observe("http_request_duration_seconds", time.perf_counter() - started, route=route)
+            metrics.inc("http_requests_total", route=route, method=scope["method"], status=status)
@@ -0,0 +1,159 @@
+import asyncio
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+@dataclass
+class ModelEntry:
+    name: str
+    factory: Callable[[], Any]
+    warmup: Optional[Callable[[Any], Dict[int, float]]] = None
+    instance: Any = None
+    status: str = "pending"  # pending -> loading -> ready | failed
+    load_seconds: Optional[float] = None
+    warmup_seconds: Optional[float] = None
+    warmup_ms: Dict[str, float] = field(default_factory=dict)
+    error: Optional[str] = None
+    failures: int = 0  # consecutive failed loads
+    retry_at: float = 0.0  # monotonic time before which a failed load is not retried
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def retry_in(self) -> float:
+        """Seconds left in the cooldown after a failed load (0 when a load may be attempted)."""
+        if self.status != "failed":
+            return 0.0
+        return max(0.0, self.retry_at - time.monotonic())
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "warmup_ms": self.warmup_ms,
+            "error": self.error,
+            "failures": self.failures,
+            "retry_in_seconds": round(self.retry_in(), 1),
+        }
+
+
+class ModelRegistry:
+    """Services that own a model, loaded once and shared by all requests.
+
+    Route modules register a factory (and an optional warm-up callable that
+    returns seconds per batch bucket). With MODEL_LOADING="eager" the
+    application lifespan loads every registered model in parallel before the
+    server accepts requests; with "lazy" (dev) each model loads on first use.
+    Loading runs in worker threads, never on the event loop. A failed load
+    is retried on a later request once its cooldown has passed
+    (MODEL_RETRY_BACKOFF_SECONDS, doubling per consecutive failure up to
+    MODEL_RETRY_BACKOFF_MAX_SECONDS); until then requests get 503 with
+    Retry-After at once, without touching the registry lock.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, ModelEntry] = {}
+
+    def register(self, name: str, factory: Callable[[], Any], warmup: Callable[[Any], Dict[int, float]] = None):
+        if name not in self._entries:
+            self._entries[name] = ModelEntry(name, factory, warmup)
+
+    @property
+    def names(self):
+        return list(self._entries)
+
+    def _load(self, entry: ModelEntry):
+        with entry.lock:
+            # Loaded, or failed again while this caller waited for the lock
+            if entry.status == "ready" or entry.retry_in() > 0:
+                return
+            entry.status = "loading"
+            try:
+                started = time.perf_counter()
+                instance = entry.factory()
+                entry.load_seconds = time.perf_counter() - started
+
+                if entry.warmup is not None and settings.INFERENCE_WARMUP:
+                    started = time.perf_counter()
+                    timings = entry.warmup(instance) or {}
+                    entry.warmup_seconds = time.perf_counter() - started
+                    entry.warmup_ms = {str(bucket): t * 1000.0 for bucket, t in timings.items()}
+
+                entry.instance = instance
+                entry.status, entry.error, entry.failures = "ready", None, 0
+                logger.info(
+                    f"Model '{entry.name}' ready: load {entry.load_seconds:.2f}s, "
+                    f"warm-up {entry.warmup_seconds or 0.0:.2f}s"
+                )
+            except Exception as e:
+                entry.failures += 1
+                backoff = min(settings.MODEL_RETRY_BACKOFF_MAX_SECONDS,
+                              settings.MODEL_RETRY_BACKOFF_SECONDS * 2 ** (entry.failures - 1))
+                entry.status, entry.error = "failed", str(e)
+                entry.retry_at = time.monotonic() + backoff
+                logger.error(f"Failed to load model '{entry.name}' (attempt {entry.failures}, "
+                             f"next retry in {backoff:.0f}s): {e}")
+
+    async def load_all(self, names: Iterable[str] = None):
+        """Load (and warm up) models in parallel worker threads."""
+        loop = asyncio.get_running_loop()
+        entries = [self._entries[name] for name in (names or self._entries)]
+        started = time.perf_counter()
+        await asyncio.gather(*(loop.run_in_executor(None, self._load, entry) for entry in entries))
+        logger.info(f"Loaded {len(entries)} model(s) in {time.perf_counter() - started:.2f}s")
+
+    async def get(self, name: str) -> Any:
+        """Return a loaded service, loading it first if needed (503 + Retry-After if it failed)."""
+        entry = self._entries[name]
+        if entry.status != "ready":
+            if entry.retry_in() <= 0:
+                await asyncio.get_running_loop().run_in_executor(None, self._load, entry)
+            if entry.status != "ready":
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"Model '{name}' is not available: {entry.error}",
+                    headers={"Retry-After": str(max(1, math.ceil(entry.retry_in())))},
+                )
+        return entry.instance
+
+    def _not_ready(self) -> Dict[str, str]:
+        """Why each model keeps the process from being ready (empty when ready).
+
+        Eager loading needs every model loaded. Lazy loading serves requests
+        before models are loaded (the first request loads them), so only a
+        failed load makes the process not ready.
+        """
+        lazy = settings.MODEL_LOADING == "lazy"
+        reasons = {}
+        for name, entry in self._entries.items():
+            if entry.status == "failed":
+                reasons[name] = f"failed to load ({entry.error}), retry in {entry.retry_in():.0f}s"
+            elif entry.status != "ready" and not lazy:
+                reasons[name] = "still loading" if entry.status == "loading" else "not loaded yet"
+        return reasons
+
+    def is_ready(self) -> bool:
+        return not self._not_ready()
+
+    def status(self) -> Dict[str, Any]:
+        reasons = self._not_ready()
+        status = {
+            "ready": not reasons,
+            "loading_mode": settings.MODEL_LOADING,
+            "models": {name: entry.describe() for name, entry in self._entries.items()},
+        }
+        if reasons:
+            status["reason"] = "; ".join(f"model '{name}' {reason}" for name, reason in reasons.items())
+        return status
+
+
+registry = ModelRegistry()
@@ -0,0 +1,220 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.core.logger import setup_logger
+from app.core.metrics import summarize_durations
+from app.core.storage import record_file, touch_file
+
+logger = setup_logger(__name__)
+
+# Result image encodings: format -> (file extension, cv2 quality flag)
+RESULT_IMAGE_FORMATS = {
+    "jpeg": (".jpg", cv2.IMWRITE_JPEG_QUALITY),
+    "webp": (".webp", cv2.IMWRITE_WEBP_QUALITY),
+}
+
+
+class ResultImageWriter:
+    """Write-behind rendering of result images on one background thread.
+
+    ``submit`` names the file after its content (a key identifying the upload
+    and everything drawn on it, plus format and quality) and returns its URL
+    at once; rendering, encoding and the disk write happen later. Under
+    pressure work is coalesced or dropped instead of queued without bound:
+
+    - a name that is already on disk or already queued is not queued again;
+    - at most ``max_pending`` jobs holding ``max_pending_bytes`` of inputs
+      wait; beyond that a new job is dropped and ``submit`` returns None, so
+      callers never hand out a URL that will not exist.
+
+    Files are written under a temporary name and renamed, so a URL never
+    serves a partial image (until the write lands it is a 404).
+    """
+
+    def __init__(self, directory: Path, url_prefix: str, max_pending: int, max_pending_bytes: int):
+        self.directory = Path(directory)
+        self.url_prefix = url_prefix.rstrip("/")
+        self.max_pending = max(1, int(max_pending))
+        self.max_pending_bytes = int(max_pending_bytes)
+        # name -> (render, fmt, quality, nbytes, submitted_at)
+        self._pending: "OrderedDict[str, tuple]" = OrderedDict()
+        self._pending_bytes = 0
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._busy = False
+        self._closed = False
+        self.submitted = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.written = 0
+        self.errors = 0
+        self._queue_waits = deque(maxlen=1024)
+        self._render_times = deque(maxlen=1024)
+        self._write_times = deque(maxlen=1024)
+
+    @staticmethod
+    def file_name(key: str, fmt: str, quality: int) -> str:
+        extension = RESULT_IMAGE_FORMATS[fmt][0]
+        return hashlib.blake2b(f"{key}:{fmt}:{quality}".encode(), digest_size=16).hexdigest() + extension
+
+    def path_for(self, name: str) -> Path:
+        return self.directory / name
+
+    def url_for(self, name: str) -> str:
+        return f"{self.url_prefix}/{name}"
+
+    def submit(self, key: str, render: Callable[[], np.ndarray], nbytes: int = 0,
+               fmt: str = None, quality: int = None) -> Optional[str]:
+        """Queue a result image; returns its file name, or None when it was dropped.
+
+        Args:
+            key: Identifies the image content (same key -> same file)
+            render: Called on the writer thread, returns the BGR image to encode
+            nbytes: Memory held by ``render`` until it runs (for the pending budget)
+            fmt: "jpeg" or "webp" (default RESULT_IMAGE_FORMAT)
+            quality: Encoder quality 1-100 (default RESULT_IMAGE_QUALITY)
+        """
+        fmt = fmt or settings.RESULT_IMAGE_FORMAT
+        quality = int(quality or settings.RESULT_IMAGE_QUALITY)
+        if fmt not in RESULT_IMAGE_FORMATS:
+            raise ValueError(f"Unknown result image format '{fmt}' (expected one of {', '.join(RESULT_IMAGE_FORMATS)})")
+        name = self.file_name(key, fmt, quality)
+        with self._condition:
+            self.submitted += 1
+            if name in self._pending:
+                self.coalesced += 1
+                return name
+            if self.path_for(name).exists():
+                # Keep the existing file from expiring right after its URL is handed out again
+                touch_file("results", self.path_for(name))
+                self.coalesced += 1
+                return name
+            if self._closed or len(self._pending) >= self.max_pending or (
+                self._pending and self._pending_bytes + nbytes > self.max_pending_bytes
+            ):
+                self.dropped += 1
+                return None
+            self._pending[name] = (render, fmt, quality, nbytes, time.monotonic())
+            self._pending_bytes += nbytes
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="result-writer", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        return name
+
+    def _write(self, name: str, render, fmt: str, quality: int):
+        started = time.monotonic()
+        extension, quality_flag = RESULT_IMAGE_FORMATS[fmt]
+        ok, encoded = cv2.imencode(extension, render(), [quality_flag, quality])
+        if not ok:
+            raise ValueError(f"Could not encode result image as {fmt}")
+        rendered = time.monotonic()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(name)
+        temp_path = path.with_name(f".{name}.{threading.get_ident()}.tmp")
+        with open(temp_path, "wb") as f:
+            f.write(encoded)
+        os.replace(temp_path, path)
+        record_file("results", path, len(encoded))
+        self._render_times.append(rendered - started)
+        self._write_times.append(time.monotonic() - rendered)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+                name, (render, fmt, quality, nbytes, submitted_at) = self._pending.popitem(last=False)
+                self._busy = True
+            self._queue_waits.append(time.monotonic() - submitted_at)
+            try:
+                self._write(name, render, fmt, quality)
+                self.written += 1
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Could not write result image {name}: {e}")
+            finally:
+                with self._condition:
+                    self._pending_bytes -= nbytes
+                    self._busy = False
+                    self._condition.notify_all()
+
+    def drain(self, timeout: float = None) -> bool:
+        """Wait until every queued image is written; False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._pending or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 10.0):
+        """Finish queued writes (up to ``timeout`` seconds) and stop the thread."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                logger.warning(f"Result writer stopped with {len(self._pending)} images unwritten")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "submitted": self.submitted,
+            "written": self.written,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "pending": len(self._pending),
+            "pending_bytes": self._pending_bytes,
+            "max_pending": self.max_pending,
+            "max_pending_bytes": self.max_pending_bytes,
+            "queue_wait": summarize_durations(self._queue_waits),
+            "render_time": summarize_durations(self._render_times),
+            "write_time": summarize_durations(self._write_times),
+        }
+
+
+_writer: Optional[ResultImageWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_result_writer() -> ResultImageWriter:
+    """The process-wide writer for RESULTS_DIR (served under /static/results)."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = ResultImageWriter(
+                settings.RESULTS_DIR,
+                "/static/results",
+                settings.RESULT_WRITER_MAX_PENDING,
+                settings.RESULT_WRITER_MAX_PENDING_BYTES,
+            )
+        return _writer
+
+
+def result_writer_stats() -> Optional[Dict[str, Any]]:
+    """Stats of the writer, None before anything was submitted to it."""
+    return _writer.stats() if _writer is not None else None
+
+
+def shutdown_result_writer(timeout: float = 10.0):
+    """Flush and stop the result writer (application shutdown)."""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.close(timeout)
@@ -0,0 +1,376 @@
+import fnmatch
+import heapq
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.logger import setup_logger
+from app.core.metrics import summarize_durations
+
+logger = setup_logger(__name__)
+
+
+class FileStore:
+    """In-memory index of the files under one directory, evicted oldest first.
+
+    Every file is tracked as path -> (size, time) with a running byte total;
+    a heap ordered by time finds the next file to evict without listing the
+    directory. Writers ``record`` their files as they land; files already on
+    disk (or written by other processes) enter through an incremental scan,
+    ``scan_step``, which lists at most ``batch`` entries per call so large
+    directories never stall a sweep. ``evict`` removes files older than
+    ``ttl`` seconds, then the oldest files until the total is within
+    ``max_bytes`` (0 disables either limit). The scan skips dotfiles (the
+    writers' in-flight temporaries), ``*.tmp`` files and names matching one of
+    the ``exclude`` patterns (assets shipped with the app), so only files the
+    app wrote are ever evicted.
+    """
+
+    def __init__(self, name: str, directory: Path, ttl: float, max_bytes: int, exclude: tuple = ()):
+        self.name = name
+        self.directory = Path(directory)
+        self.ttl = float(ttl)
+        self.max_bytes = int(max_bytes)
+        self.exclude = tuple(exclude)
+        self._files: Dict[str, tuple] = {}  # path -> (size, time)
+        self._heap: List[tuple] = []  # (time, path); stale when _files[path] has another time
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Incremental scan state
+        self._scan_dirs: List[str] = []
+        self._scan_iter = None
+        self._scan_seen: set = set()
+        self._scan_started = 0.0
+        self.scans = 0
+        self.scanned = 0
+        self.last_scan_seconds: Optional[float] = None
+        self.evicted_ttl = 0
+        self.evicted_quota = 0
+        self.evicted_bytes = 0
+        self.missing = 0
+
+    @property
+    def total_bytes(self) -> int:
+        return self._bytes
+
+    @property
+    def over_quota(self) -> bool:
+        return bool(self.max_bytes) and self._bytes > self.max_bytes
+
+    @property
+    def scanning(self) -> bool:
+        return bool(self._scan_dirs) or self._scan_iter is not None
+
+    def _add(self, path: str, size: int, created: float):
+        previous = self._files.get(path)
+        if previous is not None:
+            self._bytes -= previous[0]
+        self._files[path] = (size, created)
+        self._bytes += size
+        heapq.heappush(self._heap, (created, path))
+        # Touches and rewrites leave stale heap entries behind; rebuild when they dominate
+        if len(self._heap) > 2 * len(self._files) + 1024:
+            self._heap = [(created, path) for path, (_, created) in self._files.items()]
+            heapq.heapify(self._heap)
+
+    def _remove(self, path: str) -> int:
+        size, _ = self._files.pop(path)
+        self._bytes -= size
+        return size
+
+    def record(self, path, size: int = None, created: float = None):
+        """Index a file that was just written (or rewritten)."""
+        path = str(path)
+        if size is None:
+            size = os.stat(path).st_size
+        with self._lock:
+            self._add(path, size, time.time() if created is None else created)
+
+    def touch(self, path):
+        """Restart the TTL of an indexed file that is being handed out again."""
+        path = str(path)
+        with self._lock:
+            entry = self._files.get(path)
+            if entry is not None:
+                self._add(path, entry[0], time.time())
+
+    def discard(self, path):
+        """Forget a file that was removed by its writer."""
+        with self._lock:
+            if str(path) in self._files:
+                self._remove(str(path))
+
+    def _managed(self, name: str) -> bool:
+        """Whether a file found by the scan may be indexed (and so evicted)."""
+        if name.endswith(".tmp"):
+            return False
+        return not any(fnmatch.fnmatch(name, pattern) for pattern in self.exclude)
+
+    def start_scan(self):
+        """Begin (or restart) an incremental scan of the directory."""
+        with self._lock:
+            self._scan_dirs = [str(self.directory)]
+            self._scan_iter = None
+            self._scan_seen = set()
+            self._scan_started = time.time()
+
+    def scan_step(self, batch: int) -> bool:
+        """List up to ``batch`` directory entries into the index; True once the scan is complete.
+
+        Files the scan does not reach are left alone, and indexed files it
+        no longer finds (removed by another process) are dropped when it ends.
+        """
+        found = []
+        while len(found) < batch and (self._scan_iter is not None or self._scan_dirs):
+            if self._scan_iter is None:
+                try:
+                    self._scan_iter = os.scandir(self._scan_dirs.pop())
+                except OSError:
+                    continue
+            entry = next(self._scan_iter, None)
+            if entry is None:
+                self._scan_iter.close()
+                self._scan_iter = None
+                continue
+            try:
+                if entry.name.startswith("."):
+                    continue  # in-flight temporaries, hidden files and directories
+                if entry.is_dir(follow_symlinks=False):
+                    self._scan_dirs.append(entry.path)
+                elif entry.is_file(follow_symlinks=False) and self._managed(entry.name):
+                    stat = entry.stat(follow_symlinks=False)
+                    found.append((entry.path, stat.st_size, stat.st_mtime))
+            except OSError:
+                continue
+        done = not self.scanning
+        with self._lock:
+            for path, size, mtime in found:
+                self._scan_seen.add(path)
+                entry = self._files.get(path)
+                # A file recorded by this process keeps its own time
+                if entry is None or entry[0] != size:
+                    self._add(path, size, mtime if entry is None else entry[1])
+            self.scanned += len(found)
+            if done:
+                for path in [p for p, (_, t) in self._files.items()
+                             if p not in self._scan_seen and t < self._scan_started]:
+                    self._remove(path)
+                self._scan_seen = set()
+                self.scans += 1
+                self.last_scan_seconds = time.time() - self._scan_started
+        return done
+
+    def _unlink(self, path: str):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            self.missing += 1
+        except OSError as e:
+            logger.warning(f"Could not remove {path}: {e}")
+
+    def evict(self, now: float = None) -> int:
+        """Remove expired files, then the oldest until within the quota; returns the number removed."""
+        now = time.time() if now is None else now
+        cutoff = now - self.ttl if self.ttl else None
+        removed = 0
+        with self._lock:
+            while self._heap:
+                created, path = self._heap[0]
+                entry = self._files.get(path)
+                if entry is None or entry[1] != created:
+                    heapq.heappop(self._heap)  # stale
+                    continue
+                expired = cutoff is not None and created < cutoff
+                if not expired and not self.over_quota:
+                    break
+                heapq.heappop(self._heap)
+                self.evicted_bytes += self._remove(path)
+                if expired:
+                    self.evicted_ttl += 1
+                else:
+                    self.evicted_quota += 1
+                self._unlink(path)
+                removed += 1
+        return removed
+
+    def stats(self, now: float = None) -> Dict[str, Any]:
+        now = time.time() if now is None else now
+        with self._lock:
+            while self._heap and self._files.get(self._heap[0][1], (0, None))[1] != self._heap[0][0]:
+                heapq.heappop(self._heap)  # stale
+            oldest = self._heap[0][0] if self._heap else None
+            return {
+                "directory": str(self.directory),
+                "files": len(self._files),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "oldest_age_seconds": None if oldest is None else round(now - oldest, 1),
+                "indexing": self.scanning,
+                "scans": self.scans,
+                "scanned": self.scanned,
+                "last_scan_seconds": self.last_scan_seconds,
+                "evicted_ttl": self.evicted_ttl,
+                "evicted_quota": self.evicted_quota,
+                "evicted_bytes": self.evicted_bytes,
+                "missing": self.missing,
+            }
+
+
+class StorageJanitor:
+    """Background thread that keeps each FileStore within its TTL and quota.
+
+    At start every store is indexed by an incremental scan (``scan_batch``
+    entries at a time, interleaved with eviction); afterwards it evicts every
+    ``sweep_interval`` seconds, or at once when a write takes a store over its
+    quota, and rescans every ``rescan_interval`` seconds (0 = never) to pick
+    up files other worker processes wrote into the same directory.
+    """
+
+    def __init__(self, stores: List[FileStore], sweep_interval: float, rescan_interval: float, scan_batch: int):
+        self.stores = {store.name: store for store in stores}
+        self.sweep_interval = max(0.1, float(sweep_interval))
+        self.rescan_interval = float(rescan_interval)
+        self.scan_batch = max(1, int(scan_batch))
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.sweeps = 0
+        self._sweep_times = deque(maxlen=1024)
+        self._scan_step_times = deque(maxlen=1024)
+
+    def start(self):
+        for store in self.stores.values():
+            store.start_scan()
+        self._thread = threading.Thread(target=self._run, name="storage-janitor", daemon=True)
+        self._thread.start()
+
+    def record(self, name: str, path, size: int = None):
+        store = self.stores.get(name)
+        if store is None:
+            return
+        store.record(path, size)
+        if store.over_quota:
+            with self._condition:
+                self._condition.notify()
+
+    def touch(self, name: str, path):
+        store = self.stores.get(name)
+        if store is not None:
+            store.touch(path)
+
+    def sweep(self):
+        started = time.perf_counter()
+        now = time.time()
+        for store in self.stores.values():
+            store.evict(now)
+        self.sweeps += 1
+        self._sweep_times.append(time.perf_counter() - started)
+
+    def _run(self):
+        next_rescan = time.monotonic() + self.rescan_interval
+        while True:
+            scanning = [store for store in self.stores.values() if store.scanning]
+            for store in scanning:
+                started = time.perf_counter()
+                try:
+                    store.scan_step(self.scan_batch)
+                except Exception as e:
+                    logger.error(f"Indexing {store.directory} failed: {e}")
+                    store.start_scan()
+                self._scan_step_times.append(time.perf_counter() - started)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Storage sweep failed: {e}")
+            with self._condition:
+                if self._closed:
+                    return
+                if not scanning:
+                    self._condition.wait(self.sweep_interval)
+                    if self._closed:
+                        return
+            if self.rescan_interval and time.monotonic() >= next_rescan:
+                next_rescan = time.monotonic() + self.rescan_interval
+                for store in self.stores.values():
+                    if not store.scanning:
+                        store.start_scan()
+
+    def close(self, timeout: float = 5.0):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "stores": {name: store.stats(now) for name, store in self.stores.items()},
+            "sweeps": self.sweeps,
+            "sweep_time": summarize_durations(self._sweep_times),
+            "scan_step_time": summarize_durations(self._scan_step_times),
+        }
+
+
+# Directory each role writes into (a process only manages the stores of its roles)
+STORE_ROLES = {"results": "face", "uploads": "audio"}
+
+_janitor: Optional[StorageJanitor] = None
+_janitor_lock = threading.Lock()
+
+
+def start_storage_janitor() -> Optional[StorageJanitor]:
+    """Index and start managing the upload / result directories of this process's roles."""
+    global _janitor
+    if not settings.STORAGE_JANITOR_ENABLED:
+        return None
+    directories = {
+        "results": (settings.RESULTS_DIR, settings.RESULTS_TTL_SECONDS, settings.RESULTS_MAX_BYTES),
+        "uploads": (settings.UPLOAD_DIR, settings.UPLOAD_TTL_SECONDS, settings.UPLOAD_MAX_BYTES),
+    }
+    stores = [
+        FileStore(name, directory, ttl, max_bytes, settings.STORAGE_EXCLUDE)
+        for name, (directory, ttl, max_bytes) in directories.items()
+        if STORE_ROLES[name] in settings.SERVICE_ROLES
+    ]
+    with _janitor_lock:
+        if _janitor is None and stores:
+            _janitor = StorageJanitor(
+                stores,
+                settings.STORAGE_SWEEP_INTERVAL_SECONDS,
+                settings.STORAGE_RESCAN_INTERVAL_SECONDS,
+                settings.STORAGE_SCAN_BATCH,
+            )
+            _janitor.start()
+        return _janitor
+
+
+def record_file(store: str, path, size: int = None):
+    """Index a file just written into ``store`` ("uploads" / "results"); no-op without a janitor."""
+    if _janitor is not None:
+        _janitor.record(store, path, size)
+
+
+def touch_file(store: str, path):
+    """Restart the TTL of a stored file that is being served again."""
+    if _janitor is not None:
+        _janitor.touch(store, path)
+
+
+def storage_stats() -> Dict[str, Any]:
+    if _janitor is None:
+        return {"enabled": False}
+    return {"enabled": True, **_janitor.stats()}
+
+
+def shutdown_storage_janitor():
+    global _janitor
+    with _janitor_lock:
+        janitor, _janitor = _janitor, None
+    if janitor is not None:
+        janitor.close()
@@ -0,0 +1,169 @@
+import asyncio
+import itertools
+import json
+import time
+from collections import deque
+from typing import Any, Dict
+
+from fastapi import HTTPException, WebSocket
+
+from app.core.logger import setup_logger
+from app.core.metrics import summarize_durations
+
+logger = setup_logger(__name__)
+
+
+class StreamStats:
+    """Per-connection error count plus receive-to-result latency and inference time windows.
+
+    Subclasses add their own counters and name the latency key of
+    ``snapshot`` (``latency_key``).
+    """
+
+    latency_key = "latency"
+
+    def __init__(self, window: int = 120):
+        self.started = time.monotonic()
+        self.errors = 0
+        self._latencies = deque(maxlen=window)
+        self._inference_times = deque(maxlen=window)
+
+    def record(self, received_at: float, inference_time: float):
+        self._latencies.append(time.monotonic() - received_at)
+        self._inference_times.append(inference_time)
+
+    def counters(self) -> Dict[str, Any]:
+        return {}
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "uptime_s": time.monotonic() - self.started,
+            **self.counters(),
+            "errors": self.errors,
+            self.latency_key: summarize_durations(self._latencies),
+            "inference_time": summarize_durations(self._inference_times),
+        }
+
+
+class StreamSession:
+    """One WebSocket connection: a receive loop and a processing loop sharing a send lock.
+
+    Subclasses implement ``_receive_loop`` (read messages, queue work; text
+    messages go through ``_handle_text``) and ``_process_loop`` (analyze the
+    queued work and send results). A failure on one frame / window is
+    reported to the client with ``_report_failure`` and the stream carries
+    on; if the processing loop itself ends, the socket is closed with 1011.
+    """
+
+    name = "Stream"
+
+    def __init__(self, websocket: WebSocket, service, session_id: int):
+        self.websocket = websocket
+        self.service = service
+        self.session_id = session_id
+        self._send_lock = asyncio.Lock()
+
+    async def _send(self, message: dict):
+        async with self._send_lock:
+            await self.websocket.send_json(message)
+
+    async def _handle_text(self, text: str):
+        try:
+            message = json.loads(text)
+        except ValueError:
+            await self._send({"type": "error", "detail": "Text messages must be JSON"})
+            return
+        kind = message.get("type")
+        if kind == "stats":
+            await self._send({"type": "stats", **self.snapshot()})
+        else:
+            await self._handle_message(kind, message)
+
+    async def _handle_message(self, kind: str, message: dict):
+        """Control messages other than ``stats``; unknown types are answered with an error."""
+        await self._send({"type": "error", "detail": f"Unknown message type: {kind}"})
+
+    async def _report_failure(self, key: str, item_id: int, error: Exception):
+        """Answer one failed frame / window with an error message (``key``: "frame_id", "window_id")."""
+        self.stats.errors += 1
+        if isinstance(error, HTTPException):
+            detail = error.detail  # executor saturated
+        elif isinstance(error, ValueError):
+            detail = str(error)  # bad input
+        else:
+            # A bug or model failure must not silently end the stream
+            logger.error(f"{self.name} {self.session_id}: {key} {item_id} failed", exc_info=error)
+            detail = "Internal error"
+        await self._send({"type": "error", key: item_id, "detail": detail})
+
+    async def _receive_loop(self):
+        raise NotImplementedError
+
+    async def _process_loop(self):
+        raise NotImplementedError
+
+    def snapshot(self) -> Dict[str, Any]:
+        return self.stats.snapshot()
+
+    def summary(self) -> str:
+        """One-line description for the close log."""
+        return f"{self.stats.errors} errors"
+
+    async def run(self):
+        processor = asyncio.create_task(self._process_loop())
+        receiver = asyncio.create_task(self._receive_loop())
+        try:
+            done, _ = await asyncio.wait((processor, receiver), return_when=asyncio.FIRST_COMPLETED)
+            if processor in done:
+                # The processor only returns by failing (e.g. a send on a broken socket):
+                # close instead of accepting work nobody will analyze
+                logger.error(f"{self.name} {self.session_id} processing stopped: {processor.exception()!r}")
+                try:
+                    await self.websocket.close(code=1011, reason="Internal error")
+                except Exception:
+                    pass  # already closed
+        finally:
+            for task in (processor, receiver):
+                task.cancel()
+            await asyncio.gather(processor, receiver, return_exceptions=True)
+
+
+class StreamManager:
+    """Track the open connections of one stream endpoint and their stats."""
+
+    def __init__(self, session_class, max_connections: int):
+        self.session_class = session_class
+        self.max_connections = max_connections
+        self.sessions: Dict[int, StreamSession] = {}
+        self._ids = itertools.count(1)
+        self.total_connections = 0
+        self.rejected_connections = 0
+
+    async def serve(self, websocket: WebSocket, service):
+        if len(self.sessions) >= self.max_connections:
+            self.rejected_connections += 1
+            await websocket.close(code=1013, reason="Too many streams")  # try again later
+            return
+        await websocket.accept()
+
+        session = self.session_class(websocket, service, next(self._ids))
+        self.sessions[session.session_id] = session
+        self.total_connections += 1
+        logger.info(f"{session.name} {session.session_id} connected ({len(self.sessions)} open)")
+        try:
+            await session.run()
+        finally:
+            del self.sessions[session.session_id]
+            logger.info(f"{session.name} {session.session_id} closed: {session.summary()}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "open_connections": len(self.sessions),
+            "max_connections": self.max_connections,
+            "total_connections": self.total_connections,
+            "rejected_connections": self.rejected_connections,
+            "connections": {
+                str(session_id): session.snapshot()
+                for session_id, session in self.sessions.items()
+            },
+        }
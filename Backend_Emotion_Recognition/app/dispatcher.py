@@ -0,0 +1,336 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List
+
+import httpx
+from fastapi import FastAPI, Request, WebSocket
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.staticfiles import StaticFiles
+from starlette.background import BackgroundTask
+
+from app.core.config import settings
+from app.core.logger import setup_logger
+from app.utils.upload import RequestSizeLimitMiddleware
+
+logger = setup_logger(__name__)
+
+# Not forwarded between client, dispatcher and worker. Content-Length is kept:
+# bodies are relayed byte for byte (encoded responses are not decoded)
+HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailers", "transfer-encoding", "upgrade", "host",
+}
+
+
+def _response_headers(upstream: httpx.Response) -> Dict[str, str]:
+    """Worker response headers to relay: no hop-by-hop headers, and no CORS headers (the dispatcher adds its own)."""
+    return {
+        k: v for k, v in upstream.headers.items()
+        if k.lower() not in HOP_BY_HOP_HEADERS and not k.lower().startswith("access-control-")
+    }
+
+
+class Worker:
+    """One API worker process, reachable on a Unix socket (``/path.sock``) or ``http://host:port``."""
+
+    def __init__(self, address: str):
+        self.address = address
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        if address.startswith("http://"):
+            self.client = httpx.AsyncClient(base_url=address, timeout=settings.DISPATCHER_TIMEOUT_SECONDS)
+        else:
+            self.client = httpx.AsyncClient(
+                base_url="http://worker",
+                transport=httpx.AsyncHTTPTransport(uds=address),
+                timeout=settings.DISPATCHER_TIMEOUT_SECONDS,
+            )
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": self.in_flight, "requests": self.requests, "failures": self.failures}
+
+
+class WorkerPool:
+    """Workers serving one role; each request goes to the least busy worker."""
+
+    def __init__(self, role: str, addresses: List[str]):
+        self.role = role
+        self.workers = [Worker(address) for address in addresses]
+
+    def ordered(self) -> List[Worker]:
+        """Workers to try, least in-flight requests first."""
+        return sorted(self.workers, key=lambda worker: worker.in_flight)
+
+    async def forward(self, method: str, path: str, query: str, headers, body: AsyncIterator[bytes]) -> Response:
+        """Stream ``body`` to the least busy worker and its response back to the client.
+
+        Neither body is held in memory: the request is sent as it arrives and
+        the response relayed chunk by chunk. A worker that cannot be reached
+        is skipped, but only while nothing of the body has been read; once it
+        has, the request cannot be replayed and a failure is a 502.
+        """
+        started = False
+
+        async def request_body():
+            nonlocal started
+            async for chunk in body:
+                started = True
+                yield chunk
+
+        for worker in self.ordered():
+            worker.in_flight += 1
+            try:
+                request = worker.client.build_request(
+                    method, path, params=query or None, headers=headers, content=request_body()
+                )
+                upstream = await worker.client.send(request, stream=True)
+            except httpx.TransportError as e:
+                worker.in_flight -= 1
+                worker.failures += 1
+                logger.warning(f"{self.role} worker {worker.address} unavailable: {e}")
+                if started:
+                    return JSONResponse(status_code=502, content={"detail": f"{self.role.capitalize()} worker failed"})
+                # Worker down or restarting: try the next one
+                continue
+            except BaseException:
+                worker.in_flight -= 1
+                raise
+            worker.requests += 1
+            release = self._releaser(worker, upstream)
+            return StreamingResponse(
+                self._relay(worker, upstream, release),
+                status_code=upstream.status_code,
+                headers=_response_headers(upstream),
+                # Also covers a client that disconnects before the first chunk
+                background=BackgroundTask(release),
+            )
+        return JSONResponse(
+            status_code=503,
+            content={"detail": f"No {self.role} worker available, please retry later"},
+            headers={"Retry-After": str(settings.EXECUTOR_RETRY_AFTER_SECONDS)},
+        )
+
+    @staticmethod
+    def _releaser(worker: Worker, upstream: httpx.Response):
+        """Close ``upstream`` and count the request out of the worker, once however often it is called."""
+        released = False
+
+        async def release():
+            nonlocal released
+            if not released:
+                released = True
+                worker.in_flight -= 1
+                await upstream.aclose()
+
+        return release
+
+    async def _relay(self, worker: Worker, upstream: httpx.Response, release):
+        try:
+            async for chunk in upstream.aiter_raw():
+                yield chunk
+        except httpx.TransportError as e:
+            # Too late for an error response: the client sees a truncated body
+            worker.failures += 1
+            logger.warning(f"{self.role} worker {worker.address} failed mid-response: {e}")
+        finally:
+            await release()
+
+    async def close(self):
+        await asyncio.gather(*(worker.client.aclose() for worker in self.workers))
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {worker.address: worker.stats() for worker in self.workers}
+
+
+def _with_labels(sample: str, labels: str) -> str:
+    """Prometheus sample line with extra labels (``key="value",...``) in front of its own."""
+    name_end = min((i for i in (sample.find("{"), sample.find(" ")) if i >= 0), default=len(sample))
+    name, rest = sample[:name_end], sample[name_end:]
+    if rest.startswith("{"):
+        return f"{name}{{{labels},{rest[1:]}" if not rest.startswith("{}") else f"{name}{{{labels}}}{rest[2:]}"
+    return f"{name}{{{labels}}}{rest}"
+
+
+def merge_metrics(scrapes: List[tuple]) -> str:
+    """Merge Prometheus text from several workers into one exposition.
+
+    Args:
+        scrapes: (labels, text) pairs, ``labels`` being ``key="value"`` pairs
+            added to every sample of that worker's ``text``.
+
+    Returns:
+        The merged text: samples of the same metric from all workers are
+        grouped under a single HELP / TYPE header, as the format requires.
+    """
+    families: Dict[str, list] = {}
+    for labels, text in scrapes:
+        family = None
+        for line in text.splitlines():
+            if line.startswith("# HELP ") or line.startswith("# TYPE "):
+                family = line.split(" ", 3)[2]
+                headers = families.setdefault(family, [[], []])[0]
+                if line not in headers:
+                    headers.append(line)
+            elif line and not line.startswith("#") and family is not None:
+                families[family][1].append(_with_labels(line, labels))
+    lines = [line for headers, samples in families.values() for line in headers + samples]
+    return "\n".join(lines) + "\n"
+
+
+async def _proxy_websocket(websocket: WebSocket, worker: Worker, path: str):
+    """Pipe a client WebSocket to the same path on a worker, in both directions."""
+    import websockets
+
+    if worker.address.startswith("http://"):
+        upstream_cm = websockets.connect("ws://" + worker.address[len("http://"):] + path, max_size=None)
+    else:
+        upstream_cm = websockets.unix_connect(worker.address, "ws://worker" + path, max_size=None)
+
+    await websocket.accept()
+    async with upstream_cm as upstream:
+        async def client_to_worker():
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    await upstream.close()
+                    return
+                await upstream.send(message["bytes"] if message.get("bytes") is not None else message["text"])
+
+        async def worker_to_client():
+            async for message in upstream:
+                if isinstance(message, bytes):
+                    await websocket.send_bytes(message)
+                else:
+                    await websocket.send_text(message)
+            await websocket.close(code=upstream.close_code or 1000, reason=upstream.close_reason or "")
+
+        tasks = [asyncio.create_task(client_to_worker()), asyncio.create_task(worker_to_client())]
+        _, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+def create_dispatcher(workers: Dict[str, List[str]]) -> FastAPI:
+    """Front-end app that routes /face and /audio to per-role worker pools.
+
+    Args:
+        workers: Role ("face", "audio") -> worker addresses (Unix socket paths
+            or ``http://host:port``), as started by ``app.runner``.
+
+    Returns:
+        A FastAPI app. It serves /health, an aggregated /ready and the shared
+        /static directory itself and proxies everything else.
+    """
+    pools = {role: WorkerPool(role, addresses) for role, addresses in workers.items() if addresses}
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        yield
+        await asyncio.gather(*(pool.close() for pool in pools.values()))
+
+    app = FastAPI(title="Emotion Recognition API (dispatcher)", lifespan=lifespan, docs_url=None, redoc_url=None)
+    app.mount("/static", StaticFiles(directory="app/static"), name="static")
+    # Cut proxied bodies off at the same limits as the workers, before they reach one
+    app.add_middleware(RequestSizeLimitMiddleware)
+    # Same CORS configuration as the workers (app.main), outermost so the dispatcher's own
+    # 413 / 502 / 503 and /health, /ready, /metrics carry the headers too; preflights are
+    # answered here and the workers' CORS headers are dropped from proxied responses
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    def pool_for(path: str) -> WorkerPool:
+        role = path.lstrip("/").split("/", 1)[0]
+        # /, /docs, /openapi.json, ... are answered by any worker
+        return pools.get(role) or next(iter(pools.values()))
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "roles": {role: len(pool.workers) for role, pool in pools.items()}}
+
+    @app.get("/ready")
+    async def ready():
+        """200 once every worker reports ready; per-worker /ready bodies otherwise"""
+        async def probe(worker: Worker):
+            try:
+                response = await worker.client.get("/ready")
+                return response.status_code == 200, response.json()
+            except (httpx.TransportError, ValueError) as e:
+                return False, {"ready": False, "error": str(e)}
+
+        status = {}
+        for role, pool in pools.items():
+            results = await asyncio.gather(*(probe(worker) for worker in pool.workers))
+            status[role] = {
+                "ready": all(ok for ok, _ in results),
+                "workers": {worker.address: body for worker, (_, body) in zip(pool.workers, results)},
+            }
+        is_ready = all(role_status["ready"] for role_status in status.values())
+        return JSONResponse(status_code=200 if is_ready else 503, content={"ready": is_ready, "roles": status})
+
+    @app.get("/dispatcher-stats")
+    async def dispatcher_stats():
+        """In-flight / total requests and connection failures per worker"""
+        return {role: pool.stats() for role, pool in pools.items()}
+
+    @app.get("/metrics")
+    async def metrics():
+        """Prometheus metrics of every worker (labelled role / worker) plus the dispatcher's own counters"""
+        async def scrape(worker: Worker):
+            try:
+                response = await worker.client.get("/metrics")
+                return response.text if response.status_code == 200 else None
+            except httpx.TransportError as e:
+                logger.warning(f"Could not scrape metrics from {worker.address}: {e}")
+                return None
+
+        workers = [(role, worker) for role, pool in pools.items() for worker in pool.workers]
+        texts = await asyncio.gather(*(scrape(worker) for _, worker in workers))
+        own = ["# HELP emotion_dispatcher_worker_up 1 when the worker's /metrics answered",
+               "# TYPE emotion_dispatcher_worker_up gauge"]
+        own += [f'emotion_dispatcher_worker_up{{role="{role}",worker="{worker.address}"}} {int(text is not None)}'
+                for (role, worker), text in zip(workers, texts)]
+        for name, kind, key, help_text in (
+            ("in_flight", "gauge", "in_flight", "Requests being proxied to the worker"),
+            ("requests_total", "counter", "requests", "Requests proxied to the worker"),
+            ("failures_total", "counter", "failures", "Connection failures to the worker"),
+        ):
+            own += [f"# HELP emotion_dispatcher_{name} {help_text}", f"# TYPE emotion_dispatcher_{name} {kind}"]
+            own += [f'emotion_dispatcher_{name}{{role="{role}",worker="{worker.address}"}} {getattr(worker, key)}'
+                    for role, worker in workers]
+        scrapes = [(f'role="{role}",worker="{worker.address}"', text)
+                   for (role, worker), text in zip(workers, texts) if text is not None]
+        return Response(content="\n".join(own) + "\n" + merge_metrics(scrapes), media_type="text/plain; version=0.0.4")
+
+    @app.websocket("/{role}/stream")
+    async def stream(websocket: WebSocket, role: str):
+        pool = pools.get(role)
+        if pool is None:
+            await websocket.close(code=1013, reason=f"No {role} worker")
+            return
+        worker = pool.ordered()[0]
+        worker.in_flight += 1
+        try:
+            await _proxy_websocket(websocket, worker, websocket.url.path)
+        except OSError as e:
+            worker.failures += 1
+            logger.warning(f"{role} worker {worker.address} unavailable for stream: {e}")
+            await websocket.close(code=1013, reason=f"{role.capitalize()} worker unavailable")
+        finally:
+            worker.in_flight -= 1
+
+    @app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "HEAD"])
+    async def proxy(path: str, request: Request):
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in HOP_BY_HOP_HEADERS}
+        return await pool_for(request.url.path).forward(
+            request.method, request.url.path, request.url.query, headers, request.stream()
+        )
+
+    return app
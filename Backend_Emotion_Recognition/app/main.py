@@ -1,13 +1,46 @@
+import importlib
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
-from app.api import face_routes, audio_routes
+from app.core.cache import cache_stats, close_caches
+from app.core.config import settings
+from app.core.executor import executor_stats, shutdown_executors
+from app.core.metrics import MetricsMiddleware, TimedJSONResponse, metrics
+from app.core.result_writer import result_writer_stats, shutdown_result_writer
+from app.core.storage import shutdown_storage_janitor, start_storage_janitor, storage_stats
+from app.core.registry import registry
+from app.utils.upload import RequestSizeLimitMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Index the upload / result directories in the background and keep them within quota
+    start_storage_janitor()
+    # Load and warm up every model before the server accepts requests
+    if settings.MODEL_LOADING == "eager":
+        await registry.load_all()
+    yield
+    shutdown_result_writer()
+    shutdown_storage_janitor()
+    shutdown_executors()
+    close_caches()
+
 
-app = FastAPI(title="Emotion Recognition API")
+# JSON serialization of routes returning plain dicts is timed as the "serialize" stage
+app = FastAPI(title="Emotion Recognition API", lifespan=lifespan, default_response_class=TimedJSONResponse)
 
 # Mount static files
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
+# Oversized bodies are rejected while streaming (added before CORS so 413s carry CORS headers)
+app.add_middleware(RequestSizeLimitMiddleware)
+
+# Request latency, status counts and the Server-Timing header (size-limit 413s included)
+app.add_middleware(MetricsMiddleware)
+
 # CORS middleware configuration
 app.add_middleware(
     CORSMiddleware,
@@ -17,9 +50,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Include routers
-app.include_router(face_routes.router, prefix="/face", tags=["Face"])
-app.include_router(audio_routes.router, prefix="/audio", tags=["Audio"])
+# Include routers (only for the roles this process serves; importing a route
+# module registers its model with the registry)
+SERVICE_ROUTERS = {
+    "face": ("app.api.face_routes", "/face", "Face"),
+    "audio": ("app.api.audio_routes", "/audio", "Audio"),
+}
+
+for role in settings.SERVICE_ROLES:
+    if role not in SERVICE_ROUTERS:
+        raise ValueError(f"Unknown service role '{role}' (expected one of {', '.join(SERVICE_ROUTERS)})")
+    module_name, prefix, tag = SERVICE_ROUTERS[role]
+    app.include_router(importlib.import_module(module_name).router, prefix=prefix, tags=[tag])
 
 @app.get("/")
 async def root():
@@ -28,4 +70,76 @@ async def root():
 @app.get("/health")
 async def health():
     """Health check endpoint to verify server is running"""
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok", "roles": list(settings.SERVICE_ROLES)}
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once every model is loaded and warmed up (lazy loading:
+    until a model fails to load), 503 otherwise with the cause in ``reason``,
+    plus per-model status and load times"""
+    status = registry.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+@app.get("/cache-stats")
+async def prediction_cache_stats():
+    """Prediction cache hit/miss counters, size and evictions per subsystem"""
+    return cache_stats()
+
+@app.get("/storage-stats")
+async def storage_usage_stats():
+    """Disk usage, TTL / quota evictions and indexing progress of the upload and result directories"""
+    return storage_stats()
+
+
+def collect_component_metrics():
+    """Export the counters executors, caches, the result writer, storage and models already keep."""
+    samples = []
+    for name, stats in executor_stats().items():
+        labels = {"executor": name}
+        samples += [
+            ("executor_in_flight", "gauge", "Calls running or waiting on the executor", labels, stats["in_flight"]),
+            ("executor_completed_total", "counter", "Calls completed by the executor", labels, stats["completed"]),
+            ("executor_rejected_total", "counter", "Calls rejected with 503 (executor saturated)", labels,
+             stats["rejected"]),
+        ]
+    for name, stats in cache_stats().items():
+        labels = {"cache": name}
+        samples += [
+            ("cache_hits_total", "counter", "Prediction cache hits", labels, stats["hits"]),
+            ("cache_misses_total", "counter", "Prediction cache misses", labels, stats["misses"]),
+            ("cache_evictions_total", "counter", "Prediction cache evictions", labels, stats["evictions"]),
+            ("cache_bytes", "gauge", "Prediction cache memory use", labels, stats["bytes"]),
+        ]
+    writer = result_writer_stats()
+    if writer is not None:
+        for key in ("written", "coalesced", "dropped", "errors"):
+            samples.append((f"result_images_{key}_total", "counter", f"Result images {key}", {}, writer[key]))
+        samples.append(("result_images_pending", "gauge", "Result images waiting to be written", {}, writer["pending"]))
+    storage = storage_stats()
+    for name, stats in storage.get("stores", {}).items():
+        labels = {"store": name}
+        samples += [
+            ("storage_bytes", "gauge", "Bytes stored in the directory", labels, stats["bytes"]),
+            ("storage_files", "gauge", "Files stored in the directory", labels, stats["files"]),
+            ("storage_evicted_total", "counter", "Files removed by the storage janitor",
+             {**labels, "reason": "ttl"}, stats["evicted_ttl"]),
+            ("storage_evicted_total", "counter", "Files removed by the storage janitor",
+             {**labels, "reason": "quota"}, stats["evicted_quota"]),
+        ]
+    for name, model in registry.status()["models"].items():
+        samples.append(("model_ready", "gauge", "1 once the model is loaded and warmed up", {"model": name},
+                        int(model["status"] == "ready")))
+    return samples
+
+
+metrics.register_collector(collect_component_metrics)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus text format: per-stage and HTTP latency histograms, counters and gauges"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/stage-stats")
+async def stage_stats():
+    """p50/p95/p99 per processing stage and route (recent window), counters and in-flight gauges"""
+    return metrics.summary()
@@ -1,39 +1,53 @@
-import tensorflow as tf
-import tensorflow.keras.layers as L
-import tensorflow as tf
-import tensorflow.keras.layers as L
-from tensorflow.keras.layers import Dropout
 import os
-os.environ["TF_ENABLE_ONEDNN_OPTS"] = "0"
-
-model = tf.keras.Sequential([
-    L.Conv1D(512,kernel_size=5, strides=1,padding='same', activation='relu',input_shape=()),
-    L.BatchNormalization(),
-    L.MaxPool1D(pool_size=5,strides=2,padding='same'),
-
-    L.Conv1D(512,kernel_size=5,strides=1,padding='same',activation='relu'),
-    L.BatchNormalization(),
-    L.MaxPool1D(pool_size=5,strides=2,padding='same'),
-    Dropout(0.2),  # Add dropout layer after the second max pooling layer
-
-    L.Conv1D(256,kernel_size=5,strides=1,padding='same',activation='relu'),
-    L.BatchNormalization(),
-    L.MaxPool1D(pool_size=5,strides=2,padding='same'),
-
-    L.Conv1D(256,kernel_size=3,strides=1,padding='same',activation='relu'),
-    L.BatchNormalization(),
-    L.MaxPool1D(pool_size=5,strides=2,padding='same'),
-    Dropout(0.2),  # Add dropout layer after the fourth max pooling layer
-
-    L.Conv1D(128,kernel_size=3,strides=1,padding='same',activation='relu'),
-    L.BatchNormalization(),
-    L.MaxPool1D(pool_size=3,strides=2,padding='same'),
-    Dropout(0.2),  # Add dropout layer after the fifth max pooling layer
-
-    L.Flatten(),
-    L.Dense(512,activation='relu'),
-    L.BatchNormalization(),
-    L.Dense(7,activation='softmax')
-])
-model.compile(optimizer='adam',loss='categorical_crossentropy',metrics=['accuracy'])
-model.summary()
\ No newline at end of file
+
+
+def build_audio_model(input_length: int = 2376, num_classes: int = 7):
+    """Build and compile the audio emotion Conv1D network (training architecture).
+
+    The API serves the trained model from ``CNN_model.json`` + weights; this is
+    only used to retrain. TensorFlow is imported here, not when the module is
+    imported.
+
+    Args:
+        input_length: Length of the feature vector (ZCR + RMS + MFCC).
+        num_classes: Number of emotion classes.
+
+    Returns:
+        A compiled ``tf.keras.Sequential`` model.
+    """
+    os.environ.setdefault("TF_ENABLE_ONEDNN_OPTS", "0")
+    import tensorflow as tf
+    import tensorflow.keras.layers as L
+    from tensorflow.keras.layers import Dropout
+
+    model = tf.keras.Sequential([
+        L.Conv1D(512,kernel_size=5, strides=1,padding='same', activation='relu',input_shape=(input_length, 1)),
+        L.BatchNormalization(),
+        L.MaxPool1D(pool_size=5,strides=2,padding='same'),
+
+        L.Conv1D(512,kernel_size=5,strides=1,padding='same',activation='relu'),
+        L.BatchNormalization(),
+        L.MaxPool1D(pool_size=5,strides=2,padding='same'),
+        Dropout(0.2),  # Add dropout layer after the second max pooling layer
+
+        L.Conv1D(256,kernel_size=5,strides=1,padding='same',activation='relu'),
+        L.BatchNormalization(),
+        L.MaxPool1D(pool_size=5,strides=2,padding='same'),
+
+        L.Conv1D(256,kernel_size=3,strides=1,padding='same',activation='relu'),
+        L.BatchNormalization(),
+        L.MaxPool1D(pool_size=5,strides=2,padding='same'),
+        Dropout(0.2),  # Add dropout layer after the fourth max pooling layer
+
+        L.Conv1D(128,kernel_size=3,strides=1,padding='same',activation='relu'),
+        L.BatchNormalization(),
+        L.MaxPool1D(pool_size=3,strides=2,padding='same'),
+        Dropout(0.2),  # Add dropout layer after the fifth max pooling layer
+
+        L.Flatten(),
+        L.Dense(512,activation='relu'),
+        L.BatchNormalization(),
+        L.Dense(num_classes,activation='softmax')
+    ])
+    model.compile(optimizer='adam',loss='categorical_crossentropy',metrics=['accuracy'])
+    return model
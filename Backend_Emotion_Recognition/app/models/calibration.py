@@ -0,0 +1,123 @@
+"""Sample inputs for post-training quantization and accuracy-parity checks.
+
+Both helpers return model-ready float32 batches built from real media files,
+run through the same preprocessing the services use:
+- face: Haar-detected face crops resized to 48x48 grayscale (raw 0..255 pixels),
+  taken from images and video frames, plus flipped / brightness-shifted copies;
+- audio: 2.5 s windows at several offsets, featurised and scaled with scaler2.
+"""
+import pickle
+from pathlib import Path
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+DEFAULT_SAMPLE_DIR = settings.BASE_DIR.parent / "export_video_audio"
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png"}
+VIDEO_SUFFIXES = {".webm", ".mp4", ".avi"}
+AUDIO_SUFFIXES = {".wav", ".flac", ".ogg", ".mp3", ".weba", ".webm"}
+
+
+def _sample_files(sample_dirs: Optional[List[Path]], suffixes) -> List[Path]:
+    files = []
+    for directory in sample_dirs or [DEFAULT_SAMPLE_DIR]:
+        directory = Path(directory)
+        if directory.is_file():
+            candidates = [directory]
+        else:
+            candidates = sorted(directory.glob("*"))
+        files.extend(p for p in candidates if p.suffix.lower() in suffixes)
+    return files
+
+
+def _face_crops(gray: np.ndarray, cascade) -> List[np.ndarray]:
+    faces = cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
+    return [cv2.resize(gray[y:y + h, x:x + w], (48, 48)) for (x, y, w, h) in faces]
+
+
+def face_samples(sample_dirs: Optional[List[Path]] = None, limit: int = 200, seed: int = 0) -> np.ndarray:
+    """Return up to ``limit`` face crops as a (N, 48, 48, 1) float32 batch."""
+    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+    crops = []
+    for path in _sample_files(sample_dirs, IMAGE_SUFFIXES | VIDEO_SUFFIXES):
+        if path.suffix.lower() in IMAGE_SUFFIXES:
+            img = cv2.imread(str(path), cv2.IMREAD_GRAYSCALE)
+            if img is not None:
+                crops.extend(_face_crops(img, cascade))
+            continue
+        capture = cv2.VideoCapture(str(path))
+        frame_idx = 0
+        while len(crops) < limit:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            if frame_idx % 10 == 0:
+                crops.extend(_face_crops(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), cascade))
+            frame_idx += 1
+        capture.release()
+
+    if not crops:
+        raise ValueError(f"No faces found in sample files under {sample_dirs or [DEFAULT_SAMPLE_DIR]}")
+
+    # Augment (mirror + brightness shifts) so small sample folders still cover the input range
+    rng = np.random.default_rng(seed)
+    base = np.stack(crops).astype(np.float32)
+    variants = [base, base[:, :, ::-1]]
+    while sum(len(v) for v in variants) < limit:
+        shift = rng.uniform(-40, 40, size=(len(base), 1, 1)).astype(np.float32)
+        variants.append(np.clip(base + shift, 0, 255))
+    samples = np.concatenate(variants, axis=0)[:limit]
+    logger.info(f"Collected {len(samples)} face samples ({len(crops)} detected crops)")
+    return samples[..., np.newaxis]
+
+
+def audio_samples(
+    sample_dirs: Optional[List[Path]] = None,
+    limit: int = 64,
+    offsets=(0.0, 0.6, 1.2, 1.8, 2.4, 3.0),
+) -> np.ndarray:
+    """Return up to ``limit`` scaled feature windows as a (N, 2376, 1) float32 batch."""
+    from app.services.audio_service import decode_and_extract
+
+    scaler_path = settings.MODEL_DIR / "audio" / "scaler2.pickle"
+    scaler = None
+    if scaler_path.exists():
+        with open(scaler_path, "rb") as f:
+            scaler = pickle.load(f)
+
+    expected_size = 2376
+    rows = []
+    for path in _sample_files(sample_dirs, AUDIO_SUFFIXES):
+        contents = path.read_bytes()
+        for offset in offsets:
+            if len(rows) >= limit:
+                break
+            try:
+                features = decode_and_extract(contents, 22050, 2.5, offset, 20)
+            except ValueError as e:
+                logger.warning(f"Skipping {path.name} @ {offset}s: {e}")
+                break
+            row = np.zeros(expected_size, dtype=np.float64)
+            row[:min(expected_size, features.shape[0])] = features[:expected_size]
+            rows.append(row)
+
+    if not rows:
+        raise ValueError(f"No decodable audio found in sample files under {sample_dirs or [DEFAULT_SAMPLE_DIR]}")
+
+    matrix = np.stack(rows)
+    if scaler is not None:
+        matrix = scaler.transform(matrix)
+    logger.info(f"Collected {len(matrix)} audio feature windows")
+    return matrix.astype(np.float32)[..., np.newaxis]
+
+
+def model_samples(name: str, sample_dirs: Optional[List[Path]] = None, limit: Optional[int] = None) -> np.ndarray:
+    if name == "face":
+        return face_samples(sample_dirs, limit=limit or 200)
+    return audio_samples(sample_dirs, limit=limit or 64)
@@ -0,0 +1,188 @@
+"""Export the emotion models to ONNX and/or TFLite and check parity with Keras.
+
+Usage (from Backend_Emotion_Recognition/):
+    python -m app.models.export --model face audio --format onnx tflite
+    python -m app.models.export --format --quantize dynamic float16 int8  # quantized only
+
+Each exported file is reloaded through the serving backend (onnxruntime /
+TFLite interpreter) and compared against the Keras model on a fixed input
+batch; the command exits non-zero if outputs differ by more than --tolerance.
+Serve the exported files with INFERENCE_BACKEND=onnx or INFERENCE_BACKEND=tflite.
+
+Quantized TFLite variants (post-training quantization) are written next to the
+float TFLite file as ``<name>.<precision>.tflite`` and selected per model with
+FACE_MODEL_PRECISION / AUDIO_MODEL_PRECISION. Full-integer (int8) quantization
+is calibrated on sample inputs (see app.models.calibration); use
+benchmarks/quantization_report.py to compare accuracy, latency and size.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.logger import setup_logger
+from app.models.calibration import model_samples
+from app.models.inference_backend import OnnxBackend, TFLiteBackend, quantized_path
+
+logger = setup_logger(__name__)
+
+MODELS = {
+    "face": {
+        "input_shape": (48, 48, 1),
+        "keras": settings.FACE_MODEL_PATH,
+        "onnx": settings.FACE_ONNX_PATH,
+        "tflite": settings.FACE_TFLITE_PATH,
+    },
+    "audio": {
+        "input_shape": (2376, 1),
+        "keras": settings.AUDIO_MODEL_PATH,
+        "onnx": settings.AUDIO_ONNX_PATH,
+        "tflite": settings.AUDIO_TFLITE_PATH,
+    },
+}
+
+
+def load_keras_model(name: str):
+    """Load the trained Keras model exactly as the services do."""
+    if name == "face":
+        import tensorflow as tf
+
+        if not Path(settings.FACE_MODEL_PATH).exists():
+            raise FileNotFoundError(f"No trained face model at {settings.FACE_MODEL_PATH}")
+        return tf.keras.models.load_model(settings.FACE_MODEL_PATH, compile=False)
+
+    from app.services.audio_service import AudioService
+
+    return AudioService()._load_keras_model()
+
+
+def parity_inputs(name: str, batch_size: int = 8) -> np.ndarray:
+    """Fixed evaluation batch in each model's input range (raw pixels / scaled features)."""
+    rng = np.random.default_rng(0)
+    shape = (batch_size,) + MODELS[name]["input_shape"]
+    if name == "face":
+        return rng.integers(0, 256, size=shape).astype(np.float32)
+    return rng.standard_normal(size=shape).astype(np.float32)
+
+
+def traced_function(model, input_shape):
+    import tensorflow as tf
+
+    spec = (tf.TensorSpec((None,) + tuple(input_shape), tf.float32, name="input"),)
+    fn = tf.function(lambda x: model(x, training=False), input_signature=spec, autograph=False)
+    return fn, spec
+
+
+def export_onnx(model, input_shape, output_path: Path, opset: int = 13) -> Path:
+    try:
+        import tf2onnx
+    except ImportError as e:
+        raise RuntimeError("ONNX export requires the tf2onnx package") from e
+
+    fn, spec = traced_function(model, input_shape)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tf2onnx.convert.from_function(fn, input_signature=spec, opset=opset, output_path=str(output_path))
+    return output_path
+
+
+def convert_tflite(model, input_shape, configure=None) -> bytes:
+    """Convert to a TFLite flatbuffer; ``configure(converter)`` may set optimizations."""
+    import tensorflow as tf
+
+    fn, spec = traced_function(model, input_shape)
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([fn.get_concrete_function()], fn)
+    if configure is not None:
+        configure(converter)
+    return converter.convert()
+
+
+def export_tflite(model, input_shape, output_path: Path) -> Path:
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_bytes(convert_tflite(model, input_shape))
+    return output_path
+
+
+def quantize_tflite(model, input_shape, precision: str, samples: np.ndarray = None) -> bytes:
+    """Post-training quantization: dynamic range, float16 weights or full integer (int8)."""
+    import tensorflow as tf
+
+    def configure(converter):
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if precision == "float16":
+            converter.target_spec.supported_types = [tf.float16]
+        elif precision == "int8":
+            if samples is None or len(samples) == 0:
+                raise ValueError("int8 quantization needs a representative dataset")
+
+            def representative_dataset():
+                for sample in samples:
+                    yield [sample[np.newaxis].astype(np.float32)]
+
+            converter.representative_dataset = representative_dataset
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+            # keep float32 I/O so callers need no changes; the graph runs in int8
+        elif precision != "dynamic":
+            raise ValueError(f"Unsupported quantization: {precision}")
+
+    return convert_tflite(model, input_shape, configure)
+
+
+def check_parity(name: str, model, backend, tolerance: float) -> bool:
+    inputs = parity_inputs(name)
+    expected = np.asarray(model(inputs, training=False))
+    actual = backend.predict(inputs)
+    max_delta = float(np.abs(expected - actual).max())
+    top1 = float(np.mean(expected.argmax(axis=1) == actual.argmax(axis=1)))
+    ok = max_delta <= tolerance
+    print(
+        f"  parity {name}/{backend.name}: max |delta| = {max_delta:.2e}, "
+        f"top-1 agreement = {top1:.0%} -> {'OK' if ok else 'FAIL'} (tolerance {tolerance:g})"
+    )
+    return ok
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Export emotion models to ONNX / TFLite")
+    parser.add_argument("--model", nargs="+", choices=sorted(MODELS), default=sorted(MODELS))
+    parser.add_argument("--format", nargs="*", choices=["onnx", "tflite"], default=["onnx", "tflite"])
+    parser.add_argument("--quantize", nargs="*", choices=["dynamic", "float16", "int8"], default=[])
+    parser.add_argument(
+        "--samples-dir", nargs="*", type=Path, default=None,
+        help="Sample images/videos/audio for int8 calibration (default: export_video_audio/)",
+    )
+    parser.add_argument("--opset", type=int, default=13)
+    parser.add_argument("--tolerance", type=float, default=1e-4)
+    args = parser.parse_args(argv)
+
+    all_ok = True
+    for name in args.model:
+        spec = MODELS[name]
+        model = load_keras_model(name)
+        for fmt in args.format:
+            path = Path(spec[fmt])
+            if fmt == "onnx":
+                export_onnx(model, spec["input_shape"], path, opset=args.opset)
+                backend = OnnxBackend(path, spec["input_shape"])
+            else:
+                export_tflite(model, spec["input_shape"], path)
+                backend = TFLiteBackend(path, spec["input_shape"])
+            print(f"{name}: wrote {fmt} model to {path} ({path.stat().st_size / 1e6:.2f} MB)")
+            all_ok = check_parity(name, model, backend, args.tolerance) and all_ok
+
+        samples = None
+        if "int8" in args.quantize:
+            samples = model_samples(name, args.samples_dir)
+        for precision in args.quantize:
+            path = quantized_path(spec["tflite"], precision)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(quantize_tflite(model, spec["input_shape"], precision, samples))
+            print(f"{name}: wrote {precision} quantized model to {path} ({path.stat().st_size / 1e6:.2f} MB)")
+            # accuracy is reported by benchmarks/quantization_report.py, not gated here
+
+    return 0 if all_ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
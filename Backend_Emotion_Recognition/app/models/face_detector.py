@@ -0,0 +1,185 @@
+from pathlib import Path
+from typing import List, Sequence
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+FACE_DETECTOR_BACKENDS = ("haar", "yunet", "ssd")
+
+
+class FaceDetector:
+    """Face detector interface: image -> (N, 4) int array of (x, y, w, h) boxes.
+
+    ``params`` is a resolved detection profile (see FaceModel.detection_profile).
+    Every detector honours ``max_side`` (detect on a downscaled copy, map boxes
+    back) and ``min_size`` (in original-image pixels); other keys are
+    detector-specific. Images may be BGR or 2-D grayscale: each detector
+    converts to what it needs (``needs_color`` tells callers which to pass).
+    """
+
+    name = "base"
+    needs_color = False
+
+    @staticmethod
+    def _downscale(image: np.ndarray, max_side: int):
+        height, width = image.shape[:2]
+        max_side = int(max_side or 0)
+        if not max_side or max(height, width) <= max_side:
+            return image, 1.0
+        scale = max_side / max(height, width)
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        return cv2.resize(image, size, interpolation=cv2.INTER_AREA), scale
+
+    @staticmethod
+    def _to_original(boxes: np.ndarray, scale: float, shape, min_size: float) -> np.ndarray:
+        """Map (x, y, w, h) boxes from a downscaled image back, clip, and drop boxes below min_size."""
+        height, width = shape[:2]
+        if len(boxes) == 0:
+            return np.empty((0, 4), dtype=np.int32)
+        boxes = np.round(np.asarray(boxes, dtype=np.float64)[:, :4] / scale).astype(np.int32)
+        # Clip to the original image after rounding
+        boxes[:, 0] = np.clip(boxes[:, 0], 0, width - 1)
+        boxes[:, 1] = np.clip(boxes[:, 1], 0, height - 1)
+        boxes[:, 2] = np.minimum(boxes[:, 2], width - boxes[:, 0])
+        boxes[:, 3] = np.minimum(boxes[:, 3], height - boxes[:, 1])
+        keep = (boxes[:, 2] >= min_size) & (boxes[:, 3] >= min_size)
+        return boxes[keep]
+
+    @staticmethod
+    def _gray(image: np.ndarray) -> np.ndarray:
+        return image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+    @staticmethod
+    def _bgr(image: np.ndarray) -> np.ndarray:
+        return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR) if image.ndim == 2 else image
+
+    def detect(self, image: np.ndarray, params: dict) -> np.ndarray:
+        raise NotImplementedError
+
+    def detect_batch(self, images: Sequence[np.ndarray], params: dict) -> List[np.ndarray]:
+        """Detect faces in several images; backends with a batched forward pass override this."""
+        return [self.detect(image, params) for image in images]
+
+
+class HaarCascadeDetector(FaceDetector):
+    """OpenCV Haar cascade (the original detector). Uses scale_factor / min_neighbors."""
+
+    name = "haar"
+
+    def __init__(self, cascade_path: str = None):
+        cascade_path = cascade_path or cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+        self.cascade = cv2.CascadeClassifier(cascade_path)
+        if self.cascade.empty():
+            logger.error("Error loading face cascade classifier")
+            raise ValueError("Could not load face cascade classifier")
+        logger.info("Face cascade classifier loaded successfully")
+
+    def detect(self, image: np.ndarray, params: dict) -> np.ndarray:
+        detect_img, scale = self._downscale(self._gray(image), params.get("max_side"))
+        # The cascade's base window is 24x24, smaller minimum sizes are meaningless
+        min_size = max(24, int(round(params["min_size"] * scale)))
+        faces = self.cascade.detectMultiScale(
+            detect_img,
+            scaleFactor=params["scale_factor"],
+            minNeighbors=int(params["min_neighbors"]),
+            minSize=(min_size, min_size)
+        )
+        if scale == 1.0:
+            return np.asarray(faces, dtype=np.int32).reshape(-1, 4)
+        return self._to_original(faces, scale, image.shape, 0)
+
+
+class YuNetDetector(FaceDetector):
+    """OpenCV FaceDetectorYN (YuNet ONNX model). Handles rotated / partly profile faces."""
+
+    name = "yunet"
+    needs_color = True
+
+    def __init__(self, model_path: Path, score_threshold: float, nms_threshold: float = 0.3, top_k: int = 5000):
+        model_path = _require_detector_file(model_path, "FACE_YUNET_MODEL_PATH")
+        self.score_threshold = score_threshold
+        self.detector = cv2.FaceDetectorYN.create(
+            str(model_path), "", (320, 320), score_threshold, nms_threshold, top_k
+        )
+        logger.info(f"YuNet face detector loaded from {model_path}")
+
+    def detect(self, image: np.ndarray, params: dict) -> np.ndarray:
+        detect_img, scale = self._downscale(self._bgr(image), params.get("max_side"))
+        height, width = detect_img.shape[:2]
+        self.detector.setScoreThreshold(float(params.get("score_threshold", self.score_threshold)))
+        # The network runs at the image's own size, set per call
+        self.detector.setInputSize((width, height))
+        _, faces = self.detector.detect(detect_img)
+        if faces is None:
+            return np.empty((0, 4), dtype=np.int32)
+        return self._to_original(faces[:, :4], scale, image.shape, params["min_size"])
+
+
+class SSDDetector(FaceDetector):
+    """cv2.dnn ResNet-10 SSD (res10_300x300 Caffe model). Batches several images per forward pass."""
+
+    name = "ssd"
+    needs_color = True
+    input_size = (300, 300)
+    mean = (104.0, 177.0, 123.0)
+
+    def __init__(self, prototxt_path: Path, model_path: Path, score_threshold: float):
+        prototxt_path = _require_detector_file(prototxt_path, "FACE_SSD_PROTOTXT_PATH")
+        model_path = _require_detector_file(model_path, "FACE_SSD_MODEL_PATH")
+        self.score_threshold = score_threshold
+        self.net = cv2.dnn.readNetFromCaffe(str(prototxt_path), str(model_path))
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        logger.info(f"SSD face detector loaded from {model_path}")
+
+    def detect(self, image: np.ndarray, params: dict) -> np.ndarray:
+        return self.detect_batch([image], params)[0]
+
+    def detect_batch(self, images: Sequence[np.ndarray], params: dict) -> List[np.ndarray]:
+        if not images:
+            return []
+        # The network input is a fixed 300x300, so max_side does not apply
+        blob = cv2.dnn.blobFromImages(
+            [self._bgr(image) for image in images], 1.0, self.input_size, self.mean, swapRB=False, crop=False
+        )
+        self.net.setInput(blob)
+        # (1, 1, K, 7): image_id, label, confidence, x1, y1, x2, y2 (normalized)
+        detections = self.net.forward().reshape(-1, 7)
+        threshold = float(params.get("score_threshold", self.score_threshold))
+        detections = detections[detections[:, 2] >= threshold]
+
+        results = []
+        for idx, image in enumerate(images):
+            height, width = image.shape[:2]
+            rows = detections[detections[:, 0] == idx]
+            corners = np.clip(rows[:, 3:7], 0.0, 1.0) * np.array([width, height, width, height])
+            boxes = np.column_stack([corners[:, :2], corners[:, 2:] - corners[:, :2]])
+            results.append(self._to_original(boxes, 1.0, image.shape, params["min_size"]))
+        return results
+
+
+def _require_detector_file(path, setting: str) -> Path:
+    if path is None or not Path(path).exists():
+        raise FileNotFoundError(
+            f"Face detector model file not found at {path}; download it or point {setting} at it"
+        )
+    return Path(path)
+
+
+def create_detector(kind: str = None) -> FaceDetector:
+    """Build the face detector selected by FACE_DETECTOR_BACKEND."""
+    kind = (kind or settings.FACE_DETECTOR_BACKEND).lower()
+    if kind == "haar":
+        return HaarCascadeDetector()
+    if kind == "yunet":
+        return YuNetDetector(settings.FACE_YUNET_MODEL_PATH, settings.FACE_DNN_SCORE_THRESHOLD)
+    if kind == "ssd":
+        return SSDDetector(
+            settings.FACE_SSD_PROTOTXT_PATH, settings.FACE_SSD_MODEL_PATH, settings.FACE_DNN_SCORE_THRESHOLD
+        )
+    raise ValueError(f"Unknown FACE_DETECTOR_BACKEND '{kind}' (expected one of {', '.join(FACE_DETECTOR_BACKENDS)})")
@@ -1,33 +1,67 @@
-import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, Dropout, Flatten, Conv2D, BatchNormalization, Activation, MaxPooling2D
-from tensorflow.keras.optimizers import Adam
 import cv2
 import numpy as np
 import base64
 from pathlib import Path
 from app.core.logger import setup_logger
 import os
+from app.core.cache import model_fingerprint
 from app.core.config import settings
+from app.core.metrics import stage
+from app.models.face_detector import create_detector
+from app.models.face_preprocess import FACE_SIZE, FaceBatchPreprocessor, postprocess_predictions
+from app.models.inference_backend import QUANTIZED_PRECISIONS, load_backend, quantized_path
+from app.utils.image_decode import DecodedImage
 
 logger = setup_logger(__name__)
 
 class FaceModel:
-    os.environ["TF_ENABLE_ONEDNN_OPTS"] = "0"
-    def __init__(self):
+    def __init__(self, warmup=None):
         self.emotions = ['angry', 'disgust', 'fear', 'happy', 'neutral', 'sad', 'surprise']
-        self.model = self._create_model() if not Path(settings.FACE_MODEL_PATH).exists() else self._load_model()
+        self.backend = load_backend(
+            (48, 48, 1),
+            self._load_keras_model,
+            onnx_path=settings.FACE_ONNX_PATH,
+            tflite_path=settings.FACE_TFLITE_PATH,
+            precision=settings.FACE_MODEL_PRECISION,
+        )
+        # Keras model (None when serving an exported ONNX / TFLite model)
+        self.model = getattr(self.backend, "model", None)
+        # Pooled model-input buffers, one size per backend batch bucket
+        self.preprocessor = FaceBatchPreprocessor(self.backend.batch_buckets)
+        if settings.INFERENCE_WARMUP if warmup is None else warmup:
+            self.warmup()
         
-        # Load the face detection cascade classifier
-        cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-        self.face_cascade = cv2.CascadeClassifier(cascade_path)
-        if self.face_cascade.empty():
-            logger.error("Error loading face cascade classifier")
-            raise ValueError("Could not load face cascade classifier")
-        logger.info("Face cascade classifier loaded successfully")
+        # Face detector (Haar cascade by default, see FACE_DETECTOR_BACKEND)
+        self.detector = create_detector()
+        self.face_cascade = getattr(self.detector, "cascade", None)
+        # Identifies the served model in prediction cache keys
+        self.version = self._model_version()
         
+    def warmup(self):
+        """Run one inference per batch bucket; returns seconds per bucket."""
+        return self.backend.warmup()
+
+    def _model_version(self):
+        files = [
+            Path(settings.FACE_MODEL_PATH),
+            Path(settings.FACE_ONNX_PATH),
+            Path(settings.FACE_TFLITE_PATH),
+        ]
+        if settings.FACE_MODEL_PRECISION in QUANTIZED_PRECISIONS:
+            files.append(quantized_path(settings.FACE_TFLITE_PATH, settings.FACE_MODEL_PRECISION))
+        return model_fingerprint(self.backend.name, settings.FACE_MODEL_PRECISION, *files)
+
+    def _load_keras_model(self):
+        return self._create_model() if not Path(settings.FACE_MODEL_PATH).exists() else self._load_model()
+
     def _create_model(self):
         """Create the CNN model architecture"""
+        # TensorFlow is only needed for the Keras backend; import it on first use
+        os.environ.setdefault("TF_ENABLE_ONEDNN_OPTS", "0")
+        from tensorflow.keras.models import Sequential
+        from tensorflow.keras.layers import Dense, Dropout, Flatten, Conv2D, BatchNormalization, Activation, MaxPooling2D
+        from tensorflow.keras.optimizers import Adam
+
         model = Sequential()
 
         # 1st CNN layer
@@ -90,6 +124,9 @@ class FaceModel:
         
     def _load_model(self):
         """Load the face emotion recognition model"""
+        os.environ.setdefault("TF_ENABLE_ONEDNN_OPTS", "0")
+        import tensorflow as tf
+
         try:
             # Load model without compiling to avoid optimizer/class mismatch issues
             model = tf.keras.models.load_model(settings.FACE_MODEL_PATH, compile=False)
@@ -99,12 +136,126 @@ class FaceModel:
             logger.error(f"Error loading face model: {e}")
             raise
             
-    def detect_faces(self, img_array, include_cropped_base64=False):
+    @staticmethod
+    def to_gray(img_array):
+        """Return (BGR image, grayscale image) for a colour or already-gray array."""
+        if img_array.ndim == 2:
+            # Already grayscale (e.g. raw frames from /face/stream)
+            return img_array, img_array
+
+        # Convert image array to BGR format if needed
+        if len(img_array.shape) == 3 and img_array.shape[2] == 3:
+            img_bgr = img_array
+        else:
+            img_bgr = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
+
+        # Convert to grayscale for face detection
+        return img_bgr, cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
+
+    @staticmethod
+    def detection_profile(profile=None):
+        """Resolve a detection profile name to detector parameters (ValueError if unknown)."""
+        name = profile or settings.FACE_DETECTION_PROFILE
+        if name not in settings.FACE_DETECTION_PROFILES:
+            available = ", ".join(sorted(settings.FACE_DETECTION_PROFILES))
+            raise ValueError(f"Unknown detection profile '{name}' (available: {available})")
+        params = dict(settings.FACE_DETECTION_PROFILES[name])
+        params.setdefault("max_side", settings.FACE_DETECTION_MAX_SIDE)
+        return params
+
+    def detect_boxes(self, image, profile=None):
+        """Run the face detector on an image (or region) -> array of (x, y, w, h).
+
+        Large images are downscaled to the profile's max side for detection and
+        the boxes are mapped back to ``image`` coordinates.
+        """
+        return self.detector.detect(image, self.detection_profile(profile))
+
+    def detect_boxes_batch(self, images, profile=None):
+        """detect_boxes for several images; DNN detectors run them in one forward pass."""
+        return self.detector.detect_batch(images, self.detection_profile(profile))
+
+    def decode_params(self, profile=None):
+        """Arguments for image_decode.decode_for_detection: (max side detection needs, colour?, reduced?)."""
+        return (
+            self.detection_profile(profile)["max_side"],
+            self.detector.needs_color,
+            settings.FACE_DECODE_REDUCED,
+        )
+
+    def detect_face_boxes(self, img_array, profile=None):
+        """Run face detection on an image, converted to grayscale once.
+
+        Args:
+            img_array: Input image as numpy array (colour, or 2-D grayscale), or
+                a DecodedImage from the decode planner (possibly reduced scale)
+            profile: Detection profile name (default: settings.FACE_DETECTION_PROFILE)
+
+        Returns:
+            (DecodedImage, array of (x, y, w, h) face boxes in original-image pixels)
+        """
+        image = img_array if isinstance(img_array, DecodedImage) else DecodedImage.from_array(img_array)
+        params = self.detection_profile(profile)
+        # min_size is in original pixels, the detector sees decoded ones
+        params["min_size"] = params["min_size"] / image.scale
+        with stage("face.detector"):
+            faces = self.detector.detect(image.detection_image(self.detector.needs_color), params)
+        return image, image.to_original(faces)
+
+    @staticmethod
+    def _box_to_location(box):
+        x, y, w, h = box
+        return {
+            "left": int(x),
+            "top": int(y),
+            "right": int(x + w),
+            "bottom": int(y + h)
+        }
+
+    def detect_and_crop_faces(self, img_array, profile=None):
+        """Detect all faces and crop them from the already-computed grayscale image.
+
+        Crops are numpy views (no copy, no re-encoding) ready for predict_emotion_batch.
+
+        Returns:
+            dict with locations, crops, image_width and image_height
+        """
+        image, faces = self.detect_face_boxes(img_array, profile)
+        locations = [self._box_to_location(box) for box in faces]
+        crops = [image.crop_gray(loc, FACE_SIZE) for loc in locations]
+        return {
+            "locations": locations,
+            "crops": crops,
+            "image_width": image.width,
+            "image_height": image.height
+        }
+
+    def track_and_crop_faces(self, img_array, tracker):
+        """Like detect_and_crop_faces, but boxes come from a per-stream FaceTracker.
+
+        Returns:
+            dict with tracks, locations, crops, image_width and image_height
+        """
+        img_bgr, gray_img = self.to_gray(img_array)
+        img_height, img_width = img_bgr.shape[:2]
+        tracks = tracker.update(img_bgr if self.detector.needs_color else gray_img)
+        locations = [self._box_to_location(track.box) for track in tracks]
+        crops = [gray_img[loc["top"]:loc["bottom"], loc["left"]:loc["right"]] for loc in locations]
+        return {
+            "tracks": tracks,
+            "locations": locations,
+            "crops": crops,
+            "image_width": img_width,
+            "image_height": img_height
+        }
+
+    def detect_faces(self, img_array, include_cropped_base64=False, profile=None):
         """Detect all faces in image and return their locations.
         
         Args:
             img_array: Input image as numpy array
             include_cropped_base64: If True, include base64 encoded cropped faces
+            profile: Detection profile name ("fast", "balanced", "accurate")
             
         Returns:
             dict with:
@@ -113,25 +264,10 @@ class FaceModel:
                 - image_height: Height of original image
         """
         try:
-            # Convert image array to BGR format if needed
-            if len(img_array.shape) == 3 and img_array.shape[2] == 3:
-                img_bgr = img_array
-            else:
-                img_bgr = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
+            image, faces = self.detect_face_boxes(img_array, profile)
 
             # Get image dimensions
-            img_height, img_width = img_bgr.shape[:2]
-
-            # Convert to grayscale for face detection
-            gray_img = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
-
-            # Detect faces
-            faces = self.face_cascade.detectMultiScale(
-                gray_img, 
-                scaleFactor=1.1, 
-                minNeighbors=5, 
-                minSize=(30, 30)
-            )
+            img_height, img_width = image.height, image.width
 
             if len(faces) == 0:
                 logger.warning("No faces detected in the image")
@@ -161,8 +297,8 @@ class FaceModel:
                 
                 # Optionally include cropped face as base64
                 if include_cropped_base64:
-                    # Crop face from original color image
-                    cropped_face = img_bgr[top:bottom, left:right]
+                    # Crop face from the original colour image (decoded on first use)
+                    cropped_face = image.crop_color(face_data["location"])
                     # Encode to base64
                     _, buffer = cv2.imencode('.jpg', cropped_face, [cv2.IMWRITE_JPEG_QUALITY, 90])
                     face_base64 = base64.b64encode(buffer).decode('utf-8')
@@ -189,86 +325,52 @@ class FaceModel:
             dict with emotion, confidence, and all_emotions
         """
         try:
-            # Convert to grayscale if needed
-            if len(face_img_array.shape) == 3:
-                if face_img_array.shape[2] == 3:
-                    # BGR to grayscale
-                    gray_face = cv2.cvtColor(face_img_array, cv2.COLOR_BGR2GRAY)
-                else:
-                    gray_face = face_img_array[:, :, 0]
-            else:
-                gray_face = face_img_array
-
-            # Preprocess the face
-            processed_face = self._preprocess_image(gray_face)
-            
-            # Get predictions
-            predictions = self.model.predict(processed_face, verbose=0)
-            
-            # Get all emotion probabilities (0..1)
-            emotion_probs = {
-                emotion: float(prob)
-                for emotion, prob in zip(self.emotions, predictions[0])
-            }
-
-            # Get the highest probability emotion
-            emotion_index = int(np.argmax(predictions[0]))
-            emotion = self.emotions[emotion_index]
-            confidence = float(predictions[0][emotion_index])
-
-            return {
-                "emotion": emotion,
-                "confidence": confidence,  # 0..1
-                "all_emotions": emotion_probs
-            }
+            return self.predict_emotion_batch([face_img_array])[0]
         except Exception as e:
             logger.error(f"Error predicting emotion from face: {e}")
             raise
 
-    def predict(self, img_array):
-        """Predict emotion from face image (legacy method - detects largest face and predicts)
-        This method is kept for backward compatibility.
+    def locate_largest_face(self, img_array, profile=None):
+        """Detect the largest face in an image and crop it.
+
+        Args:
+            img_array: Input image as numpy array
+            profile: Detection profile name (default: settings.FACE_DETECTION_PROFILE)
+
+        Returns:
+            (cropped grayscale face, face location dict) or None if no face was found
         """
-        try:
-            # Convert image array to BGR format if needed
-            if len(img_array.shape) == 3 and img_array.shape[2] == 3:
-                img_bgr = img_array
-            else:
-                img_bgr = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
+        image, faces = self.detect_face_boxes(img_array, profile)
 
-            # Convert to grayscale for face detection
-            gray_img = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
+        if len(faces) == 0:
+            logger.warning("No faces detected in the image")
+            return None
 
-            # Detect faces
-            faces = self.face_cascade.detectMultiScale(gray_img, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
+        # Find the largest face
+        largest_face = max(faces, key=lambda rect: rect[2] * rect[3])
 
-            if len(faces) == 0:
-                logger.warning("No faces detected in the image")
-                return {"error": "No faces detected in the image"}
+        # Convert face location to left/top/right/bottom for frontend
+        face_location = self._box_to_location(largest_face)
 
-            # Find the largest face
-            largest_face = max(faces, key=lambda rect: rect[2] * rect[3])
-            x, y, w, h = largest_face
+        # Crop the face
+        cropped_face = image.crop_gray(face_location, FACE_SIZE)
+        return cropped_face, face_location
+
+    def predict(self, img_array, profile=None):
+        """Predict emotion from face image (legacy method - detects largest face and predicts)
+        This method is kept for backward compatibility.
+        """
+        try:
+            located = self.locate_largest_face(img_array, profile)
+            if located is None:
+                return {"error": "No faces detected in the image"}
+            cropped_face, face_location = located
 
-            # Crop the face
-            cropped_face = gray_img[y:y+h, x:x+w]
-            
             # Predict emotion from cropped face
             result = self.predict_emotion_from_face(cropped_face)
 
-            # Convert face location to left/top/right/bottom for frontend
-            left = int(x)
-            top = int(y)
-            right = int(x + w)
-            bottom = int(y + h)
-
             # Add face location to result
-            result["face_location"] = {
-                "left": left,
-                "top": top,
-                "right": right,
-                "bottom": bottom
-            }
+            result["face_location"] = face_location
 
             return result
         except Exception as e:
@@ -288,68 +390,17 @@ class FaceModel:
             if not face_img_arrays or len(face_img_arrays) == 0:
                 return []
             
-            # Preprocess all faces
-            processed_faces = []
-            for face_img_array in face_img_arrays:
-                # Convert to grayscale if needed
-                if len(face_img_array.shape) == 3:
-                    if face_img_array.shape[2] == 3:
-                        # BGR to grayscale
-                        gray_face = cv2.cvtColor(face_img_array, cv2.COLOR_BGR2GRAY)
-                    else:
-                        gray_face = face_img_array[:, :, 0]
-                else:
-                    gray_face = face_img_array
-                
-                # Preprocess the face
-                processed_face = self._preprocess_image(gray_face)
-                processed_faces.append(processed_face[0])  # Remove batch dimension for stacking
-            
-            # Stack all faces into a batch
-            batch_array = np.stack(processed_faces, axis=0)
-            
-            # Batch predict (more efficient than individual predictions)
-            predictions = self.model.predict(batch_array, verbose=0)
-            
-            # Process results for each face
             results = []
-            for pred in predictions:
-                # Get all emotion probabilities (0..1)
-                emotion_probs = {
-                    emotion: float(prob)
-                    for emotion, prob in zip(self.emotions, pred)
-                }
-                
-                # Get the highest probability emotion
-                emotion_index = int(np.argmax(pred))
-                emotion = self.emotions[emotion_index]
-                confidence = float(pred[emotion_index])
-                
-                results.append({
-                    "emotion": emotion,
-                    "confidence": confidence,  # 0..1
-                    "all_emotions": emotion_probs
-                })
-            
+            max_batch = self.preprocessor.max_batch
+            for start in range(0, len(face_img_arrays), max_batch):
+                chunk = face_img_arrays[start:start + max_batch]
+                # Crops are resized straight into a pooled bucket-sized buffer;
+                # rows past len(chunk) are stale and their outputs are dropped
+                with self.preprocessor.batch(chunk) as batch_array, stage("face.model"):
+                    predictions = self.backend.predict(batch_array)[:len(chunk)]
+                results.extend(postprocess_predictions(predictions, self.emotions))
+
             return results
         except Exception as e:
             logger.error(f"Error predicting emotion batch: {e}")
             raise
-    
-    def _preprocess_image(self, face_img):
-        """Preprocess face image for model input"""
-        try:
-            # Resize to model input size (48x48)
-            resized_face = cv2.resize(face_img, (48, 48))
-
-            # Normalize pixel values to [0, 1] range (same as training)
-            # If your training used different normalization, adjust this accordingly
-            normalized_face = resized_face
-
-            # Reshape for model input (add batch and channel dimensions)
-            processed_face = normalized_face.reshape(1, 48, 48, 1)
-
-            return processed_face
-        except Exception as e:
-            logger.error(f"Error preprocessing image: {e}")
-            raise
\ No newline at end of file
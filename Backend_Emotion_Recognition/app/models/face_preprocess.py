@@ -0,0 +1,97 @@
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Sequence
+
+import cv2
+import numpy as np
+
+from app.core.metrics import stage
+
+FACE_SIZE = 48
+
+
+class FaceBatchPreprocessor:
+    """Write face crops straight into reusable float32 model-input buffers.
+
+    Buffers are pooled per batch bucket: ``(bucket, 48, 48, 1)`` float32 plus a
+    ``(bucket, 48, 48)`` uint8 scratch that ``cv2.resize`` writes into directly.
+    A checked-out buffer always has the full bucket size so backends never
+    need to pad; rows past the number of faces hold stale data and their
+    outputs are simply ignored. Buffers are returned to the pool on exit, and
+    concurrent callers get their own buffer (the pool grows to the peak
+    concurrency per bucket).
+    """
+
+    def __init__(self, batch_buckets: Sequence[int]):
+        self.batch_buckets = tuple(sorted(set(int(b) for b in batch_buckets)))
+        self._free: Dict[int, List[tuple]] = {bucket: [] for bucket in self.batch_buckets}
+        self._lock = threading.Lock()
+        self.allocated = 0
+
+    @property
+    def max_batch(self) -> int:
+        return self.batch_buckets[-1]
+
+    def _bucket_for(self, n: int) -> int:
+        for bucket in self.batch_buckets:
+            if n <= bucket:
+                return bucket
+        raise ValueError(f"Batch of {n} faces exceeds the largest bucket ({self.max_batch})")
+
+    def _acquire(self, bucket: int) -> tuple:
+        with self._lock:
+            if self._free[bucket]:
+                return self._free[bucket].pop()
+            self.allocated += 1
+        return (
+            np.zeros((bucket, FACE_SIZE, FACE_SIZE, 1), dtype=np.float32),
+            np.zeros((bucket, FACE_SIZE, FACE_SIZE), dtype=np.uint8),
+        )
+
+    def _release(self, bucket: int, buffers: tuple):
+        with self._lock:
+            self._free[bucket].append(buffers)
+
+    @staticmethod
+    def _to_gray(face: np.ndarray) -> np.ndarray:
+        if face.ndim == 3:
+            if face.shape[2] == 3:
+                return cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+            return face[:, :, 0]
+        return face
+
+    @contextmanager
+    def batch(self, faces: Sequence[np.ndarray]):
+        """Yield a full-bucket float32 batch whose first ``len(faces)`` rows hold the faces."""
+        n = len(faces)
+        bucket = self._bucket_for(n)
+        buffers = self._acquire(bucket)
+        batch, scratch = buffers
+        try:
+            with stage("face.preprocess"):
+                for i, face in enumerate(faces):
+                    gray = self._to_gray(face)
+                    if gray.dtype == np.uint8:
+                        cv2.resize(gray, (FACE_SIZE, FACE_SIZE), dst=scratch[i])
+                    else:
+                        scratch[i] = cv2.resize(gray, (FACE_SIZE, FACE_SIZE))
+                # uint8 -> float32 in place, no temporary arrays
+                np.copyto(batch[:n, :, :, 0], scratch[:n], casting="unsafe")
+            yield batch
+        finally:
+            self._release(bucket, buffers)
+
+
+def postprocess_predictions(predictions: np.ndarray, emotions: Sequence[str]) -> List[dict]:
+    """Turn a (N, num_emotions) softmax matrix into per-face result dicts with array ops."""
+    predictions = np.asarray(predictions)
+    top = predictions.argmax(axis=1)
+    confidences = predictions[np.arange(predictions.shape[0]), top]
+    return [
+        {
+            "emotion": emotions[index],
+            "confidence": confidence,  # 0..1
+            "all_emotions": dict(zip(emotions, row)),
+        }
+        for index, confidence, row in zip(top.tolist(), confidences.tolist(), predictions.tolist())
+    ]
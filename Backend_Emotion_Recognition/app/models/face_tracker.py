@@ -0,0 +1,156 @@
+import itertools
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+Box = tuple  # (x, y, w, h)
+
+
+def iou(a: Box, b: Box) -> float:
+    """Intersection over union of two (x, y, w, h) boxes."""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+@dataclass
+class Track:
+    track_id: int
+    box: Box
+    missed: int = 0
+    hits: int = 1
+    probs: Optional[np.ndarray] = field(default=None, repr=False)  # smoothed emotion probabilities
+
+
+class FaceTracker:
+    """Keep stable face IDs across frames of one stream and skip most full-frame detections.
+
+    A full-frame detection runs every ``detect_every`` frames, when there are no
+    tracks, or on the frame after a track was lost. In between, each track is
+    re-detected only inside its previous box grown by ``roi_margin`` - a small
+    fraction of the pixels the cascade would otherwise scan. Detections are
+    matched to tracks greedily by IoU; tracks unmatched for more than
+    ``max_missed`` frames are dropped.
+
+    Emotion probabilities are smoothed per track with an exponential moving
+    average (``smoothing`` is the weight of the previous value).
+
+    Not thread-safe: one tracker belongs to one stream, which processes one
+    frame at a time.
+    """
+
+    def __init__(
+        self,
+        detect: Callable[[np.ndarray], Sequence[Box]],
+        detect_every: int = 10,
+        roi_margin: float = 0.5,
+        iou_threshold: float = 0.3,
+        max_missed: int = 2,
+        smoothing: float = 0.6,
+    ):
+        self.detect = detect
+        self.detect_every = max(1, int(detect_every))
+        self.roi_margin = roi_margin
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.smoothing = min(max(smoothing, 0.0), 1.0)
+        self.tracks: List[Track] = []
+        self._ids = itertools.count(1)
+        self._frames_since_full = 0
+        self._force_full = True
+        self.full_detections = 0
+        self.roi_detections = 0
+
+    def _match(self, detections: List[Box]) -> Dict[int, Box]:
+        """Greedy IoU matching; returns {track index: detection} and removes matched detections."""
+        pairs = sorted(
+            (
+                (iou(track.box, det), t_idx, d_idx)
+                for t_idx, track in enumerate(self.tracks)
+                for d_idx, det in enumerate(detections)
+            ),
+            reverse=True,
+        )
+        matched, used = {}, set()
+        for score, t_idx, d_idx in pairs:
+            if score < self.iou_threshold:
+                break
+            if t_idx in matched or d_idx in used:
+                continue
+            matched[t_idx] = detections[d_idx]
+            used.add(d_idx)
+        detections[:] = [det for d_idx, det in enumerate(detections) if d_idx not in used]
+        return matched
+
+    def _full_detection(self, image: np.ndarray) -> List[Box]:
+        self.full_detections += 1
+        return [tuple(int(v) for v in box) for box in self.detect(image)]
+
+    def _roi_detection(self, image: np.ndarray, box: Box) -> List[Box]:
+        x, y, w, h = box
+        dx, dy = int(w * self.roi_margin), int(h * self.roi_margin)
+        x0, y0 = max(0, x - dx), max(0, y - dy)
+        x1, y1 = min(image.shape[1], x + w + dx), min(image.shape[0], y + h + dy)
+        self.roi_detections += 1
+        return [
+            (int(rx) + x0, int(ry) + y0, int(rw), int(rh))
+            for rx, ry, rw, rh in self.detect(image[y0:y1, x0:x1])
+        ]
+
+    def update(self, image: np.ndarray) -> List[Track]:
+        """Advance the tracker by one frame (the image the detector expects) and return the live tracks."""
+        full = self._force_full or not self.tracks or self._frames_since_full >= self.detect_every
+        if full:
+            detections = self._full_detection(image)
+            self._frames_since_full = 0
+        else:
+            detections = []
+            for track in self.tracks:
+                detections.extend(self._roi_detection(image, track.box))
+            self._frames_since_full += 1
+
+        matched = self._match(detections)
+        lost = False
+        for t_idx, track in enumerate(self.tracks):
+            if t_idx in matched:
+                track.box = matched[t_idx]
+                track.missed = 0
+                track.hits += 1
+            else:
+                track.missed += 1
+                lost = True
+        self.tracks = [track for track in self.tracks if track.missed <= self.max_missed]
+
+        # Only full-frame detections may start new tracks (ROI hits overlapping
+        # an existing face would otherwise spawn duplicates)
+        if full:
+            self.tracks.extend(Track(next(self._ids), box) for box in detections)
+        # A lost track means the face moved out of its ROI: look at the whole frame next time
+        self._force_full = lost and not full
+        return [track for track in self.tracks if track.missed == 0]
+
+    def smooth(self, track: Track, result: dict, emotions: Sequence[str]) -> dict:
+        """Blend a fresh prediction into the track's running probabilities."""
+        probs = np.array([result["all_emotions"][emotion] for emotion in emotions], dtype=np.float64)
+        if track.probs is None:
+            track.probs = probs
+        else:
+            track.probs = self.smoothing * track.probs + (1.0 - self.smoothing) * probs
+        index = int(track.probs.argmax())
+        return {
+            "emotion": emotions[index],
+            "confidence": float(track.probs[index]),
+            "all_emotions": dict(zip(emotions, track.probs.tolist())),
+        }
+
+    def stats(self) -> dict:
+        return {
+            "tracks": len(self.tracks),
+            "full_detections": self.full_detections,
+            "roi_detections": self.roi_detections,
+        }
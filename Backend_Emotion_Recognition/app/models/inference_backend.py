@@ -0,0 +1,302 @@
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class InferenceBackend:
+    """Common interface for running an emotion model on a batch of inputs.
+
+    ``predict`` takes a float32-compatible array of shape ``(N, *input_shape)``
+    and returns the model outputs as a ``(N, num_classes)`` numpy array.
+    """
+
+    name = "base"
+
+    def __init__(self, input_shape: Tuple[int, ...], batch_buckets: Optional[Sequence[int]] = None):
+        self.input_shape = tuple(input_shape)
+        buckets = batch_buckets or settings.INFERENCE_BATCH_BUCKETS
+        self.batch_buckets = tuple(sorted({int(b) for b in buckets if int(b) > 0}))
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def bucket_for(self, n: int) -> int:
+        """Smallest batch bucket that fits ``n`` items (the largest bucket if none does)."""
+        for bucket in self.batch_buckets:
+            if n <= bucket:
+                return bucket
+        return self.batch_buckets[-1]
+
+    def warmup(self) -> Dict[int, float]:
+        """Run one inference per batch bucket so the first real request is not slow.
+
+        Returns warm-up time in seconds per bucket.
+        """
+        timings = {}
+        for bucket in self.batch_buckets:
+            started = time.perf_counter()
+            self.predict(np.zeros((bucket,) + self.input_shape, dtype=np.float32))
+            timings[bucket] = time.perf_counter() - started
+        logger.info(
+            f"{self.name} backend warmed up for input {self.input_shape}: "
+            + ", ".join(f"bs={b} {t * 1000:.1f}ms" for b, t in timings.items())
+        )
+        return timings
+
+
+class KerasPredictBackend(InferenceBackend):
+    """Eager ``model.predict()`` path (previous behaviour, kept for comparison)."""
+
+    name = "keras"
+
+    def __init__(self, model, input_shape, batch_buckets=None):
+        super().__init__(input_shape, batch_buckets)
+        self.model = model
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        return np.asarray(self.model.predict(batch, verbose=0))
+
+
+class GraphBackend(InferenceBackend):
+    """Traced ``tf.function`` path with one fixed input signature per batch bucket.
+
+    Batches are zero-padded up to the nearest bucket (and split into chunks of
+    the largest bucket) so only ``len(batch_buckets)`` graphs are ever traced and
+    no data adapter or per-call ``predict()`` machinery runs on the hot path.
+    """
+
+    name = "graph"
+
+    def __init__(self, model, input_shape, batch_buckets=None):
+        super().__init__(input_shape, batch_buckets)
+        import tensorflow as tf
+
+        self._tf = tf
+        self.model = model
+        self._fn = tf.function(lambda x: model(x, training=False), autograph=False)
+        self._concrete = {}
+        self._trace_lock = threading.Lock()
+
+    def _concrete_for(self, bucket: int):
+        fn = self._concrete.get(bucket)
+        if fn is None:
+            with self._trace_lock:
+                fn = self._concrete.get(bucket)
+                if fn is None:
+                    spec = self._tf.TensorSpec((bucket,) + self.input_shape, self._tf.float32)
+                    fn = self._fn.get_concrete_function(spec)
+                    self._concrete[bucket] = fn
+        return fn
+
+    def _run_bucket(self, chunk: np.ndarray) -> np.ndarray:
+        n = chunk.shape[0]
+        bucket = self.bucket_for(n)
+        if n < bucket:
+            padded = np.zeros((bucket,) + self.input_shape, dtype=np.float32)
+            padded[:n] = chunk
+            chunk = padded
+        outputs = self._concrete_for(bucket)(self._tf.constant(chunk))
+        return outputs.numpy()[:n]
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        batch = np.asarray(batch, dtype=np.float32).reshape((-1,) + self.input_shape)
+        max_bucket = self.batch_buckets[-1]
+        if batch.shape[0] <= max_bucket:
+            return self._run_bucket(batch)
+        return np.concatenate(
+            [self._run_bucket(batch[i:i + max_bucket]) for i in range(0, batch.shape[0], max_bucket)],
+            axis=0,
+        )
+
+
+class OnnxBackend(InferenceBackend):
+    """onnxruntime CPU session for a model exported with ``python -m app.models.export``."""
+
+    name = "onnx"
+
+    def __init__(self, model_path, input_shape, batch_buckets=None):
+        super().__init__(input_shape, batch_buckets)
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError("INFERENCE_BACKEND=onnx requires the onnxruntime package") from e
+
+        options = ort.SessionOptions()
+        if settings.INFERENCE_NUM_THREADS:
+            options.intra_op_num_threads = settings.INFERENCE_NUM_THREADS
+        self.session = ort.InferenceSession(
+            str(model_path), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+        logger.info(f"ONNX model loaded from {model_path}")
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        batch = np.ascontiguousarray(batch, dtype=np.float32).reshape((-1,) + self.input_shape)
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+def _tflite_interpreter_class():
+    """Prefer the standalone LiteRT / tflite-runtime interpreters so TensorFlow is not imported."""
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    try:
+        from tflite_runtime.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    try:
+        import tensorflow as tf
+        return tf.lite.Interpreter
+    except ImportError as e:
+        raise RuntimeError(
+            "INFERENCE_BACKEND=tflite requires ai-edge-litert, tflite-runtime or tensorflow"
+        ) from e
+
+
+class TFLiteBackend(InferenceBackend):
+    """TFLite interpreter, one interpreter per batch bucket (resized once, then reused).
+
+    Interpreters are not thread-safe, so each bucket is guarded by its own lock.
+    Quantized (int8/uint8) input and output tensors are handled using the
+    tensor quantization parameters.
+    """
+
+    name = "tflite"
+
+    def __init__(self, model_path, input_shape, batch_buckets=None):
+        super().__init__(input_shape, batch_buckets)
+        self.model_path = str(model_path)
+        self._interpreter_class = _tflite_interpreter_class()
+        self._interpreters = {}
+        self._locks = {bucket: threading.Lock() for bucket in self.batch_buckets}
+        self._create_lock = threading.Lock()
+        # Load the default bucket eagerly so a broken file fails at startup
+        self._interpreter_for(self.batch_buckets[0])
+        logger.info(f"TFLite model loaded from {model_path}")
+
+    def _interpreter_for(self, bucket: int):
+        entry = self._interpreters.get(bucket)
+        if entry is None:
+            with self._create_lock:
+                entry = self._interpreters.get(bucket)
+                if entry is None:
+                    kwargs = {}
+                    if settings.INFERENCE_NUM_THREADS:
+                        kwargs["num_threads"] = settings.INFERENCE_NUM_THREADS
+                    interpreter = self._interpreter_class(model_path=self.model_path, **kwargs)
+                    input_detail = interpreter.get_input_details()[0]
+                    interpreter.resize_tensor_input(input_detail["index"], [bucket, *self.input_shape])
+                    interpreter.allocate_tensors()
+                    entry = (
+                        interpreter,
+                        interpreter.get_input_details()[0],
+                        interpreter.get_output_details()[0],
+                    )
+                    self._interpreters[bucket] = entry
+        return entry
+
+    @staticmethod
+    def _quantize(batch: np.ndarray, detail) -> np.ndarray:
+        dtype = detail["dtype"]
+        if dtype == np.float32:
+            return batch
+        scale, zero_point = detail["quantization"]
+        info = np.iinfo(dtype)
+        return np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(dtype)
+
+    @staticmethod
+    def _dequantize(output: np.ndarray, detail) -> np.ndarray:
+        if output.dtype == np.float32:
+            return output
+        scale, zero_point = detail["quantization"]
+        return (output.astype(np.float32) - zero_point) * scale
+
+    def _run_bucket(self, chunk: np.ndarray) -> np.ndarray:
+        n = chunk.shape[0]
+        bucket = self.bucket_for(n)
+        if n < bucket:
+            padded = np.zeros((bucket,) + self.input_shape, dtype=np.float32)
+            padded[:n] = chunk
+            chunk = padded
+        interpreter, input_detail, output_detail = self._interpreter_for(bucket)
+        with self._locks[bucket]:
+            interpreter.set_tensor(input_detail["index"], self._quantize(chunk, input_detail))
+            interpreter.invoke()
+            output = interpreter.get_tensor(output_detail["index"])
+        return self._dequantize(output, output_detail)[:n]
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        batch = np.asarray(batch, dtype=np.float32).reshape((-1,) + self.input_shape)
+        max_bucket = self.batch_buckets[-1]
+        return np.concatenate(
+            [self._run_bucket(batch[i:i + max_bucket]) for i in range(0, batch.shape[0], max_bucket)],
+            axis=0,
+        )
+
+
+def create_backend(model, input_shape, kind: Optional[str] = None, batch_buckets=None) -> InferenceBackend:
+    """Wrap a loaded Keras model in the configured inference backend."""
+    kind = (kind or settings.INFERENCE_BACKEND).lower()
+    if kind == "keras":
+        return KerasPredictBackend(model, input_shape, batch_buckets)
+    if kind == "graph":
+        return GraphBackend(model, input_shape, batch_buckets)
+    raise ValueError(f"Unsupported inference backend for a Keras model: {kind}")
+
+
+QUANTIZED_PRECISIONS = ("dynamic", "float16", "int8")
+
+
+def quantized_path(tflite_path, precision: str) -> Path:
+    """``face_emotion_model.tflite`` -> ``face_emotion_model.int8.tflite``"""
+    path = Path(tflite_path)
+    return path.with_name(f"{path.stem}.{precision}{path.suffix}")
+
+
+def load_backend(
+    input_shape,
+    keras_loader: Callable[[], object],
+    onnx_path=None,
+    tflite_path=None,
+    kind: Optional[str] = None,
+    precision: str = "float32",
+) -> InferenceBackend:
+    """Build the configured backend for one model.
+
+    For ``onnx`` / ``tflite`` the exported file is served directly and the
+    Keras model (and TensorFlow) is never loaded; ``keras_loader`` is only
+    called for the ``keras`` / ``graph`` backends. A quantized ``precision``
+    always serves the matching quantized TFLite file.
+    """
+    precision = (precision or "float32").lower()
+    if precision != "float32":
+        if precision not in QUANTIZED_PRECISIONS:
+            raise ValueError(f"Unsupported model precision: {precision}")
+        path = _require_file(quantized_path(tflite_path, precision), f"--quantize {precision}")
+        return TFLiteBackend(path, input_shape)
+
+    kind = (kind or settings.INFERENCE_BACKEND).lower()
+    if kind == "onnx":
+        return OnnxBackend(_require_file(onnx_path, "--format onnx"), input_shape)
+    if kind == "tflite":
+        return TFLiteBackend(_require_file(tflite_path, "--format tflite"), input_shape)
+    return create_backend(keras_loader(), input_shape, kind)
+
+
+def _require_file(path, export_args: str) -> Path:
+    if path is None or not Path(path).exists():
+        raise FileNotFoundError(
+            f"No exported model at {path}; run `python -m app.models.export {export_args}` first"
+        )
+    return Path(path)
@@ -0,0 +1,205 @@
+"""Production runner: separate face and audio worker processes behind one dispatcher.
+
+Usage (from Backend_Emotion_Recognition/):
+    python -m app.runner --face-workers 2 --audio-workers 1 [--host 0.0.0.0] [--port 8000]
+                         [--threads N] [--pin-cores] [--tcp]
+
+Each worker is a uvicorn process started with SERVICE_ROLES set to its role,
+so it only imports and loads its own model, and listens on a Unix socket
+(``--tcp``: a localhost port, the default on Windows). The dispatcher
+(app.dispatcher) listens on --host/--port and forwards /face/* and /audio/*
+to the least busy worker of the matching pool. Workers that exit are
+restarted.
+
+Every worker pins TensorFlow, BLAS/OpenMP, OpenCV and ONNX Runtime / TFLite
+to ``--threads`` threads (default: CPU cores / total workers) so the workers
+do not oversubscribe the CPU. With ``--pin-cores`` (Linux) each worker is also
+bound to its own slice of cores.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import uvicorn
+
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+ROLES = ("face", "audio")
+
+# Thread-pool size variables read by the numeric libraries at import time
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMBA_NUM_THREADS",
+    "OPENCV_FOR_THREADS_NUM",
+    "TF_NUM_INTRAOP_THREADS",
+    "INFERENCE_NUM_THREADS",  # onnxruntime / tflite (app setting)
+)
+
+
+def thread_env(threads: int) -> Dict[str, str]:
+    """Environment that limits every native thread pool of a worker to ``threads``."""
+    env = {name: str(threads) for name in THREAD_ENV_VARS}
+    # Inter-op parallelism only helps graphs with independent branches; these models are sequential
+    env["TF_NUM_INTEROP_THREADS"] = "1"
+    return env
+
+
+class WorkerProcess:
+    """One uvicorn worker serving a single role."""
+
+    def __init__(self, role: str, index: int, address: str, threads: int, cores: Optional[List[int]] = None):
+        self.role = role
+        self.index = index
+        self.address = address
+        self.threads = threads
+        self.cores = cores
+        self.process: Optional[subprocess.Popen] = None
+        self.restarts = 0
+
+    @property
+    def name(self) -> str:
+        return f"{self.role}-{self.index}"
+
+    def command(self) -> List[str]:
+        command = [sys.executable, "-m", "uvicorn", "app.main:app", "--log-level", "warning"]
+        if self.address.startswith("http://"):
+            host, port = self.address[len("http://"):].rsplit(":", 1)
+            return command + ["--host", host, "--port", port]
+        return command + ["--uds", self.address]
+
+    def start(self):
+        if not self.address.startswith("http://"):
+            # A socket left behind by a crashed worker would make the bind fail
+            Path(self.address).unlink(missing_ok=True)
+        env = dict(os.environ, SERVICE_ROLES=f'["{self.role}"]', **thread_env(self.threads))
+        self.process = subprocess.Popen(self.command(), env=env)
+        if self.cores and hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(self.process.pid, self.cores)
+        logger.info(
+            f"Started {self.name} (pid {self.process.pid}) on {self.address}, "
+            f"{self.threads} thread(s){f', cores {self.cores}' if self.cores else ''}"
+        )
+
+    def stop(self, timeout: float = 10.0):
+        if self.process is None or self.process.poll() is not None:
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+class Supervisor:
+    """Start the workers and restart any that exit (with a short back-off)."""
+
+    def __init__(self, workers: List[WorkerProcess], restart_delay: float = 2.0):
+        self.workers = workers
+        self.restart_delay = restart_delay
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._watch, name="worker-supervisor", daemon=True)
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+        self._thread.start()
+
+    def _watch(self):
+        while not self._stopping.wait(1.0):
+            for worker in self.workers:
+                code = worker.process.poll()
+                if code is None or self._stopping.is_set():
+                    continue
+                logger.error(f"Worker {worker.name} exited with code {code}; restarting")
+                time.sleep(self.restart_delay)
+                worker.restarts += 1
+                worker.start()
+
+    def stop(self):
+        self._stopping.set()
+        self._thread.join(timeout=2.0)
+        for worker in self.workers:
+            worker.stop()
+
+
+def plan_workers(
+    counts: Dict[str, int],
+    threads: Optional[int],
+    pin_cores: bool,
+    socket_dir: Path,
+    tcp_base_port: Optional[int],
+) -> List[WorkerProcess]:
+    """Assign each worker its address, thread count and (optionally) a slice of cores."""
+    total = sum(counts.values())
+    if total == 0:
+        raise ValueError("At least one face or audio worker is required")
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+    threads = threads or max(1, len(cpus) // total)
+
+    workers, slot = [], 0
+    for role in ROLES:
+        for index in range(counts.get(role, 0)):
+            if tcp_base_port is not None:
+                address = f"http://127.0.0.1:{tcp_base_port + slot}"
+            else:
+                address = str(socket_dir / f"{role}-{index}.sock")
+            cores = None
+            if pin_cores:
+                # Disjoint slices while there are enough cores, wrapping around otherwise
+                cores = [cpus[(slot * threads + i) % len(cpus)] for i in range(threads)]
+            workers.append(WorkerProcess(role, index, address, threads, cores))
+            slot += 1
+    return workers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--face-workers", type=int, default=1)
+    parser.add_argument("--audio-workers", type=int, default=1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--threads", type=int, default=0, help="native threads per worker (0 = cores / workers)")
+    parser.add_argument("--pin-cores", action="store_true", help="bind each worker to its own cores (Linux)")
+    parser.add_argument("--tcp", action="store_true", default=os.name == "nt",
+                        help="workers listen on localhost ports instead of Unix sockets")
+    parser.add_argument("--tcp-base-port", type=int, default=8100)
+    parser.add_argument("--socket-dir", type=Path, default=None)
+    args = parser.parse_args()
+
+    socket_dir = args.socket_dir or Path(tempfile.mkdtemp(prefix="emotion-api-"))
+    socket_dir.mkdir(parents=True, exist_ok=True)
+    workers = plan_workers(
+        {"face": args.face_workers, "audio": args.audio_workers},
+        args.threads,
+        args.pin_cores,
+        socket_dir,
+        args.tcp_base_port if args.tcp else None,
+    )
+
+    # Imported after planning so the dispatcher process itself stays light
+    from app.dispatcher import create_dispatcher
+
+    pools = {role: [worker.address for worker in workers if worker.role == role] for role in ROLES}
+    supervisor = Supervisor(workers)
+    supervisor.start()
+    try:
+        uvicorn.run(create_dispatcher(pools), host=args.host, port=args.port)
+    finally:
+        logger.info("Stopping workers")
+        supervisor.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Dict
+from typing import Dict, List, Optional
 
 
 class AudioResponse(BaseModel):
@@ -11,3 +11,18 @@ class AudioResponse(BaseModel):
 class AudioUploadResponse(BaseModel):
     message: str
     file_path: str
+
+
+class AudioBatchItem(BaseModel):
+    index: int
+    filename: Optional[str] = None
+    emotion: Optional[str] = None
+    confidence: Optional[float] = None
+    all_emotions: Optional[Dict[str, float]] = None
+    error: Optional[str] = None
+
+
+class AudioBatchResponse(BaseModel):
+    results: List[AudioBatchItem]
+    total: int
+    failed: int
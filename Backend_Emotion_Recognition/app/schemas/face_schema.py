@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 class FaceLocationDetailed(BaseModel):
     left: int
@@ -16,4 +16,17 @@ class FaceDetectResponse(BaseModel):
     faces: List[DetectedFace]
     total_faces: int
     image_width: int
+    image_height: int
+
+class AnalyzedFace(BaseModel):
+    face_id: int
+    location: FaceLocationDetailed
+    emotion: str
+    confidence: float  # 0..1
+    all_emotions: Dict[str, float]
+
+class FaceAnalyzeResponse(BaseModel):
+    faces: List[AnalyzedFace]
+    total_faces: int
+    image_width: int
     image_height: int
\ No newline at end of file
@@ -0,0 +1,220 @@
+import io
+import math
+import os
+import tempfile
+import warnings
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+# AUDIO_RESAMPLER -> soxr quality (same names as librosa's res_type)
+AUDIO_RESAMPLERS = {
+    "soxr_vhq": "VHQ",
+    "soxr_hq": "HQ",
+    "soxr_mq": "MQ",
+    "soxr_lq": "LQ",
+    "soxr_qq": "QQ",
+}
+
+
+def resampler_quality(name: Optional[str] = None) -> str:
+    name = (name or settings.AUDIO_RESAMPLER).lower()
+    if name not in AUDIO_RESAMPLERS:
+        raise ValueError(f"Unknown AUDIO_RESAMPLER '{name}' (expected one of {', '.join(AUDIO_RESAMPLERS)})")
+    return AUDIO_RESAMPLERS[name]
+
+
+def resample(data: np.ndarray, orig_sr: int, target_sr: int, resampler: Optional[str] = None) -> np.ndarray:
+    """Resample a mono signal with soxr; output length matches ``librosa.resample`` (fix=True)."""
+    if orig_sr == target_sr:
+        return data
+    import soxr
+
+    out = soxr.resample(data, orig_sr, target_sr, quality=resampler_quality(resampler))
+    size = int(math.ceil(data.shape[0] * target_sr / orig_sr))
+    if out.shape[0] > size:
+        return out[:size]
+    if out.shape[0] < size:
+        return np.pad(out, (0, size - out.shape[0]))
+    return out
+
+
+class BufferReader(io.RawIOBase):
+    """Seekable read-only file over any bytes-like object.
+
+    ``io.BytesIO`` copies everything but ``bytes``; this reads a memoryview
+    (app.utils.upload) in place, and ``readinto`` lets soundfile fill its
+    own buffers directly.
+    """
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer).cast("B")
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        count = max(0, min(len(b), self._view.nbytes - self._pos))
+        b[:count] = self._view[self._pos:self._pos + count]
+        self._pos += count
+        return count
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self._view.nbytes}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+
+def open_buffer(contents):
+    return io.BytesIO(contents) if isinstance(contents, bytes) else BufferReader(contents)
+
+
+def sniff_container(contents: bytes) -> str:
+    """Best-effort container type from the first bytes of an upload."""
+    head = bytes(contents[:16])
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[:4] == b"fLaC":
+        return "flac"
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[:3] == b"ID3" or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return "mp3"
+    if head[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"  # EBML: WebM / Matroska (MediaRecorder's audio/webm, .weba)
+    if head[4:8] == b"ftyp":
+        return "mp4"
+    return "unknown"
+
+
+def _decode_soundfile(contents: bytes, duration: Optional[float], offset: float) -> Tuple[np.ndarray, int]:
+    """Read only the [offset, offset + duration) segment with libsndfile (WAV, FLAC, OGG, MP3)."""
+    import soundfile as sf
+
+    with sf.SoundFile(open_buffer(contents)) as audio_file:
+        sr = audio_file.samplerate
+        if offset:
+            audio_file.seek(min(int(offset * sr), audio_file.frames))
+        frames = int(duration * sr) if duration is not None else -1
+        data = audio_file.read(frames=frames, dtype="float32", always_2d=True)
+    return data.mean(axis=1) if data.shape[1] > 1 else data[:, 0], sr
+
+
+def iter_av_samples(source: BinaryIO, target_sr: int) -> Iterator[np.ndarray]:
+    """Decode WebM/Opus, MP4/AAC... frame by frame with PyAV (libav), as mono float32 at ``target_sr``.
+
+    libswresample converts to mono ``target_sr`` while decoding; closing the
+    generator early stops decoding and closes the container.
+    """
+    import av
+
+    with av.open(source, mode="r") as container:
+        if not container.streams.audio:
+            raise ValueError("File has no audio stream")
+        stream = container.streams.audio[0]
+        resampler = av.AudioResampler(format="flt", layout="mono", rate=target_sr)
+        for frame in container.decode(stream):
+            for out in resampler.resample(frame):
+                yield out.to_ndarray().reshape(-1)
+        for out in resampler.resample(None):
+            yield out.to_ndarray().reshape(-1)
+
+
+def _decode_av(contents: bytes, target_sr: int, duration: Optional[float], offset: float) -> np.ndarray:
+    """Decode with PyAV, stopping as soon as ``offset + duration`` seconds are available."""
+    skip = int(offset * target_sr)
+    wanted = skip + int(duration * target_sr) if duration is not None else None
+    chunks, total = [], 0
+    samples = iter_av_samples(open_buffer(contents), target_sr)
+    try:
+        for chunk in samples:
+            chunks.append(chunk)
+            total += chunk.shape[0]
+            if wanted is not None and total >= wanted:
+                break
+    finally:
+        samples.close()
+    data = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32)
+    return data[skip:wanted]
+
+
+def _decode_audioread(contents: bytes, container: str, target_sr: int, duration: Optional[float],
+                      offset: float) -> np.ndarray:
+    """Fallback for WebM / MP4 without PyAV: librosa via audioread (an ffmpeg or GStreamer install).
+
+    audioread only opens paths, so the upload is spilled to a temporary file.
+    """
+    import librosa
+
+    fd, path = tempfile.mkstemp(suffix=f".{container}")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(contents)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")  # "PySoundFile failed. Trying audioread instead."
+            data, _ = librosa.load(path, sr=target_sr, duration=duration, offset=offset)
+        return data
+    finally:
+        os.unlink(path)
+
+
+def decode_audio(contents: bytes, target_sr: int, duration: Optional[float] = None,
+                 offset: float = 0.0, resampler: Optional[str] = None) -> Tuple[np.ndarray, int]:
+    """Decode an upload to mono float32 at ``target_sr``, reading only the needed segment.
+
+    WAV / FLAC / OGG / MP3 are read by libsndfile (seek to ``offset``, read
+    ``duration``), then resampled with soxr (AUDIO_RESAMPLER). WebM / MP4 go
+    through PyAV, or through audioread (a system ffmpeg) when PyAV is not
+    installed. Same samples as ``librosa.load(...,
+    sr=target_sr, duration=duration, offset=offset)`` for the libsndfile
+    formats, without importing librosa.
+
+    Args:
+        contents: Raw upload bytes (any bytes-like object, read without copying).
+        target_sr: Output sample rate.
+        duration: Seconds to read (None = to the end).
+        offset: Seconds to skip first.
+        resampler: Overrides AUDIO_RESAMPLER.
+
+    Returns:
+        (waveform, target_sr). Raises ValueError when the audio cannot be decoded.
+    """
+    container = sniff_container(contents)
+    if container not in ("webm", "mp4"):
+        import soundfile as sf
+
+        try:
+            data, sr = _decode_soundfile(contents, duration, offset)
+            return resample(data, sr, target_sr, resampler), target_sr
+        except sf.LibsndfileError as e:
+            soundfile_error = e.error_string
+        except RuntimeError as e:
+            soundfile_error = str(e)
+    else:
+        soundfile_error = None
+
+    try:
+        import av  # noqa: F401
+    except ImportError:
+        if soundfile_error is not None:
+            raise ValueError(soundfile_error)
+        try:
+            return _decode_audioread(contents, container, target_sr, duration, offset), target_sr
+        except Exception as e:
+            reason = str(e) or type(e).__name__
+            raise ValueError(f"Cannot decode {container} audio without PyAV (pip install av) or ffmpeg: {reason}")
+    try:
+        return _decode_av(contents, target_sr, duration, offset), target_sr
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Cannot decode {container} audio: {e}")
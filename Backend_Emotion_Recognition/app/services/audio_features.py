@@ -0,0 +1,228 @@
+from functools import lru_cache
+from typing import Dict, Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def _hz_to_mel(freqs: np.ndarray) -> np.ndarray:
+    """Slaney mel scale (librosa ``htk=False``): linear below 1 kHz, logarithmic above."""
+    freqs = np.atleast_1d(np.asarray(freqs, dtype=np.float64))
+    f_sp = 200.0 / 3
+    mels = freqs / f_sp
+    min_log_hz, min_log_mel, logstep = 1000.0, 1000.0 / f_sp, np.log(6.4) / 27.0
+    log_t = freqs >= min_log_hz
+    mels[log_t] = min_log_mel + np.log(freqs[log_t] / min_log_hz) / logstep
+    return mels
+
+
+def _mel_to_hz(mels: np.ndarray) -> np.ndarray:
+    mels = np.atleast_1d(np.asarray(mels, dtype=np.float64))
+    f_sp = 200.0 / 3
+    freqs = f_sp * mels
+    min_log_hz, min_log_mel, logstep = 1000.0, 1000.0 / f_sp, np.log(6.4) / 27.0
+    log_t = mels >= min_log_mel
+    freqs[log_t] = min_log_hz * np.exp(logstep * (mels[log_t] - min_log_mel))
+    return freqs
+
+
+def mel_basis(sr: int, n_fft: int, n_mels: int = 128) -> np.ndarray:
+    """Slaney-normalized mel filterbank, (n_mels, 1 + n_fft // 2); same as ``librosa.filters.mel``."""
+    fft_freqs = np.fft.rfftfreq(n_fft, 1.0 / sr)
+    low, high = _hz_to_mel([0.0, sr / 2.0])
+    mel_f = _mel_to_hz(np.linspace(low, high, n_mels + 2))
+    fdiff = np.diff(mel_f)
+    ramps = np.subtract.outer(mel_f, fft_freqs)
+    lower = -ramps[:-2] / fdiff[:-1, None]
+    upper = ramps[2:] / fdiff[1:, None]
+    weights = np.maximum(0.0, np.minimum(lower, upper))
+    weights *= (2.0 / (mel_f[2:] - mel_f[:-2]))[:, None]
+    return weights
+
+
+def dct_matrix(n_out: int, n_in: int) -> np.ndarray:
+    """Orthonormal DCT-II as an (n_out, n_in) matrix (``scipy.fftpack.dct(norm="ortho")``, first n_out rows)."""
+    k = np.arange(n_out)[:, None]
+    n = np.arange(n_in)[None, :]
+    basis = np.cos(np.pi * k * (2 * n + 1) / (2.0 * n_in)) * np.sqrt(2.0 / n_in)
+    basis[0] /= np.sqrt(2.0)
+    return basis
+
+
+class AudioFeatureExtractor:
+    """ZCR + RMS + MFCC features from one framing of the waveform.
+
+    Produces the same vector as the librosa pipeline used in training
+    (``zero_crossing_rate``, ``rms`` and ``mfcc`` with centered 2048/512
+    frames, laid out as [zcr | rms | mfcc frame by frame]) but frames the
+    signal once: RMS and the STFT share the zero-padded frames, ZCR is a
+    running sum of sign changes, and the Hann window, mel filterbank and DCT
+    matrix are built once per extractor.
+
+    Stateless after construction, so one instance can be shared by threads.
+    """
+
+    def __init__(self, sr: int = 22050, n_mfcc: int = 20, frame_length: int = 2048, hop_length: int = 512,
+                 n_mels: int = 128):
+        self.sr = sr
+        self.n_mfcc = n_mfcc
+        self.frame_length = frame_length
+        self.hop_length = hop_length
+        # Periodic Hann window (librosa / scipy ``get_window("hann", fftbins=True)``)
+        self.window = 0.5 - 0.5 * np.cos(2.0 * np.pi * np.arange(frame_length) / frame_length)
+        # mel power -> MFCC in one product: (n_mels, n_mfcc)
+        self.mel_basis_t = np.ascontiguousarray(mel_basis(sr, frame_length, n_mels).T)
+        self.dct_t = np.ascontiguousarray(dct_matrix(n_mfcc, n_mels).T)
+
+    def n_frames(self, n_samples: int) -> int:
+        return 1 + n_samples // self.hop_length
+
+    def feature_size(self, n_samples: int) -> int:
+        return self.n_frames(n_samples) * (2 + self.n_mfcc)
+
+    def _zcr(self, data: np.ndarray, n_frames: int) -> np.ndarray:
+        pad = self.frame_length // 2
+        # Edge padding as in librosa; values within 1e-10 of zero count as positive
+        padded = np.pad(data, pad, mode="edge")
+        signs = np.signbit(np.where(np.abs(padded) <= 1e-10, 0.0, padded))
+        crossings = np.concatenate(([0], np.cumsum(signs[1:] != signs[:-1])))
+        starts = np.arange(n_frames) * self.hop_length
+        # A frame's first sample never counts as a crossing
+        counts = crossings[starts + self.frame_length - 1] - crossings[starts]
+        return counts / self.frame_length
+
+    def _output(self, natural: int, size: Optional[int], out: Optional[np.ndarray]) -> np.ndarray:
+        size = natural if size is None else size
+        if out is None:
+            return np.zeros(size, dtype=np.float64)
+        if out.shape != (size,):
+            raise ValueError(f"out must have shape ({size},), got {out.shape}")
+        out[natural:] = 0.0
+        return out
+
+    def _frames(self, data: np.ndarray, n_frames: int) -> np.ndarray:
+        """Centered, zero-padded frames shared by RMS and the STFT (views, no copy)."""
+        pad = self.frame_length // 2
+        padded = np.pad(data, pad, mode="constant")
+        return sliding_window_view(padded, self.frame_length)[:: self.hop_length][:n_frames]
+
+    def _mel_power(self, frames: np.ndarray) -> np.ndarray:
+        """Mel power spectrum per frame, (n_frames, n_mels)."""
+        spectrum = np.fft.rfft(frames * self.window, axis=1)
+        power = spectrum.real ** 2
+        power += spectrum.imag ** 2
+        return power @ self.mel_basis_t
+
+    def _assemble(self, data: np.ndarray, frames: np.ndarray, mel_power: np.ndarray, out: np.ndarray) -> np.ndarray:
+        mel_db = np.log10(np.maximum(mel_power, 1e-10))
+        mel_db *= 10.0
+        np.maximum(mel_db, mel_db.max() - 80.0, out=mel_db)  # top_db=80
+
+        # Each block is written straight into the output, truncated to its size
+        size = out.shape[0]
+        blocks = (
+            self._zcr(data, frames.shape[0]),
+            np.sqrt(np.einsum("ij,ij->i", frames, frames) / self.frame_length),
+            (mel_db @ self.dct_t).ravel(),  # frame-major, like mfcc.T.ravel()
+        )
+        offset = 0
+        for block in blocks:
+            if offset >= size:
+                break
+            count = min(block.shape[0], size - offset)
+            out[offset:offset + count] = block[:count]
+            offset += count
+        return out
+
+    def extract(self, data: np.ndarray, size: Optional[int] = None, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Feature vector of one mono waveform.
+
+        Args:
+            data: Mono waveform at ``self.sr``.
+            size: Length of the returned vector; features are truncated or
+                zero-padded to it (None = natural length).
+            out: Optional preallocated float64 vector of length ``size``.
+
+        Returns:
+            The feature vector (``out`` when given).
+        """
+        data = np.asarray(data, dtype=np.float64).ravel()
+        if data.size == 0:
+            raise ValueError("Audio contains no samples")
+        n_frames = self.n_frames(data.shape[0])
+        out = self._output(n_frames * (2 + self.n_mfcc), size, out)
+        frames = self._frames(data, n_frames)
+        return self._assemble(data, frames, self._mel_power(frames), out)
+
+
+class StreamingFeatureExtractor:
+    """Features of successive overlapping windows of one audio stream.
+
+    An STFT frame that does not reach into a window's zero padding depends
+    only on the samples under it. When window starts are multiples of
+    ``hop_length``, consecutive windows share those frames at the same stream
+    positions, so their mel power is computed once and reused. Edge frames,
+    ZCR, RMS and the dB scaling (``top_db`` is per window) are redone for
+    every window, and the result equals ``AudioFeatureExtractor.extract`` on
+    the same samples.
+
+    Caches at most one window of frames. Not thread-safe: one per stream.
+    """
+
+    def __init__(self, extractor: AudioFeatureExtractor, window: int):
+        self.extractor = extractor
+        self.window = int(window)
+        self.n_frames = extractor.n_frames(self.window)
+        half, hop = extractor.frame_length // 2, extractor.hop_length
+        # Local frame indices whose samples all lie inside the window
+        self._inner = range(-(-half // hop), (self.window - half) // hop + 1)
+        self._cache: Dict[int, np.ndarray] = {}  # stream frame index -> mel power row
+        self.frames_computed = 0
+        self.frames_reused = 0
+
+    @property
+    def nbytes(self) -> int:
+        return sum(row.nbytes for row in self._cache.values())
+
+    def reset(self):
+        self._cache = {}
+
+    def extract(self, start: int, data: np.ndarray, size: Optional[int] = None,
+                out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Feature vector of the window starting at stream sample ``start``.
+
+        Windows of another length (a flushed partial window) or unaligned
+        starts are extracted from scratch.
+        """
+        extractor = self.extractor
+        data = np.asarray(data, dtype=np.float64).ravel()
+        if data.shape[0] != self.window or start % extractor.hop_length:
+            self.frames_computed += extractor.n_frames(data.shape[0])
+            return extractor.extract(data, size, out)
+
+        first = start // extractor.hop_length
+        frames = extractor._frames(data, self.n_frames)
+        mel_power = np.empty((self.n_frames, extractor.mel_basis_t.shape[1]))
+        missing = []
+        for k in range(self.n_frames):
+            row = self._cache.get(first + k) if k in self._inner else None
+            if row is None:
+                missing.append(k)
+            else:
+                mel_power[k] = row
+        if missing:
+            mel_power[missing] = extractor._mel_power(frames[missing])
+        self.frames_computed += len(missing)
+        self.frames_reused += self.n_frames - len(missing)
+        # Only this window's interior frames can be shared with later windows
+        self._cache = {first + k: mel_power[k] for k in self._inner}
+
+        out = extractor._output(self.n_frames * (2 + extractor.n_mfcc), size, out)
+        return extractor._assemble(data, frames, mel_power, out)
+
+
+@lru_cache(maxsize=8)
+def get_feature_extractor(sr: int = 22050, n_mfcc: int = 20, frame_length: int = 2048,
+                          hop_length: int = 512) -> AudioFeatureExtractor:
+    """Shared extractor per configuration (built once per process, including pool workers)."""
+    return AudioFeatureExtractor(sr, n_mfcc, frame_length, hop_length)
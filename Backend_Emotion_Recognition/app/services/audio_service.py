@@ -1,22 +1,108 @@
+import asyncio
 import os
-import io
 import pickle
+import threading
+import time
 from pathlib import Path
 
 import numpy as np
-import librosa
 from fastapi import UploadFile, HTTPException
 
+from app.core.cache import get_cache, make_key, model_fingerprint
 from app.core.config import settings
+from app.core.executor import get_executor
 from app.core.logger import setup_logger
+from app.core.metrics import stage
+from app.models.inference_backend import QUANTIZED_PRECISIONS, load_backend, quantized_path
+from app.services.audio_decode import decode_audio, resample
+from app.services.audio_features import StreamingFeatureExtractor, get_feature_extractor
+from app.services.audio_timeline import SlidingWindows, iter_resampled_blocks, summarize
 from app.utils.image_utils import save_upload_file
+from app.utils.upload import read_upload
 
-os.environ["TF_ENABLE_ONEDNN_OPTS"] = "0"
+logger = setup_logger(__name__)
 
-import tensorflow as tf
-from tensorflow.keras.models import model_from_json
 
-logger = setup_logger(__name__)
+# ---------------------------------------------------------------------- #
+# Decode + feature extraction (module-level so they can run in a process pool)
+# librosa (numba, scipy, sklearn...) is imported on first use, not with the app
+# ---------------------------------------------------------------------- #
+def _zcr(data, frame_length=2048, hop_length=512):
+    import librosa
+
+    z = librosa.feature.zero_crossing_rate(data, frame_length=frame_length, hop_length=hop_length)
+    return np.squeeze(z)
+
+
+def _rmse(data, frame_length=2048, hop_length=512):
+    import librosa
+
+    r = librosa.feature.rms(y=data, frame_length=frame_length, hop_length=hop_length)
+    return np.squeeze(r)
+
+
+def _mfcc(data, sr, n_mfcc=20, flatten: bool = True):
+    import librosa
+
+    m = librosa.feature.mfcc(y=data, sr=sr, n_mfcc=n_mfcc)
+    return np.squeeze(m.T) if not flatten else np.ravel(m.T)
+
+
+def extract_features_librosa(data, sr=22050, n_mfcc=20, frame_length=2048, hop_length=512):
+    """Reference librosa pipeline (as in the training notebook); see extract_features."""
+    result = np.array([])
+    result = np.hstack(
+        (
+            result,
+            _zcr(data, frame_length, hop_length),
+            _rmse(data, frame_length, hop_length),
+            _mfcc(data, sr, n_mfcc),
+        )
+    )
+    return result
+
+
+def extract_features(data, sr=22050, n_mfcc=20, frame_length=2048, hop_length=512, size=None):
+    """ZCR + RMS + MFCC vector, same values as extract_features_librosa from a single STFT.
+
+    With ``size`` the vector is truncated / zero-padded to that length in place.
+    """
+    return get_feature_extractor(sr, n_mfcc, frame_length, hop_length).extract(data, size=size)
+
+
+def load_waveform(contents: bytes, target_sr: int, duration: float, offset: float):
+    """Decode audio bytes (sr, duration & offset giống notebook), see audio_decode.decode_audio."""
+    return decode_audio(contents, target_sr, duration=duration, offset=offset)
+
+
+def decode_and_extract(contents: bytes, target_sr: int, duration: float, offset: float, n_mfcc: int, size=None):
+    """Decode audio bytes and return the raw (unscaled) feature vector, ``size`` long if given.
+
+    Raises ValueError if the audio cannot be decoded.
+    """
+    try:
+        with stage("audio.decode"):
+            data, sr = load_waveform(contents, target_sr, duration, offset)
+    except Exception as e:
+        raise ValueError(f"Cannot read audio file: {e}")
+
+    with stage("audio.extract"):
+        return extract_features(data, sr, n_mfcc, size=size)
+
+
+def decode_and_extract_many(clips, target_sr: int, duration: float, offset: float, n_mfcc: int, size: int):
+    """decode_and_extract for a chunk of clips (one process-pool task).
+
+    Returns one entry per clip, in order: the feature vector, or the error
+    message (str) when that clip cannot be decoded.
+    """
+    results = []
+    for contents in clips:
+        try:
+            results.append(decode_and_extract(contents, target_sr, duration, offset, n_mfcc, size))
+        except Exception as e:
+            results.append(str(e))
+    return results
 
 
 class AudioService:
@@ -24,6 +110,8 @@ class AudioService:
 
     def __init__(self):
         self.model = None
+        self.backend = None
+        self._load_lock = threading.Lock()
 
         # fallback nếu không có encoder
         self.emotions = ["angry", "disgust", "fear", "happy", "neutral", "sad", "surprise"]
@@ -33,35 +121,61 @@ class AudioService:
 
         # giống notebook
         self.n_mfcc = 20
+        self.hop_length = 512
         self.expected_size = 2376
         self.duration = 2.5
         self.offset = 0.6
         self.target_sr = 22050
 
+        # Decode, feature extraction and inference run here, never on the event loop
+        self.executor = get_executor("audio")
+        # Feature extraction for /audio/predict-batch (a process pool by default)
+        self.batch_executor = get_executor("audio_batch")
+
+        # Results of identical clips are served from the cache (None when disabled)
+        self.cache = get_cache("audio")
+        self.version = self._model_version()
+
+    def _model_version(self) -> str:
+        """Fingerprint of every file the served model depends on (invalidates cached results)."""
+        audio_dir = settings.MODEL_DIR / "audio"
+        files = [
+            audio_dir / "CNN_model.json",
+            audio_dir / "best_model1_weights.h5",
+            audio_dir / "scaler2.pickle",
+            audio_dir / "encoder2.pickle",
+            Path(settings.AUDIO_ONNX_PATH),
+            Path(settings.AUDIO_TFLITE_PATH),
+        ]
+        if settings.AUDIO_MODEL_PRECISION in QUANTIZED_PRECISIONS:
+            files.append(quantized_path(settings.AUDIO_TFLITE_PATH, settings.AUDIO_MODEL_PRECISION))
+        return model_fingerprint(settings.INFERENCE_BACKEND, settings.AUDIO_MODEL_PRECISION, *files)
+
     # ------------------------------------------------------------------ #
     # 1. Load model + scaler + encoder
     # ------------------------------------------------------------------ #
-    def _load_model(self):
+    def _load_model(self, warmup=None):
         if self.model is not None:
             return self.model
+        # executor threads may race on the first request
+        with self._load_lock:
+            if self.model is None:
+                self._load_model_files(warmup)
+        return self.model
 
-        json_path = settings.MODEL_DIR / "audio" / "CNN_model.json"
-        weights_path = settings.MODEL_DIR / "audio" / "best_model1_weights.h5"
-
-        if not json_path.exists():
-            raise FileNotFoundError(f"Không tìm thấy JSON model tại {json_path}")
-        if not weights_path.exists():
-            raise FileNotFoundError(f"Không tìm thấy file weights tại {weights_path}")
-
-        try:
-            with open(json_path, "r") as f:
-                model_json = f.read()
-            self.model = model_from_json(model_json)
-            self.model.load_weights(str(weights_path))
-            logger.info("Model audio loaded from JSON + weights.")
-        except Exception as e:
-            logger.error(f"Lỗi khi load model JSON + weights: {e}")
-            raise
+    def warmup(self):
+        """Warm up the model for every batch bucket (seconds per bucket)."""
+        self._load_model()
+        return self.backend.warmup()
+
+    def _load_model_files(self, warmup=None):
+        backend = load_backend(
+            (self.expected_size, 1),
+            self._load_keras_model,
+            onnx_path=settings.AUDIO_ONNX_PATH,
+            tflite_path=settings.AUDIO_TFLITE_PATH,
+            precision=settings.AUDIO_MODEL_PRECISION,
+        )
 
         # scaler + encoder (giống Colab)
         scaler_path = settings.MODEL_DIR / "audio" / "scaler2.pickle"
@@ -84,49 +198,46 @@ class AudioService:
         except Exception as e:
             logger.warning(f"Could not load scaler/encoder: {e}")
 
-        return self.model
-
-    # ------------------------------------------------------------------ #
-    # 2. Feature extraction
-    # ------------------------------------------------------------------ #
-    def _zcr(self, data, frame_length=2048, hop_length=512):
-        z = librosa.feature.zero_crossing_rate(data, frame_length=frame_length, hop_length=hop_length)
-        return np.squeeze(z)
+        if settings.INFERENCE_WARMUP if warmup is None else warmup:
+            backend.warmup()
 
-    def _rmse(self, data, frame_length=2048, hop_length=512):
-        r = librosa.feature.rms(y=data, frame_length=frame_length, hop_length=hop_length)
-        return np.squeeze(r)
+        # publish the backend last so other threads never see it without scaler/encoder
+        self.backend = backend
+        self.model = getattr(backend, "model", backend)
 
-    def _mfcc(self, data, sr, frame_length=2048, hop_length=512, flatten: bool = True):
-        m = librosa.feature.mfcc(y=data, sr=sr, n_mfcc=self.n_mfcc)
-        return np.squeeze(m.T) if not flatten else np.ravel(m.T)
+    def _load_keras_model(self):
+        json_path = settings.MODEL_DIR / "audio" / "CNN_model.json"
+        weights_path = settings.MODEL_DIR / "audio" / "best_model1_weights.h5"
 
-    def _extract_features(self, data, sr=22050, frame_length=2048, hop_length=512):
-        result = np.array([])
-        result = np.hstack(
-            (
-                result,
-                self._zcr(data, frame_length, hop_length),
-                self._rmse(data, frame_length, hop_length),
-                self._mfcc(data, sr, frame_length, hop_length),
-            )
-        )
-        return result
+        if not json_path.exists():
+            raise FileNotFoundError(f"Không tìm thấy JSON model tại {json_path}")
+        if not weights_path.exists():
+            raise FileNotFoundError(f"Không tìm thấy file weights tại {weights_path}")
 
-    def _get_predict_feat_from_waveform(self, data, sr):
-        """
-        data, sr đã được librosa.load(..., sr=22050, duration, offset)
-        """
-        if sr != self.target_sr:
-            logger.warning(f"Expected sr={self.target_sr}, but got {sr}. Resampling...")
-            data = librosa.resample(data, orig_sr=sr, target_sr=self.target_sr)
-            sr = self.target_sr
+        # chỉ backend keras / graph cần TensorFlow
+        os.environ.setdefault("TF_ENABLE_ONEDNN_OPTS", "0")
+        from tensorflow.keras.models import model_from_json
 
+        try:
+            with open(json_path, "r") as f:
+                model_json = f.read()
+            model = model_from_json(model_json)
+            model.load_weights(str(weights_path))
+            logger.info("Model audio loaded from JSON + weights.")
+            return model
+        except Exception as e:
+            logger.error(f"Lỗi khi load model JSON + weights: {e}")
+            raise
 
-        logger.info(f"Waveform after librosa.load: {data.shape[0]} samples, sr={sr}")
+    # ------------------------------------------------------------------ #
+    # 2. Feature extraction
+    # ------------------------------------------------------------------ #
+    def _extract_features(self, data, sr=22050, frame_length=2048, hop_length=512):
+        return extract_features(data, sr, self.n_mfcc, frame_length, hop_length, size=self.expected_size)
 
-        res = self._extract_features(data, sr)
-        result = np.array(res)
+    def _prepare_features(self, res):
+        """Pad / truncate raw features, apply the scaler and reshape to (1, 2376, 1)."""
+        result = np.asarray(res)
 
         # pad / truncate về expected_size = 2376
         if result.shape[0] < self.expected_size:
@@ -149,6 +260,56 @@ class AudioService:
         final_result = np.expand_dims(i_result, axis=2)
         return final_result.astype("float32")
 
+    def _get_predict_feat_from_waveform(self, data, sr):
+        """
+        data, sr đã được decode (sr=22050, duration, offset)
+        """
+        if sr != self.target_sr:
+            logger.warning(f"Expected sr={self.target_sr}, but got {sr}. Resampling...")
+            data = resample(data, sr, self.target_sr)
+            sr = self.target_sr
+
+        logger.info(f"Waveform after decode: {data.shape[0]} samples, sr={sr}")
+
+        return self._prepare_features(self._extract_features(data, sr))
+
+    def _infer(self, raw_features):
+        """Scale features and run the model (blocking; called on the executor)."""
+        self._load_model()
+        feat_arr = self._prepare_features(raw_features)
+        return self.backend.predict(feat_arr)
+
+    def _infer_batch(self, features: np.ndarray):
+        """Scale an (N, 2376) feature matrix with one scaler call and run one batched forward pass."""
+        self._load_model()
+        if self.scaler is not None:
+            try:
+                features = self.scaler.transform(features)
+            except Exception as e:
+                logger.warning(f"Scaler transform failed, using raw features: {e}")
+        batch = np.asarray(features, dtype=np.float32)[:, :, np.newaxis]
+        return np.asarray(self.backend.predict(batch)).reshape(len(batch), -1)
+
+    def _results_from_preds(self, preds: np.ndarray) -> list:
+        """Turn an (N, n_classes) probability matrix into result dicts (encoder label order)."""
+        if self.encoder is not None and hasattr(self.encoder, "categories_"):
+            labels = list(self.encoder.categories_[0])
+            # inverse_transform of the probabilities picks the arg-max label per row
+            predicted = [row[0] for row in self.encoder.inverse_transform(preds)]
+        else:
+            labels = self.emotions
+            predicted = [labels[int(idx)] for idx in np.argmax(preds, axis=1)]
+
+        results = []
+        for row, emotion in zip(preds, predicted):
+            all_emotions = {labels[i]: float(row[i]) for i in range(min(len(labels), row.size))}
+            results.append({
+                "emotion": emotion,
+                "confidence": all_emotions[emotion],
+                "all_emotions": all_emotions,
+            })
+        return results
+
     # ------------------------------------------------------------------ #
     # 3. Upload file
     # ------------------------------------------------------------------ #
@@ -166,82 +327,240 @@ class AudioService:
     # ------------------------------------------------------------------ #
     # 4. Predict
     # ------------------------------------------------------------------ #
+    def _cache_key(self, contents: bytes) -> str:
+        return make_key(
+            "audio.predict", contents, self.version,
+            sr=self.target_sr, duration=self.duration, offset=self.offset, n_mfcc=self.n_mfcc,
+        )
+
     async def predict(self, audio_input):
         """
         Predict emotion from WAV audio file.
         Pipeline cố gắng bám sát Colab nhất có thể.
         """
         try:
-            model = self._load_model()
-
-            # đọc bytes
+            # đọc bytes (UploadFile: size-capped read, no extra copy)
             if hasattr(audio_input, "read"):
-                logger.info(f"Reading WAV from UploadFile: {getattr(audio_input, 'filename', 'unknown')}")
-                contents = await audio_input.read()
-            elif isinstance(audio_input, (bytes, bytearray)):
-                logger.info(f"Reading WAV from bytes: {len(audio_input)} bytes")
-                contents = bytes(audio_input)
+                logger.info(f"Reading audio from UploadFile: {getattr(audio_input, 'filename', 'unknown')}")
+                contents = await read_upload(audio_input)
+            elif isinstance(audio_input, (bytes, bytearray, memoryview)):
+                contents = memoryview(audio_input)
+                logger.info(f"Reading audio from bytes: {contents.nbytes} bytes")
             else:
                 raise HTTPException(status_code=400, detail=f"Unsupported audio input type: {type(audio_input)}")
 
-            # 🎯 DÙNG LIBROSA.GIỐNG COLAB
-            try:
-                audio_buffer = io.BytesIO(contents)
-                # sr=22050 (target_sr), duration & offset giống hệt notebook
-                data, sr = librosa.load(
-                    audio_buffer,
-                    sr=self.target_sr,
-                    duration=self.duration,
-                    offset=self.offset,
-                )
-                logger.info(f"librosa.load -> {data.shape[0]} samples, sr={sr}")
-            except Exception as e:
-                logger.error(f"Error reading WAV with librosa: {e}")
-                raise HTTPException(status_code=400, detail=f"Cannot read WAV file: {e}")
-
-            # trích features giống get_predict_feat
-            feat_arr = self._get_predict_feat_from_waveform(data, sr)
+            cache_key = None
+            if self.cache is not None:
+                cache_key = self._cache_key(contents)
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    return cached
 
-            # predict
-            preds = model.predict(feat_arr)
+            # 🎯 decode + features giống Colab, off the event loop
+            try:
+                with stage("audio.features"):
+                    raw_features = await self.executor.run_cpu(
+                        decode_and_extract,
+                        contents,
+                        self.target_sr,
+                        self.duration,
+                        self.offset,
+                        self.n_mfcc,
+                        self.expected_size,
+                    )
+            except ValueError as e:
+                logger.error(f"Error decoding audio: {e}")
+                raise HTTPException(status_code=400, detail=str(e))
+
+            # predict (model load + scaler + forward pass on the executor)
+            with stage("audio.inference"):
+                preds = await self.executor.run(self._infer, raw_features)
             preds = np.asarray(preds).squeeze()
             logger.info(f"Raw predictions shape: {preds.shape}, values: {preds}")
 
-            # dùng encoder đúng thứ tự label
-            if self.encoder is not None and hasattr(self.encoder, "categories_"):
-                emotion_labels = list(self.encoder.categories_[0])
+            # dùng encoder đúng thứ tự label (fallback: thứ tự mặc định)
+            if self.encoder is None or not hasattr(self.encoder, "categories_"):
+                logger.warning("No encoder found, using default emotion order")
+            result = self._results_from_preds(preds.reshape(1, -1))[0]
+            logger.info(f"Predicted emotion: {result['emotion']}, confidence: {result['confidence']}")
 
-                preds_2d = preds.reshape(1, -1)
-                y_pred = self.encoder.inverse_transform(preds_2d)
-                predicted_emotion = y_pred[0][0]
+            if cache_key is not None:
+                self.cache.set(cache_key, result)
+            return result
 
-                all_emotions = {emotion_labels[i]: float(preds[i]) for i in range(len(emotion_labels))}
-                confidence = float(preds[emotion_labels.index(predicted_emotion)])
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error in audio prediction: {e}")
+            raise HTTPException(status_code=400, detail=str(e))
 
-                logger.info(f"Predicted emotion: {predicted_emotion}, confidence: {confidence}")
+    async def predict_batch(self, clips: list) -> list:
+        """Predict emotions for many clips with one scaler call and one batched forward pass.
 
-                return {
-                    "emotion": predicted_emotion,
-                    "confidence": confidence,
-                    "all_emotions": all_emotions,
-                }
+        Decoding and feature extraction run in parallel on the ``audio_batch``
+        executor (a process pool by default), in one task per worker. Cached
+        clips are answered without being decoded. A clip that cannot be decoded
+        gets an ``error`` entry instead of failing the whole batch.
 
-            # fallback nếu không có encoder
-            logger.warning("No encoder found, using default emotion order")
-            labels = self.emotions
-            all_emotions = {labels[i]: float(preds[i]) for i in range(min(len(labels), preds.size))}
-            top_idx = int(np.argmax(preds))
-            emotion = labels[top_idx]
-            confidence = float(preds[top_idx])
+        Args:
+            clips: List of (filename, audio bytes) tuples.
 
-            return {
-                "emotion": emotion,
-                "confidence": confidence,
-                "all_emotions": all_emotions,
-            }
+        Returns:
+            One dict per clip, in input order: ``index``, ``filename`` and
+            either emotion / confidence / all_emotions or ``error``.
+        """
+        if len(clips) > settings.AUDIO_BATCH_MAX_FILES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Too many files: {len(clips)} (maximum {settings.AUDIO_BATCH_MAX_FILES} per request)",
+            )
 
-        except HTTPException:
-            raise
-        except Exception as e:
-            logger.error(f"Error in audio prediction: {e}")
+        results = [{"index": idx, "filename": filename} for idx, (filename, _) in enumerate(clips)]
+        keys = [None] * len(clips)
+        pending = []
+        for idx, (_, contents) in enumerate(clips):
+            if self.cache is not None:
+                keys[idx] = self._cache_key(contents)
+                cached = self.cache.get(keys[idx])
+                if cached is not None:
+                    results[idx].update(cached)
+                    continue
+            pending.append(idx)
+        if not pending:
+            return results
+
+        # one chunk per worker so every process gets a single task
+        n_chunks = min(len(pending), self.batch_executor.max_workers)
+        chunks = [pending[i::n_chunks] for i in range(n_chunks)]
+        with stage("audio.features"):
+            extracted = await asyncio.gather(*(
+                self.batch_executor.run_cpu(
+                    decode_and_extract_many,
+                    [clips[idx][1] for idx in chunk],
+                    self.target_sr,
+                    self.duration,
+                    self.offset,
+                    self.n_mfcc,
+                    self.expected_size,
+                )
+                for chunk in chunks
+            ))
+
+        valid, features = [], []
+        for chunk, chunk_features in zip(chunks, extracted):
+            for idx, feature in zip(chunk, chunk_features):
+                if isinstance(feature, str):
+                    results[idx]["error"] = feature
+                else:
+                    valid.append(idx)
+                    features.append(feature)
+        if not valid:
+            return results
+
+        with stage("audio.inference"):
+            preds = await self.executor.run(self._infer_batch, np.stack(features))
+        for idx, result in zip(valid, self._results_from_preds(preds)):
+            results[idx].update(result)
+            if keys[idx] is not None:
+                self.cache.set(keys[idx], result)
+        logger.info(f"Audio batch: {len(clips)} clips, {len(valid)} predicted, {len(pending) - len(valid)} failed")
+        return results
+
+    # ------------------------------------------------------------------ #
+    # 5. Timeline (long recordings)
+    # ------------------------------------------------------------------ #
+    def _run_timeline(self, source, hop_seconds: float) -> dict:
+        """Blocking timeline pass over a seekable file object (called on the executor)."""
+        self._load_model()
+        started = time.perf_counter()
+        sr = self.target_sr
+        window = int(round(self.duration * sr))
+        max_samples = int(settings.AUDIO_TIMELINE_MAX_SECONDS * sr)
+        extractor = get_feature_extractor(sr, self.n_mfcc)
+        windows = SlidingWindows(window, int(round(hop_seconds * sr)))
+
+        # Bộ đệm batch cố định: bộ nhớ không phụ thuộc độ dài file
+        batch = np.zeros((settings.AUDIO_TIMELINE_BATCH_SIZE, self.expected_size), dtype=np.float64)
+        spans: list = []
+        series: list = []
+
+        def flush_batch():
+            if not spans:
+                return
+            preds = self._infer_batch(batch[:len(spans)])
+            for (start, length), result in zip(spans, self._results_from_preds(preds)):
+                series.append({"start": start / sr, "end": (start + length) / sr, **result})
+            spans.clear()
+
+        def add(start: int, samples: np.ndarray):
+            extractor.extract(samples, size=self.expected_size, out=batch[len(spans)])
+            spans.append((start, samples.shape[0]))
+            if len(spans) == batch.shape[0]:
+                flush_batch()
+
+        for block in iter_resampled_blocks(source, sr, settings.AUDIO_TIMELINE_BLOCK_SECONDS):
+            if windows.samples_seen + block.shape[0] > max_samples:
+                raise ValueError(f"Recording longer than AUDIO_TIMELINE_MAX_SECONDS ({settings.AUDIO_TIMELINE_MAX_SECONDS:g} s)")
+            for start, samples in windows.push(block):
+                add(start, samples)
+        for start, samples in windows.flush():
+            add(start, samples)
+        flush_batch()
+
+        audio_seconds = windows.samples_seen / sr
+        wall_seconds = time.perf_counter() - started
+        labels = list(self.encoder.categories_[0]) if hasattr(self.encoder, "categories_") else self.emotions
+        return {
+            "windows": series,
+            "summary": summarize(series, labels, hop_seconds),
+            "window_seconds": self.duration,
+            "audio_seconds": audio_seconds,
+            "wall_seconds": wall_seconds,
+            "audio_seconds_per_wall_second": audio_seconds / wall_seconds if wall_seconds > 0 else None,
+        }
+
+    async def predict_timeline(self, file: UploadFile, hop_seconds: float = None) -> dict:
+        """Emotion per overlapping window over a whole recording, plus aggregate statistics.
+
+        The upload is decoded block by block straight from its spooled file, so
+        memory stays flat regardless of the recording length.
+
+        Args:
+            file: Uploaded recording (WAV, FLAC, OGG, MP3).
+            hop_seconds: Step between window starts (default AUDIO_TIMELINE_HOP_SECONDS).
+
+        Returns:
+            Dict with the per-window series, a summary and throughput numbers.
+        """
+        hop_seconds = hop_seconds or settings.AUDIO_TIMELINE_HOP_SECONDS
+        file.file.seek(0)
+        try:
+            with stage("audio.timeline"):
+                result = await self.executor.run(self._run_timeline, file.file, hop_seconds)
+        except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
+        logger.info(
+            f"Audio timeline: {result['audio_seconds']:.1f}s of audio, {len(result['windows'])} windows, "
+            f"{result['audio_seconds_per_wall_second'] or 0:.1f} audio-s/wall-s"
+        )
+        return result
+
+    # ------------------------------------------------------------------ #
+    # 6. Realtime stream (/audio/stream)
+    # ------------------------------------------------------------------ #
+    @property
+    def window_samples(self) -> int:
+        return int(round(self.duration * self.target_sr))
+
+    def create_stream_extractor(self) -> StreamingFeatureExtractor:
+        """Per-connection extractor that reuses STFT frames shared by consecutive windows."""
+        return StreamingFeatureExtractor(
+            get_feature_extractor(self.target_sr, self.n_mfcc, hop_length=self.hop_length), self.window_samples
+        )
+
+    def _predict_stream_window(self, extractor: StreamingFeatureExtractor, start: int, samples: np.ndarray) -> dict:
+        """Features + forward pass for one stream window (blocking; called on the executor)."""
+        self._load_model()
+        features = extractor.extract(start, samples, size=self.expected_size)
+        preds = self._infer_batch(features[np.newaxis])
+        return self._results_from_preds(preds)[0]
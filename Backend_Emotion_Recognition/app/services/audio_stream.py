@@ -0,0 +1,237 @@
+import asyncio
+import itertools
+import time
+from collections import deque
+from typing import Any, Dict
+
+import numpy as np
+from fastapi import WebSocket
+
+from app.core.config import settings
+from app.core.streaming import StreamManager, StreamSession, StreamStats
+from app.services.audio_decode import resampler_quality
+from app.services.audio_timeline import SlidingWindows
+
+# PCM sample formats accepted on /audio/stream (little-endian, mono)
+PCM_FORMATS = {"f32": np.dtype("<f4"), "s16": np.dtype("<i2")}
+MIN_SAMPLE_RATE, MAX_SAMPLE_RATE = 8000, 192000
+
+
+class AudioStreamStats(StreamStats):
+    """Per-connection window counters and last-sample-to-result latency."""
+
+    def __init__(self, window: int = 120):
+        super().__init__(window)
+        self.chunks_received = 0
+        self.samples_received = 0
+        self.windows_processed = 0
+        self.windows_dropped = 0
+
+    def record(self, received_at: float, inference_time: float):
+        super().record(received_at, inference_time)
+        self.windows_processed += 1
+
+    def counters(self) -> Dict[str, Any]:
+        return {
+            "chunks_received": self.chunks_received,
+            "samples_received": self.samples_received,
+            "windows_processed": self.windows_processed,
+            "windows_dropped": self.windows_dropped,
+        }
+
+
+class AudioStreamSession(StreamSession):
+    """One microphone connection on /audio/stream.
+
+    Protocol:
+    - binary messages are raw mono PCM chunks, float32 little-endian at
+      22050 Hz by default; ``{"type": "config", "format": "s16",
+      "sample_rate": 48000, "hop": 0.5}`` changes the sample format, input
+      rate (resampled to 22050 Hz on the fly) and window hop, and restarts
+      the stream;
+    - every complete 2.5 s window (one every ``hop`` seconds) is answered with
+      ``{"type": "result", ...}``: stream time span, emotion, probabilities
+      and ``latency_ms`` from the arrival of the window's last sample;
+    - ``{"type": "flush"}`` ends an utterance: the resampler tail is pushed,
+      a recording shorter than one window is analyzed zero-padded, and the
+      next audio starts a new stream;
+    - ``{"type": "stats"}`` returns this connection's stats.
+
+    Memory is bounded per connection: the sample buffer holds one window
+    plus one chunk (chunks are capped at AUDIO_STREAM_MAX_CHUNK_BYTES), at
+    most AUDIO_STREAM_MAX_PENDING windows wait for inference (the oldest is
+    dropped when inference falls behind) and the feature cache holds one
+    window of STFT frames.
+    """
+
+    name = "Audio stream"
+
+    def __init__(self, websocket: WebSocket, service, session_id: int):
+        super().__init__(websocket, service, session_id)
+        self.stats = AudioStreamStats()
+        self.sr = service.target_sr
+        self.sample_format = "f32"
+        self.input_rate = self.sr
+        self.hop = self._hop_samples(settings.AUDIO_STREAM_HOP_SECONDS)
+        # (window_id, start, received_at, samples, extractor)
+        self._pending = deque(maxlen=max(1, settings.AUDIO_STREAM_MAX_PENDING))
+        self._window_ready = asyncio.Event()
+        self._window_ids = itertools.count(1)
+        self._restart()
+
+    def _hop_samples(self, hop_seconds: float) -> int:
+        # Whole STFT hops, so consecutive windows share frames (StreamingFeatureExtractor)
+        frame_hop = self.service.hop_length
+        return max(1, int(round(hop_seconds * self.sr / frame_hop))) * frame_hop
+
+    def _restart(self):
+        """Start a new stream: empty buffer, fresh resampler and feature cache."""
+        self.windows = SlidingWindows(self.service.window_samples, self.hop)
+        self.extractor = self.service.create_stream_extractor()
+        self.resampler = None
+        if self.input_rate != self.sr:
+            import soxr
+
+            self.resampler = soxr.ResampleStream(self.input_rate, self.sr, 1, dtype="float32",
+                                                 quality=resampler_quality())
+
+    def _enqueue(self, windows, received_at: float):
+        for start, samples in windows:
+            if len(self._pending) == self._pending.maxlen:
+                self.stats.windows_dropped += 1
+            # Copy: the view is only valid until the next push
+            self._pending.append((next(self._window_ids), start, received_at, samples.copy(), self.extractor))
+            self._window_ready.set()
+
+    def _offer(self, payload: bytes):
+        received_at = time.monotonic()
+        dtype = PCM_FORMATS[self.sample_format]
+        if len(payload) % dtype.itemsize:
+            raise ValueError(f"{self.sample_format} chunks must be a multiple of {dtype.itemsize} bytes")
+        samples = np.frombuffer(payload, dtype=dtype).astype(np.float32)
+        if self.sample_format == "s16":
+            samples /= 32768.0
+        self.stats.chunks_received += 1
+        self.stats.samples_received += samples.shape[0]
+        if self.resampler is not None:
+            samples = self.resampler.resample_chunk(samples, last=False)
+        self._enqueue(self.windows.push(samples), received_at)
+
+    def _flush(self) -> int:
+        received_at = time.monotonic()
+        if self.resampler is not None:
+            tail = self.resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True)
+            self._enqueue(self.windows.push(tail), received_at)
+        self._enqueue(self.windows.flush(), received_at)
+        samples = self.windows.samples_seen
+        self._restart()
+        return samples
+
+    async def _configure(self, message: dict):
+        sample_format = message.get("format", self.sample_format)
+        if sample_format not in PCM_FORMATS:
+            await self._send({"type": "error", "detail": f"Unsupported sample format: {sample_format}"})
+            return
+        try:
+            input_rate = int(message.get("sample_rate", self.input_rate))
+            hop_seconds = float(message.get("hop", self.hop / self.sr))
+        except (TypeError, ValueError):
+            await self._send({"type": "error", "detail": "sample_rate and hop must be numbers"})
+            return
+        if not MIN_SAMPLE_RATE <= input_rate <= MAX_SAMPLE_RATE:
+            await self._send({"type": "error", "detail": f"sample_rate must be in [{MIN_SAMPLE_RATE}, {MAX_SAMPLE_RATE}]"})
+            return
+        if not 0.05 < hop_seconds <= 60.0:
+            await self._send({"type": "error", "detail": "hop must be in (0.05, 60] seconds"})
+            return
+        self.sample_format, self.input_rate = sample_format, input_rate
+        self.hop = self._hop_samples(hop_seconds)
+        self._restart()
+        await self._send({
+            "type": "config",
+            "format": self.sample_format,
+            "sample_rate": self.input_rate,
+            "hop": self.hop / self.sr,
+            "window": self.service.duration,
+        })
+
+    def memory_bytes(self) -> int:
+        """Samples and features held by this connection (buffer, pending windows, frame cache)."""
+        pending = sum(item[3].nbytes for item in self._pending)
+        return self.windows._buffer.nbytes + pending + self.extractor.nbytes
+
+    def snapshot(self) -> Dict[str, Any]:
+        snapshot = self.stats.snapshot()
+        snapshot.update({
+            "format": self.sample_format,
+            "sample_rate": self.input_rate,
+            "hop": self.hop / self.sr,
+            "pending_windows": len(self._pending),
+            "memory_bytes": self.memory_bytes(),
+            "frames_computed": self.extractor.frames_computed,
+            "frames_reused": self.extractor.frames_reused,
+        })
+        return snapshot
+
+    def summary(self) -> str:
+        return (f"{self.stats.samples_received} samples, "
+                f"{self.stats.windows_processed} windows, {self.stats.windows_dropped} dropped")
+
+    async def _handle_message(self, kind: str, message: dict):
+        if kind == "config":
+            await self._configure(message)
+        elif kind == "flush":
+            samples = self._flush()
+            await self._send({"type": "flush", "seconds": samples / self.sr})
+        else:
+            await super()._handle_message(kind, message)
+
+    async def _receive_loop(self):
+        while True:
+            message = await self.websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            payload = message.get("bytes")
+            if payload is not None:
+                if len(payload) > settings.AUDIO_STREAM_MAX_CHUNK_BYTES:
+                    await self.websocket.close(code=1009, reason="Chunk too large")
+                    return
+                try:
+                    self._offer(payload)
+                except ValueError as e:
+                    self.stats.errors += 1
+                    await self._send({"type": "error", "detail": str(e)})
+            elif message.get("text") is not None:
+                await self._handle_text(message["text"])
+
+    async def _process_loop(self):
+        sr = self.sr
+        while True:
+            await self._window_ready.wait()
+            self._window_ready.clear()
+            while self._pending:
+                window_id, start, received_at, samples, extractor = self._pending.popleft()
+                started = time.monotonic()
+                try:
+                    result = await self.service.executor.run(
+                        self.service._predict_stream_window, extractor, start, samples
+                    )
+                except Exception as e:
+                    # Executor saturated or a failure: report it and move on to the next window
+                    await self._report_failure("window_id", window_id, e)
+                    continue
+                self.stats.record(received_at, time.monotonic() - started)
+
+                await self._send({
+                    "type": "result",
+                    "window_id": window_id,
+                    "start": start / sr,
+                    "end": (start + samples.shape[0]) / sr,
+                    **result,
+                    "latency_ms": (time.monotonic() - received_at) * 1000.0,
+                    "inference_ms": (time.monotonic() - started) * 1000.0,
+                    "windows_dropped": self.stats.windows_dropped,
+                })
+
+
+stream_manager = StreamManager(AudioStreamSession, settings.AUDIO_STREAM_MAX_CONNECTIONS)
@@ -0,0 +1,149 @@
+from collections import Counter
+from typing import BinaryIO, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from app.core.logger import setup_logger
+from app.services.audio_decode import iter_av_samples, resampler_quality, sniff_container
+
+logger = setup_logger(__name__)
+
+
+def iter_resampled_blocks(source: BinaryIO, target_sr: int, block_seconds: float = 10.0) -> Iterator[np.ndarray]:
+    """Decode a seekable audio file object block by block, as mono float32 at ``target_sr``.
+
+    Only one block (plus the resampler's small state) is in memory at a time,
+    whatever the file length. Formats are those of libsndfile (WAV, FLAC,
+    OGG/Vorbis/Opus, MP3...) plus WebM / MP4 through PyAV; raises ValueError
+    for anything else.
+    """
+    import soundfile as sf
+    import soxr
+
+    container = sniff_container(source.read(16))
+    source.seek(0)
+    if container in ("webm", "mp4"):
+        yield from _iter_av_blocks(source, container, target_sr, block_seconds)
+        return
+
+    try:
+        audio_file = sf.SoundFile(source)
+    except (sf.LibsndfileError, RuntimeError, TypeError) as e:
+        raise ValueError(f"Cannot read audio file: {e}")
+
+    with audio_file:
+        source_sr = audio_file.samplerate
+        resampler = None
+        if source_sr != target_sr:
+            resampler = soxr.ResampleStream(source_sr, target_sr, 1, dtype="float32", quality=resampler_quality())
+        blocksize = max(1, int(block_seconds * source_sr))
+        try:
+            for block in audio_file.blocks(blocksize=blocksize, dtype="float32", always_2d=True):
+                mono = block.mean(axis=1) if block.shape[1] > 1 else block[:, 0]
+                if resampler is not None:
+                    mono = resampler.resample_chunk(mono, last=False)
+                if mono.size:
+                    yield mono
+        except (sf.LibsndfileError, RuntimeError) as e:
+            # A header that parses but a corrupt or truncated body
+            raise ValueError(f"Cannot read audio file: {e}")
+        if resampler is not None:
+            tail = resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True)
+            if tail.size:
+                yield tail
+
+
+def _iter_av_blocks(source: BinaryIO, container: str, target_sr: int, block_seconds: float) -> Iterator[np.ndarray]:
+    """PyAV frames regrouped into ``block_seconds`` blocks (already at ``target_sr``)."""
+    blocksize = max(1, int(block_seconds * target_sr))
+    chunks, total = [], 0
+    try:
+        for chunk in iter_av_samples(source, target_sr):
+            chunks.append(chunk)
+            total += chunk.shape[0]
+            if total >= blocksize:
+                yield np.concatenate(chunks)
+                chunks, total = [], 0
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Cannot decode {container} audio: {e}")
+    if total:
+        yield np.concatenate(chunks)
+
+
+class SlidingWindows:
+    """Turn a stream of sample blocks into overlapping fixed-length windows.
+
+    Samples live in one ring-like buffer of ``window + max block`` samples:
+    every complete window is yielded as ``(start_sample, view)`` (valid until
+    the next ``push``), then samples no later window needs are dropped. With
+    ``hop > window`` the samples between windows are skipped without being
+    stored.
+    """
+
+    def __init__(self, window: int, hop: int):
+        self.window = int(window)
+        self.hop = max(1, int(hop))
+        self._buffer = np.zeros(self.window, dtype=np.float32)
+        self._filled = 0
+        self._buffer_start = 0  # absolute index of _buffer[0]
+        self._next_start = 0  # absolute index of the next window start
+        self.samples_seen = 0
+        self.windows_emitted = 0
+
+    def _append(self, samples: np.ndarray):
+        # Skip samples that fall in a gap between windows (hop > window)
+        skip = min(max(0, self._next_start - (self._buffer_start + self._filled)), samples.shape[0])
+        if skip:
+            self._buffer_start += skip
+            samples = samples[skip:]
+        needed = self._filled + samples.shape[0]
+        if needed > self._buffer.shape[0]:
+            grown = np.zeros(needed, dtype=np.float32)
+            grown[:self._filled] = self._buffer[:self._filled]
+            self._buffer = grown
+        self._buffer[self._filled:needed] = samples
+        self._filled = needed
+
+    def push(self, samples: np.ndarray) -> Iterator[Tuple[int, np.ndarray]]:
+        self.samples_seen += samples.shape[0]
+        self._append(samples)
+        while self._next_start + self.window <= self._buffer_start + self._filled:
+            offset = self._next_start - self._buffer_start
+            yield self._next_start, self._buffer[offset:offset + self.window]
+            self.windows_emitted += 1
+            self._next_start += self.hop
+        # Drop samples before the next window start (shift the rest to the front)
+        drop = min(self._next_start - self._buffer_start, self._filled)
+        if drop > 0:
+            remaining = self._filled - drop
+            self._buffer[:remaining] = self._buffer[drop:self._filled]
+            self._filled = remaining
+            self._buffer_start += drop
+
+    def flush(self) -> Iterator[Tuple[int, np.ndarray]]:
+        """A recording shorter than one window still gets one (zero-padded later) window."""
+        if self.windows_emitted == 0 and self._filled > 0:
+            self.windows_emitted += 1
+            yield self._buffer_start, self._buffer[:self._filled]
+
+
+def summarize(windows: List[dict], labels: List[str], hop_seconds: float) -> Dict:
+    """Aggregate a per-window emotion series: dominant emotion, counts, mean probabilities, changes."""
+    if not windows:
+        return {"n_windows": 0}
+    counts = Counter(window["emotion"] for window in windows)
+    probs = np.array([[window["all_emotions"].get(label, 0.0) for label in labels] for window in windows])
+    mean_probs = probs.mean(axis=0)
+    changes = sum(1 for a, b in zip(windows, windows[1:]) if a["emotion"] != b["emotion"])
+    return {
+        "n_windows": len(windows),
+        "dominant_emotion": counts.most_common(1)[0][0],
+        "emotion_counts": dict(counts),
+        "emotion_fraction": {emotion: count / len(windows) for emotion, count in counts.items()},
+        "mean_probabilities": dict(zip(labels, mean_probs.tolist())),
+        "mean_confidence": float(np.mean([window["confidence"] for window in windows])),
+        "emotion_changes": changes,
+        "hop_seconds": hop_seconds,
+    }
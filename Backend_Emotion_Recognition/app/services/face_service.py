@@ -1,25 +1,113 @@
 from fastapi import UploadFile, HTTPException
 import numpy as np
+from app.core.batching import MicroBatcher
+from app.core.cache import get_cache, make_key
+from app.core.config import settings
+from app.core.executor import get_executor
+from app.core.metrics import observe_faces, stage
+from app.core.result_writer import get_result_writer
 from app.models.face_model import FaceModel
+from app.models.face_tracker import FaceTracker
 from app.utils.image_utils import (
     validate_image, 
-    load_image_into_numpy_array,
-    save_result_image
+    decode_image,
+    draw_result
 )
+from app.utils.image_decode import DecodedImage, decode_for_detection
+from app.utils.upload import read_upload
 from app.core.logger import setup_logger
 
 logger = setup_logger(__name__)
 
 class FaceService:
-    def __init__(self):
-        self.model = FaceModel()
+    def __init__(self, warmup=None):
+        self.model = FaceModel(warmup=warmup)
+        # Decoding, detection and inference run here, never on the event loop
+        self.executor = get_executor("face")
+
+        # Results of identical uploads are served from the cache (None when disabled)
+        self.cache = get_cache("face")
+
+        # Result images are rendered and written in the background
+        self.result_writer = get_result_writer()
+
+        # Crops from all in-flight requests share one batched forward pass
+        self.batcher = None
+        if settings.FACE_BATCHING_ENABLED:
+            self.batcher = MicroBatcher(
+                self.model.predict_emotion_batch,
+                self.executor,
+                max_batch_size=settings.FACE_BATCH_MAX_SIZE,
+                max_wait_ms=settings.FACE_BATCH_MAX_WAIT_MS,
+                max_queue=settings.FACE_BATCH_MAX_QUEUE,
+                name="face",
+            )
+
+    async def _predict_faces(self, faces: list) -> list:
+        """Predict emotions for cropped faces, through the micro-batcher when enabled."""
+        with stage("face.inference"):
+            if self.batcher is None:
+                return await self.executor.run(self.model.predict_emotion_batch, faces)
+            return await self.batcher.submit_many(faces)
+
+    def warmup(self):
+        """Warm up the emotion model for every batch bucket (seconds per bucket)."""
+        return self.model.warmup()
+
+    def batch_stats(self):
+        """Return micro-batching metrics (batch-size distribution, queue wait)."""
+        if self.batcher is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.batcher.stats()}
+
+    async def _decode(self, contents: bytes, grayscale: bool = False) -> np.ndarray:
+        """Decode image bytes on the executor"""
+        try:
+            with stage("face.decode"):
+                return await self.executor.run_cpu(decode_image, contents, grayscale)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Error processing image: {str(e)}")
+
+    async def _decode_for_detection(self, contents, profile: str = None) -> DecodedImage:
+        """Decode an upload at the resolution face detection needs (see FACE_DECODE_REDUCED) on the executor"""
+        params = self.model.decode_params(profile)
+        try:
+            with stage("face.decode"):
+                image = await self.executor.run_cpu(decode_for_detection, contents, *params)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Error processing image: {str(e)}")
+        # Full-resolution crops and colour artefacts are decoded from it on demand
+        image.source = contents
+        return image
+
+    async def _load_image(self, file: UploadFile, grayscale: bool = False) -> np.ndarray:
+        """Read an uploaded image and decode it on the executor"""
+        return await self._decode(await read_upload(file), grayscale)
+
+    def _cache_key(self, namespace: str, contents: bytes, detection: bool = True, profile: str = None, **options):
+        """Prediction cache key (None when caching is disabled); detection keys include detector + profile."""
+        if self.cache is None:
+            return None
+        if detection:
+            options["detector"] = self.model.detector.name
+            options["profile"] = self.model.detection_profile(profile)
+            options["reduced_decode"] = settings.FACE_DECODE_REDUCED
+        return make_key(f"face.{namespace}", contents, self.model.version, **options)
+
+    def _cache_get(self, key):
+        return self.cache.get(key) if key is not None else None
+
+    def _cache_set(self, key, value):
+        if key is not None:
+            self.cache.set(key, value)
         
-    async def detect_faces(self, file: UploadFile, include_cropped_base64: bool = False):
+    async def detect_faces(self, file: UploadFile, include_cropped_base64: bool = False, profile: str = None):
         """Detect all faces in uploaded image.
         
         Args:
             file: Uploaded image file
             include_cropped_base64: If True, include base64 encoded cropped faces in response
+            profile: Detection profile ("fast", "balanced", "accurate"), default from settings
             
         Returns:
             dict with faces, total_faces, image_width, image_height
@@ -27,23 +115,127 @@ class FaceService:
         try:
             # Validate file
             await validate_image(file)
+            contents = await read_upload(file)
+
+            cache_key = self._cache_key("detect", contents, profile=profile, include_cropped=include_cropped_base64)
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                return cached
             
-            # Load image into numpy array
-            image_array = await load_image_into_numpy_array(file)
+            # Decode at the resolution detection needs
+            image_array = await self._decode_for_detection(contents, profile)
             
             # Detect faces
-            result = self.model.detect_faces(image_array, include_cropped_base64=include_cropped_base64)
+            with stage("face.detect"):
+                result = await self.executor.run(
+                    self.model.detect_faces, image_array,
+                    include_cropped_base64=include_cropped_base64, profile=profile
+                )
+            observe_faces(len(result["faces"]))
             
-            return {
+            response = {
                 "faces": result["faces"],
                 "total_faces": len(result["faces"]),
                 "image_width": result["image_width"],
                 "image_height": result["image_height"]
             }
+            self._cache_set(cache_key, response)
+            return response
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Error detecting faces: {e}")
             raise HTTPException(status_code=400, detail=str(e))
     
+    async def analyze_image(self, image_array, profile: str = None) -> dict:
+        """Detect, crop and batch-predict all faces of an already decoded image (array or DecodedImage)."""
+        # Detect and crop faces
+        with stage("face.detect"):
+            detected = await self.executor.run(self.model.detect_and_crop_faces, image_array, profile)
+        observe_faces(len(detected["crops"]))
+
+        # Batch predict emotions for every crop
+        predictions = await self._predict_faces(detected["crops"]) if detected["crops"] else []
+
+        faces = [
+            {"face_id": idx + 1, "location": location, **prediction}
+            for idx, (location, prediction) in enumerate(zip(detected["locations"], predictions))
+        ]
+        return {
+            "faces": faces,
+            "total_faces": len(faces),
+            "image_width": detected["image_width"],
+            "image_height": detected["image_height"]
+        }
+
+    def create_tracker(self) -> FaceTracker:
+        """New per-stream face tracker configured from settings."""
+        return FaceTracker(
+            self.model.detect_boxes,
+            detect_every=settings.FACE_TRACK_DETECT_EVERY,
+            roi_margin=settings.FACE_TRACK_ROI_MARGIN,
+            iou_threshold=settings.FACE_TRACK_IOU_THRESHOLD,
+            max_missed=settings.FACE_TRACK_MAX_MISSED,
+            smoothing=settings.FACE_TRACK_SMOOTHING,
+        )
+
+    async def analyze_tracked(self, image_array: np.ndarray, tracker: FaceTracker) -> dict:
+        """analyze_image for streams: tracked boxes, stable face IDs and smoothed emotions."""
+        with stage("face.track"):
+            tracked = await self.executor.run(self.model.track_and_crop_faces, image_array, tracker)
+        predictions = await self._predict_faces(tracked["crops"]) if tracked["crops"] else []
+
+        faces = [
+            {
+                "face_id": track.track_id,
+                "location": location,
+                **tracker.smooth(track, prediction, self.model.emotions),
+            }
+            for track, location, prediction in zip(tracked["tracks"], tracked["locations"], predictions)
+        ]
+        return {
+            "faces": faces,
+            "total_faces": len(faces),
+            "image_width": tracked["image_width"],
+            "image_height": tracked["image_height"]
+        }
+
+    async def analyze_faces(self, file: UploadFile, profile: str = None):
+        """Detect all faces and predict their emotions in a single pass.
+
+        The image is decoded once, faces are cropped in memory from the
+        grayscale image used for detection and all crops go through one
+        batched prediction - no JPEG/base64 round trip through the client.
+
+        Args:
+            file: Uploaded image file
+            profile: Detection profile ("fast", "balanced", "accurate"), default from settings
+
+        Returns:
+            dict with faces (location + emotion), total_faces, image_width, image_height
+        """
+        try:
+            # Validate file
+            await validate_image(file)
+            contents = await read_upload(file)
+
+            cache_key = self._cache_key("analyze", contents, profile=profile)
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                return cached
+
+            # Decode at the resolution detection needs
+            image_array = await self._decode_for_detection(contents, profile)
+
+            result = await self.analyze_image(image_array, profile)
+            self._cache_set(cache_key, result)
+            return result
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error analyzing faces: {e}")
+            raise HTTPException(status_code=400, detail=str(e))
+
     async def predict_emotion_from_cropped_face(self, file: UploadFile):
         """Predict emotion from a cropped face image.
         
@@ -56,91 +248,136 @@ class FaceService:
         try:
             # Validate file
             await validate_image(file)
+            contents = await read_upload(file)
+
+            cache_key = self._cache_key("cropped", contents, detection=False)
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                return cached
             
-            # Load image into numpy array
-            face_array = await load_image_into_numpy_array(file)
-            
-            # Predict emotion
-            result = self.model.predict_emotion_from_face(face_array)
+            # Load image into numpy array (the model only uses grayscale)
+            face_array = await self._decode(contents, grayscale=True)
             
-            # Process the result to ensure all values are JSON serializable
-            processed_result = {
-                "emotion": result["emotion"],
-                "confidence": float(result["confidence"]),
-                "all_emotions": {
-                    k: float(v) for k, v in result["all_emotions"].items()
-                }
-            }
+            # Predict emotion (values are already plain Python floats, JSON serializable)
+            processed_result = (await self._predict_faces([face_array]))[0]
+            self._cache_set(cache_key, processed_result)
             
             return processed_result
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Error predicting emotion from cropped face: {e}")
             raise HTTPException(status_code=400, detail=str(e))
             
-    async def predict_emotion(self, image_input, skip_save: bool = False):
+    async def _predict_largest_face(self, image_array, profile: str = None) -> dict:
+        """Detect the largest face and predict its emotion -> JSON-serializable result or {"error": ...}."""
+        # Get prediction: detect the largest face, then run it through the batcher
+        with stage("face.detect"):
+            located = await self.executor.run(self.model.locate_largest_face, image_array, profile)
+        observe_faces(0 if located is None else 1)
+        if located is None:
+            result = {"error": "No faces detected in the image"}
+        else:
+            cropped_face, face_location = located
+            result = (await self._predict_faces([cropped_face]))[0]
+            result["face_location"] = face_location
+
+        # Log the raw prediction result (only in debug mode)
+        if logger.level <= 10:  # DEBUG level
+            logger.debug(f"Raw prediction result: {result}")
+
+        if not isinstance(result, dict):
+            logger.error(f"Unexpected result type: {type(result)}")
+            return {"error": "Invalid prediction result format"}
+
+        if "error" in result:
+            logger.warning(f"Model returned error: {result['error']}")
+            return {"error": result["error"]}
+
+        # Validate required fields
+        required_fields = ["emotion", "confidence", "face_location", "all_emotions"]
+        missing_fields = [field for field in required_fields if field not in result]
+
+        if missing_fields:
+            logger.error(f"Missing required fields in prediction result: {missing_fields}")
+            return {"error": f"Invalid prediction result: missing {', '.join(missing_fields)}"}
+
+        # Process the result to ensure all values are JSON serializable
+        processed_result = {
+            "emotion": result["emotion"],
+            "confidence": float(result["confidence"]),
+            "face_location": {
+                k: int(v) for k, v in result["face_location"].items()
+            },
+            "all_emotions": {
+                k: float(v) for k, v in result["all_emotions"].items()
+            }
+        }
+        return processed_result
+
+    def _queue_result_image(self, contents, image, result: dict, result_format: str = None,
+                            result_quality: int = None):
+        """Hand the annotated result image to the background writer; returns its file name, or None if dropped."""
+        location, emotion, confidence = result["face_location"], result["emotion"], result["confidence"]
+        key = make_key(
+            "face.result", contents, self.model.version,
+            location=location, emotion=emotion, confidence=round(confidence, 4)
+        )
+
+        def render():
+            # Full-resolution colour decode, only now that the response is out
+            original = image.full_color() if image is not None else decode_image(contents)
+            return draw_result(original, location, emotion, confidence)
+
+        nbytes = len(contents) + (image.nbytes if image is not None else 0)
+        return self.result_writer.submit(key, render, nbytes, result_format, result_quality)
+
+    async def predict_emotion(self, image_input, skip_save: bool = False, profile: str = None,
+                              result_format: str = None, result_quality: int = None):
         """Predict emotion from face image.
         Args:
             image_input: Either an UploadFile or a numpy array containing the image
             skip_save: If True, skip saving result image (for realtime/performance)
+            profile: Detection profile ("fast", "balanced", "accurate"), default from settings
+            result_format: Result image encoding, "jpeg" or "webp" (default RESULT_IMAGE_FORMAT)
+            result_quality: Result image encoder quality 1-100 (default RESULT_IMAGE_QUALITY)
         """
         try:
+            contents = None
+            image_array = None
             if isinstance(image_input, np.ndarray):
                 image_array = image_input
             else:
                 # It's an UploadFile
                 await validate_image(image_input)
-                image_array = await load_image_into_numpy_array(image_input)
-
-            # Get prediction
-            result = self.model.predict(image_array)
-
-            # Log the raw prediction result (only in debug mode)
-            if logger.level <= 10:  # DEBUG level
-                logger.debug(f"Raw prediction result: {result}")
-
-            if not isinstance(result, dict):
-                logger.error(f"Unexpected result type: {type(result)}")
-                return {"error": "Invalid prediction result format"}
-
-            if "error" in result:
-                logger.warning(f"Model returned error: {result['error']}")
-                return {"error": result["error"]}
-
-            # Validate required fields
-            required_fields = ["emotion", "confidence", "face_location", "all_emotions"]
-            missing_fields = [field for field in required_fields if field not in result]
-
-            if missing_fields:
-                logger.error(f"Missing required fields in prediction result: {missing_fields}")
-                return {"error": f"Invalid prediction result: missing {', '.join(missing_fields)}"}
-
-            # Process the result to ensure all values are JSON serializable
-            processed_result = {
-                "emotion": result["emotion"],
-                "confidence": float(result["confidence"]),
-                "face_location": {
-                    k: int(v) for k, v in result["face_location"].items()
-                },
-                "all_emotions": {
-                    k: float(v) for k, v in result["all_emotions"].items()
-                }
-            }
+                contents = await read_upload(image_input)
+
+            # Uploads are cached by content; the result image is content-addressed too
+            cache_key = self._cache_key("predict", contents, profile=profile) if contents is not None else None
+            processed_result = self._cache_get(cache_key)
+            if processed_result is None:
+                if image_array is None:
+                    image_array = await self._decode_for_detection(contents, profile)
+                processed_result = await self._predict_largest_face(image_array, profile)
+                if "error" in processed_result:
+                    return processed_result
+                self._cache_set(cache_key, processed_result)
 
             # OPTIMIZATION: Only save result image if not skipped (for realtime performance)
             if not skip_save and not isinstance(image_input, np.ndarray):
-                # Save result image only for uploaded files
-                result_file = f"result_{image_input.filename}"
-                result_path = save_result_image(
-                    original_img=image_array,
-                    face_location=processed_result["face_location"],
-                    emotion=processed_result["emotion"],
-                    confidence=processed_result["confidence"],
-                    file_name=result_file
-                )
-                # Add result image path to response for uploaded files
-                processed_result["result_image"] = str(result_path)
+                # Rendering, encoding and the disk write happen after the response; the URL
+                # is known now (no result_url when the writer is saturated and drops it)
+                with stage("face.result"):
+                    name = self._queue_result_image(
+                        contents, image_array, processed_result, result_format, result_quality
+                    )
+                if name is not None:
+                    processed_result["result_url"] = self.result_writer.url_for(name)
+                    processed_result["result_image"] = str(self.result_writer.path_for(name))
 
             return processed_result
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Error predicting emotion: {e}")
             raise HTTPException(status_code=400, detail=str(e))
@@ -165,25 +402,15 @@ class FaceService:
                 await validate_image(file)
                 
                 # Load image into numpy array
-                face_array = await load_image_into_numpy_array(file)
+                face_array = await self._load_image(file, grayscale=True)
                 face_arrays.append(face_array)
             
-            # Batch predict emotions
-            results = self.model.predict_emotion_batch(face_arrays)
-            
-            # Process results to ensure all values are JSON serializable
-            processed_results = []
-            for result in results:
-                processed_result = {
-                    "emotion": result["emotion"],
-                    "confidence": float(result["confidence"]),
-                    "all_emotions": {
-                        k: float(v) for k, v in result["all_emotions"].items()
-                    }
-                }
-                processed_results.append(processed_result)
+            # Batch predict emotions (results are already JSON serializable)
+            processed_results = await self._predict_faces(face_arrays)
             
             return processed_results
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Error predicting emotion batch: {e}")
             raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
@@ -0,0 +1,183 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+import numpy as np
+from fastapi import WebSocket
+
+from app.core.config import settings
+from app.core.streaming import StreamManager, StreamSession, StreamStats
+from app.utils.image_utils import decode_image
+
+
+class FaceStreamStats(StreamStats):
+    """Per-connection frame counters, processed fps and receive-to-result lag."""
+
+    latency_key = "lag"
+
+    def __init__(self, window: int = 120):
+        super().__init__(window)
+        self.frames_received = 0
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self._processed_at = deque(maxlen=window)
+
+    def record(self, received_at: float, inference_time: float):
+        super().record(received_at, inference_time)
+        self.frames_processed += 1
+        self._processed_at.append(time.monotonic())
+
+    @property
+    def fps(self) -> float:
+        """Processed frames per second over the recent window."""
+        if len(self._processed_at) < 2:
+            return 0.0
+        span = self._processed_at[-1] - self._processed_at[0]
+        return (len(self._processed_at) - 1) / span if span > 0 else 0.0
+
+    def counters(self) -> Dict[str, Any]:
+        return {
+            "frames_received": self.frames_received,
+            "frames_processed": self.frames_processed,
+            "frames_dropped": self.frames_dropped,
+            "fps": self.fps,
+        }
+
+
+class FaceStreamSession(StreamSession):
+    """One webcam connection on /face/stream.
+
+    Protocol:
+    - binary messages are frames: JPEG/PNG bytes by default, or raw 8-bit
+      grayscale buffers after a ``{"type": "config", "format": "gray",
+      "width": W, "height": H}`` text message;
+    - ``{"type": "config", "tracking": false}`` turns the per-stream face
+      tracker off (it is on by default, see FACE_STREAM_TRACKING);
+    - ``{"type": "stats"}`` returns this connection's stats;
+    - every processed frame is answered with ``{"type": "result", ...}``
+      holding face boxes and emotions (same shape as /face/analyze).
+
+    Only the newest frame is kept: if a frame arrives while the previous one is
+    still being analyzed, the older pending frame is dropped (latest-frame-wins),
+    so a slow worker adds lag to no one and memory stays at one frame.
+    """
+
+    name = "Face stream"
+
+    def __init__(self, websocket: WebSocket, service, session_id: int):
+        super().__init__(websocket, service, session_id)
+        self.stats = FaceStreamStats()
+        self.frame_format = "jpeg"
+        self.frame_shape: Optional[tuple] = None
+        self._pending: Optional[tuple] = None  # (frame_id, received_at, payload)
+        self._frame_ready = asyncio.Event()
+        # Stable face IDs + smoothed emotions; None analyzes every frame from scratch
+        self.tracker = service.create_tracker() if settings.FACE_STREAM_TRACKING else None
+
+    def _offer(self, payload: bytes):
+        self.stats.frames_received += 1
+        if self._pending is not None:
+            self.stats.frames_dropped += 1
+        self._pending = (self.stats.frames_received, time.monotonic(), payload)
+        self._frame_ready.set()
+
+    async def _configure(self, message: dict):
+        frame_format = message.get("format", self.frame_format)
+        frame_shape = self.frame_shape
+        if frame_format == "gray":
+            if "width" in message or "height" in message or frame_shape is None:
+                width, height = int(message.get("width", 0)), int(message.get("height", 0))
+                if width <= 0 or height <= 0:
+                    await self._send({"type": "error", "detail": "gray frames need positive width and height"})
+                    return
+                frame_shape = (height, width)
+        elif frame_format == "jpeg":
+            frame_shape = None
+        else:
+            await self._send({"type": "error", "detail": f"Unsupported frame format: {frame_format}"})
+            return
+        self.frame_format, self.frame_shape = frame_format, frame_shape
+        if "tracking" in message:
+            self.tracker = self.service.create_tracker() if message["tracking"] else None
+        await self._send({
+            "type": "config",
+            "format": self.frame_format,
+            "shape": self.frame_shape,
+            "tracking": self.tracker is not None,
+        })
+
+    def snapshot(self) -> Dict[str, Any]:
+        snapshot = self.stats.snapshot()
+        snapshot["tracking"] = self.tracker is not None
+        if self.tracker is not None:
+            tracker_stats = self.tracker.stats()
+            uptime = max(snapshot["uptime_s"], 1e-9)
+            tracker_stats["full_detections_per_s"] = tracker_stats["full_detections"] / uptime
+            tracker_stats["roi_detections_per_s"] = tracker_stats["roi_detections"] / uptime
+            snapshot["tracker"] = tracker_stats
+        return snapshot
+
+    def summary(self) -> str:
+        return f"{self.stats.frames_processed} processed, {self.stats.frames_dropped} dropped"
+
+    async def _handle_message(self, kind: str, message: dict):
+        if kind == "config":
+            await self._configure(message)
+        else:
+            await super()._handle_message(kind, message)
+
+    async def _receive_loop(self):
+        while True:
+            message = await self.websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            payload = message.get("bytes")
+            if payload is not None:
+                if len(payload) > settings.FACE_STREAM_MAX_FRAME_BYTES:
+                    await self.websocket.close(code=1009, reason="Frame too large")
+                    return
+                self._offer(payload)
+            elif message.get("text") is not None:
+                await self._handle_text(message["text"])
+
+    async def _decode(self, payload: bytes) -> np.ndarray:
+        if self.frame_format == "gray":
+            height, width = self.frame_shape
+            if len(payload) != height * width:
+                raise ValueError(f"Expected {height * width} bytes for a {width}x{height} gray frame, got {len(payload)}")
+            return np.frombuffer(payload, dtype=np.uint8).reshape(height, width)
+        return await self.service.executor.run_cpu(decode_image, payload)
+
+    async def _process_loop(self):
+        while True:
+            await self._frame_ready.wait()
+            self._frame_ready.clear()
+            if self._pending is None:
+                continue
+            frame_id, received_at, payload = self._pending
+            self._pending = None
+
+            started = time.monotonic()
+            try:
+                image_array = await self._decode(payload)
+                if self.tracker is not None:
+                    result = await self.service.analyze_tracked(image_array, self.tracker)
+                else:
+                    result = await self.service.analyze_image(image_array)
+            except Exception as e:
+                # Bad frame, executor saturated or a failure: report it and move on to the next frame
+                await self._report_failure("frame_id", frame_id, e)
+                continue
+            self.stats.record(received_at, time.monotonic() - started)
+
+            await self._send({
+                "type": "result",
+                "frame_id": frame_id,
+                **result,
+                "lag_ms": (time.monotonic() - received_at) * 1000.0,
+                "frames_dropped": self.stats.frames_dropped,
+            })
+
+
+stream_manager = StreamManager(FaceStreamSession, settings.FACE_STREAM_MAX_CONNECTIONS)
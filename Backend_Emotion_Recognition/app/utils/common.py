@@ -1,9 +1,10 @@
 import os
+import time
 from pathlib import Path
 import shutil
 
 def clean_old_files(directory: Path, max_age_hours: int = 24):
-    """Clean up old files from a directory"""
+    """Clean up old files from a directory (one-off; the running server uses app.core.storage)"""
     for file_path in directory.glob("*"):
         if file_path.is_file():
             # Get file age in hours
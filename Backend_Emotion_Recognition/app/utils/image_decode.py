@@ -0,0 +1,218 @@
+import math
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+# JPEG DCT-domain scale factors libjpeg can decode to directly (IMREAD_REDUCED_*)
+REDUCED_FACTORS = (8, 4, 2)
+# A reduced decode keeps at least this multiple of the detector's max side, so
+# its INTER_AREA downscale to max side still averages over several DCT pixels
+# (at 1x, e.g. 4032 px decoded at 1/4 then resized to 640, Haar boxes shift)
+REDUCED_HEADROOM = 2
+_GRAY_FLAGS = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+_COLOR_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+# Start-of-frame markers (they carry the image size); C4 / C8 / CC are not SOFs
+_JPEG_SOF = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def is_jpeg(contents) -> bool:
+    return bytes(contents[:3]) == b"\xff\xd8\xff"
+
+
+def jpeg_size(contents) -> Optional[Tuple[int, int]]:
+    """(width, height) from a JPEG's frame header without decoding it; None if not a JPEG."""
+    if not is_jpeg(contents):
+        return None
+    pos, end = 2, len(contents)
+    while pos + 4 <= end:
+        if contents[pos] != 0xFF:
+            return None
+        marker = contents[pos + 1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:  # standalone markers
+            pos += 2
+            continue
+        if marker in (0xD9, 0xDA):  # end of image / scan data before any frame header
+            return None
+        if marker in _JPEG_SOF:
+            if pos + 9 > end:
+                return None
+            height = (contents[pos + 5] << 8) | contents[pos + 6]
+            width = (contents[pos + 7] << 8) | contents[pos + 8]
+            return (width, height) if width and height else None
+        pos += 2 + ((contents[pos + 2] << 8) | contents[pos + 3])
+    return None
+
+
+def reduction_factor(width: int, height: int, max_side: int) -> int:
+    """Largest DCT scale factor whose decode keeps the longest side >= REDUCED_HEADROOM * max_side (1 = full size)."""
+    if not max_side:
+        return 1
+    longest = max(width, height)
+    for factor in REDUCED_FACTORS:
+        if math.ceil(longest / factor) >= REDUCED_HEADROOM * max_side:
+            return factor
+    return 1
+
+
+class DecodedImage:
+    """An image decoded at the resolution face detection needs.
+
+    ``image`` is the decoded array (2-D grayscale or BGR), possibly a 1/2,
+    1/4 or 1/8 scale decode of a ``width`` x ``height`` original. Boxes and
+    locations are always in original-image pixels. Full-resolution grayscale
+    and colour images are decoded from ``source`` (the encoded upload) only
+    when a crop or artefact needs them, and kept.
+    """
+
+    def __init__(self, image: np.ndarray, width: int, height: int, source=None):
+        self.image = image
+        self.width = width
+        self.height = height
+        self.scale_x = width / image.shape[1]
+        self.scale_y = height / image.shape[0]
+        self.source = source
+        self.full_decodes = 0
+        self._gray = None
+        self._full_gray = image if image.ndim == 2 and not self.reduced else None
+        self._full_color = image if image.ndim == 3 and not self.reduced else None
+
+    @classmethod
+    def from_array(cls, img_array: np.ndarray) -> "DecodedImage":
+        """Wrap an already decoded full-resolution array (BGR, BGRA or 2-D grayscale)."""
+        if img_array.ndim == 3 and img_array.shape[2] == 4:
+            img_array = cv2.cvtColor(img_array, cv2.COLOR_BGRA2BGR)
+        return cls(img_array, img_array.shape[1], img_array.shape[0])
+
+    @property
+    def reduced(self) -> bool:
+        return self.image.shape[:2] != (self.height, self.width)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the decoded arrays."""
+        arrays = {id(a): a for a in (self.image, self._gray, self._full_gray, self._full_color) if a is not None}
+        return sum(a.nbytes for a in arrays.values())
+
+    @property
+    def scale(self) -> float:
+        """Original pixels per decoded pixel (1.0 at full resolution)."""
+        return max(self.scale_x, self.scale_y)
+
+    def gray(self) -> np.ndarray:
+        """The decoded image in grayscale (same resolution as ``image``)."""
+        if self._gray is None:
+            self._gray = self.image if self.image.ndim == 2 else cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    def detection_image(self, color: bool) -> np.ndarray:
+        return self.image if color else self.gray()
+
+    def _decode_full(self, flags: int) -> np.ndarray:
+        if self.source is None:
+            raise ValueError("Full-resolution decode needs the encoded image")
+        image = cv2.imdecode(np.frombuffer(self.source, np.uint8), flags)
+        if image is None:
+            raise ValueError("Could not decode image")
+        self.full_decodes += 1
+        return image
+
+    def full_gray(self) -> np.ndarray:
+        if self._full_gray is None:
+            if not self.reduced:
+                self._full_gray = self.gray()
+            else:
+                self._full_gray = self._decode_full(cv2.IMREAD_GRAYSCALE)
+        return self._full_gray
+
+    def full_color(self) -> np.ndarray:
+        """Full-resolution BGR image (the grayscale array for grayscale-only inputs)."""
+        if self._full_color is None:
+            if self.source is None:
+                return self.full_gray()
+            self._full_color = self._decode_full(cv2.IMREAD_COLOR)
+        return self._full_color
+
+    def to_original(self, boxes: np.ndarray) -> np.ndarray:
+        """Map (x, y, w, h) boxes from decoded to original pixels, clipped to the image."""
+        boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+        if not self.reduced or len(boxes) == 0:
+            return boxes
+        scaled = np.round(boxes * np.array([self.scale_x, self.scale_y, self.scale_x, self.scale_y])).astype(np.int32)
+        scaled[:, 0] = np.clip(scaled[:, 0], 0, self.width - 1)
+        scaled[:, 1] = np.clip(scaled[:, 1], 0, self.height - 1)
+        scaled[:, 2] = np.minimum(scaled[:, 2], self.width - scaled[:, 0])
+        scaled[:, 3] = np.minimum(scaled[:, 3], self.height - scaled[:, 1])
+        return scaled
+
+    def crop_gray(self, location: dict, min_side: int) -> np.ndarray:
+        """Grayscale crop of an original-pixel location (left/top/right/bottom).
+
+        Taken from the reduced decode when the face there is at least
+        ``min_side`` px (the model input size), else from full resolution.
+        """
+        left, top, right, bottom = location["left"], location["top"], location["right"], location["bottom"]
+        if self.reduced:
+            x0, x1 = int(left / self.scale_x), int(math.ceil(right / self.scale_x))
+            y0, y1 = int(top / self.scale_y), int(math.ceil(bottom / self.scale_y))
+            if min(x1 - x0, y1 - y0) >= min_side:
+                return self.gray()[y0:y1, x0:x1]
+        return self.full_gray()[top:bottom, left:right]
+
+    def crop_color(self, location: dict) -> np.ndarray:
+        return self.full_color()[location["top"]:location["bottom"], location["left"]:location["right"]]
+
+
+def decode_for_detection(contents, max_side: int, color: bool = False, reduced: bool = True) -> DecodedImage:
+    """Decode an upload at the smallest resolution detection at ``max_side`` needs.
+
+    JPEGs are decoded in grayscale unless ``color`` (DNN detectors), at 1/2,
+    1/4 or 1/8 scale in the DCT domain when larger than needed and ``reduced``.
+    Other formats are decoded in colour at full size: a grayscale PNG decode
+    saves nothing, and libpng's RGB -> gray conversion differs from
+    ``cv2.cvtColor`` enough to change Haar detections.
+    The encoded bytes are not attached (set ``source`` for lazy full
+    decodes), so the result can cross a process pool cheaply.
+
+    Raises ValueError when the image cannot be decoded.
+    """
+    if not is_jpeg(contents):
+        image = cv2.imdecode(np.frombuffer(contents, np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError("Could not decode image")
+        return DecodedImage(image, image.shape[1], image.shape[0])
+
+    flags = _COLOR_FLAGS if color else _GRAY_FLAGS
+    size = jpeg_size(contents) if reduced else None
+    factor = reduction_factor(size[0], size[1], max_side) if size else 1
+    buffer = np.frombuffer(contents, np.uint8)
+    image = cv2.imdecode(buffer, flags[factor])
+    if image is None:
+        raise ValueError("Could not decode image")
+    if factor == 1:
+        return DecodedImage(image, image.shape[1], image.shape[0])
+
+    width, height = size
+    decoded = (image.shape[1], image.shape[0])
+    if decoded == (math.ceil(height / factor), math.ceil(width / factor)) and width != height:
+        width, height = height, width  # rotated by the EXIF orientation
+    elif decoded != (math.ceil(width / factor), math.ceil(height / factor)):
+        # Unexpected scaled size: fall back to a full-size decode
+        image = cv2.imdecode(buffer, flags[1])
+        if image is None:
+            raise ValueError("Could not decode image")
+        return DecodedImage(image, image.shape[1], image.shape[0])
+    return DecodedImage(image, width, height)
@@ -2,8 +2,10 @@ from fastapi import HTTPException, UploadFile
 import cv2
 import numpy as np
 from app.core.config import settings
-import aiofiles
+from app.core.storage import record_file
+from app.utils.image_decode import is_jpeg
 from pathlib import Path
+from app.utils.upload import read_upload, save_upload_to, too_large
 
 async def validate_image(file: UploadFile):
     """Validate uploaded image file"""
@@ -13,72 +15,83 @@ async def validate_image(file: UploadFile):
             detail=f"File type not allowed. Allowed types: {settings.ALLOWED_IMAGE_TYPES}"
         )
     
-    if file.size > settings.MAX_UPLOAD_SIZE:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File size too large. Maximum size: {settings.MAX_UPLOAD_SIZE/1024/1024}MB"
-        )
+    # Same 413 as read_upload, just earlier when the size is known (None for some clients)
+    if file.size is not None and file.size > settings.MAX_UPLOAD_SIZE:
+        raise too_large(settings.MAX_UPLOAD_SIZE)
 
 async def save_upload_file(upload_file: UploadFile, folder: str) -> Path:
     """Save uploaded file and return the path"""
     try:
         file_path = Path(settings.UPLOAD_DIR) / folder / upload_file.filename
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await upload_file.read()
-            await f.write(content)
-            
+        # Written in chunks, never held in memory as a whole; 413 over MAX_UPLOAD_SIZE
+        size = await save_upload_to(upload_file, file_path)
+        record_file("uploads", file_path, size)
         return file_path
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Could not save file: {str(e)}")
 
+def decode_image(contents: bytes, grayscale: bool = False) -> np.ndarray:
+    """Decode encoded image bytes into a BGR (or 2-D grayscale) numpy array (blocking, CPU-bound)
+
+    Only JPEGs are decoded straight to grayscale (luma plane); other formats
+    go through IMREAD_COLOR + cvtColor, as the model and detector expect.
+    """
+    nparr = np.frombuffer(contents, np.uint8)
+    direct_gray = grayscale and is_jpeg(contents)
+    img = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE if direct_gray else cv2.IMREAD_COLOR)
+
+    if img is None:
+        raise ValueError("Could not decode image")
+
+    if grayscale and not direct_gray:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    return img
+
 async def load_image_into_numpy_array(file: UploadFile):
     """Load image from UploadFile into numpy array"""
+    contents = await read_upload(file)
     try:
-        contents = await file.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if img is None:
-            raise HTTPException(status_code=400, detail="Could not decode image")
-            
-        return img
+        return decode_image(contents)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error processing image: {str(e)}")
 
+def draw_result(img: np.ndarray, face_location: dict, emotion: str, confidence: float) -> np.ndarray:
+    """Draw the face box and prediction onto img (in place) and return it"""
+    # Support two possible face_location formats:
+    # 1) {'x', 'y', 'width', 'height'}
+    # 2) {'left', 'top', 'right', 'bottom'}
+    if {'x', 'y', 'width', 'height'}.issubset(face_location.keys()):
+        x = int(face_location['x'])
+        y = int(face_location['y'])
+        w = int(face_location['width'])
+        h = int(face_location['height'])
+    elif {'left', 'top', 'right', 'bottom'}.issubset(face_location.keys()):
+        left = int(face_location['left'])
+        top = int(face_location['top'])
+        right = int(face_location['right'])
+        bottom = int(face_location['bottom'])
+        x, y, w, h = left, top, right - left, bottom - top
+    else:
+        raise ValueError('Unsupported face_location format')
+
+    # Draw face rectangle
+    cv2.rectangle(img, (x, y), (x + w, y + h), (0, 255, 0), 2)
+
+    # Prepare prediction text: if confidence in 0..1 convert to percent
+    display_conf = (confidence * 100) if confidence <= 1.0 else confidence
+    text = f"{emotion}: {display_conf:.1f}%"
+    cv2.putText(img, text, (x, max(15, y - 10)), cv2.FONT_HERSHEY_SIMPLEX, 
+                0.9, (0, 255, 0), 2)
+    return img
+
 def save_result_image(original_img: np.ndarray, face_location: dict, emotion: str, 
                      confidence: float, file_name: str) -> str:
     """Save result image with face detection box and prediction"""
     try:
-        img_with_box = original_img.copy()
+        img_with_box = draw_result(original_img.copy(), face_location, emotion, confidence)
 
-        # Support two possible face_location formats:
-        # 1) {'x', 'y', 'width', 'height'}
-        # 2) {'left', 'top', 'right', 'bottom'}
-        if {'x', 'y', 'width', 'height'}.issubset(face_location.keys()):
-            x = int(face_location['x'])
-            y = int(face_location['y'])
-            w = int(face_location['width'])
-            h = int(face_location['height'])
-        elif {'left', 'top', 'right', 'bottom'}.issubset(face_location.keys()):
-            left = int(face_location['left'])
-            top = int(face_location['top'])
-            right = int(face_location['right'])
-            bottom = int(face_location['bottom'])
-            x, y, w, h = left, top, right - left, bottom - top
-        else:
-            raise ValueError('Unsupported face_location format')
-
-        # Draw face rectangle
-        cv2.rectangle(img_with_box, (x, y), (x + w, y + h), (0, 255, 0), 2)
-
-        # Prepare prediction text: if confidence in 0..1 convert to percent
-        display_conf = (confidence * 100) if confidence <= 1.0 else confidence
-        text = f"{emotion}: {display_conf:.1f}%"
-        cv2.putText(img_with_box, text, (x, max(15, y - 10)), cv2.FONT_HERSHEY_SIMPLEX, 
-                    0.9, (0, 255, 0), 2)
-        
         # Save result
         result_path = Path(settings.RESULTS_DIR) / file_name
         result_path.parent.mkdir(parents=True, exist_ok=True)
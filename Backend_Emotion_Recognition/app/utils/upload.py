@@ -0,0 +1,276 @@
+import binascii
+import re
+from pathlib import Path
+from typing import Optional
+
+import aiofiles
+from fastapi import HTTPException, Request, UploadFile
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+
+from app.core.config import settings
+from app.core.logger import setup_logger
+from app.core.metrics import stage
+
+logger = setup_logger(__name__)
+
+# Uploads are read / written / base64-decoded this many bytes at a time
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def _mb(size: int) -> str:
+    return f"{size / 1024 / 1024:g}MB"
+
+
+def too_large(limit: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Upload too large. Maximum size: {_mb(limit)}")
+
+
+def request_size_limit(path: str) -> int:
+    """Body size limit for a request path: longest matching REQUEST_SIZE_LIMITS prefix, else MAX_REQUEST_SIZE."""
+    matches = [prefix for prefix in settings.REQUEST_SIZE_LIMITS if path.startswith(prefix)]
+    return settings.REQUEST_SIZE_LIMITS[max(matches, key=len)] if matches else settings.MAX_REQUEST_SIZE
+
+
+class RequestTooLarge(Exception):
+    pass
+
+
+class RequestSizeLimitMiddleware:
+    """Reject request bodies over the path's size limit while they stream in.
+
+    A ``Content-Length`` over the limit is answered with 413 before the body
+    is read. Chunked bodies are counted as they arrive and cut off at the
+    limit, so an oversized upload is never fully received, spooled to disk
+    by the multipart parser or held in memory.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    async def _reject(scope, receive, send, limit: int):
+        response = JSONResponse(status_code=413, content={"detail": too_large(limit).detail})
+        await response(scope, receive, send)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        limit = request_size_limit(scope["path"])
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            await self._reject(scope, receive, send, limit)
+            return
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    exceeded = True
+                    raise RequestTooLarge()
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            if exceeded:
+                return  # body parsing failed because of us: the 413 below replaces the app's error
+            response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except RequestTooLarge:
+            pass
+        if exceeded and not response_started:
+            logger.warning(f"Rejected {scope['path']}: body over {_mb(limit)}")
+            await self._reject(scope, receive, send, limit)
+
+
+async def read_upload(file: UploadFile, limit: Optional[int] = None) -> memoryview:
+    """Read an uploaded file, enforcing ``limit`` (default MAX_UPLOAD_SIZE) while reading.
+
+    The spooled upload is read in UPLOAD_CHUNK_SIZE chunks straight into one
+    buffer (``readinto``: no per-chunk bytes, no join), so at most ``limit``
+    bytes are ever held. The returned memoryview is what decoders get:
+    ``np.frombuffer``, hashing and ``audio_decode`` use it without copying.
+
+    Raises HTTPException 413 when the file is larger than ``limit``.
+    """
+    limit = settings.MAX_UPLOAD_SIZE if limit is None else limit
+    if file.size is not None and file.size > limit:
+        raise too_large(limit)
+
+    def read() -> memoryview:
+        source = file.file
+        source.seek(0)
+        buffer = bytearray(min(file.size if file.size is not None else UPLOAD_CHUNK_SIZE, limit) + 1)
+        view = memoryview(buffer)
+        length = 0
+        while True:
+            if length == len(buffer):
+                if length > limit:
+                    raise too_large(limit)
+                # Size unknown: grow geometrically up to the limit
+                view.release()
+                buffer.extend(bytes(min(len(buffer), limit + 1 - length)))
+                view = memoryview(buffer)
+            count = source.readinto(view[length:length + UPLOAD_CHUNK_SIZE])
+            if not count:
+                break
+            length += count
+        if length > limit:
+            raise too_large(limit)
+        return view[:length]
+
+    with stage("read"):
+        view = await run_in_threadpool(read)
+    if view.nbytes == 0:
+        raise HTTPException(status_code=400, detail="Empty upload")
+    return view
+
+
+async def save_upload_to(file: UploadFile, path: Path, limit: Optional[int] = None) -> int:
+    """Copy an upload to ``path`` in UPLOAD_CHUNK_SIZE chunks; returns the size written.
+
+    A file over ``limit`` (default MAX_UPLOAD_SIZE) is removed and 413 raised.
+    """
+    limit = settings.MAX_UPLOAD_SIZE if limit is None else limit
+    if file.size is not None and file.size > limit:
+        raise too_large(limit)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    await file.seek(0)
+    written = 0
+    try:
+        async with aiofiles.open(path, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                written += len(chunk)
+                if written > limit:
+                    raise too_large(limit)
+                await out.write(chunk)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return written
+
+
+class Base64StreamDecoder:
+    """Incremental base64 decoder into one preallocated buffer.
+
+    ``feed`` takes any slice of the encoded text (whitespace and JSON's
+    escaped ``\\/`` allowed) and decodes every complete 4-character group,
+    carrying at most 3 characters and a dangling backslash to the next call.
+    """
+
+    _ESCAPE = re.compile(rb"\\(.)", re.S)
+    _WHITESPACE = re.compile(rb"\s+")
+
+    def __init__(self, limit: int, size_hint: int = 0):
+        self.limit = limit
+        self._buffer = bytearray(min(max(size_hint, 0), limit))
+        self._length = 0
+        self._pending = b""
+        self._escape = b""
+
+    def feed(self, text: bytes):
+        text = self._escape + text
+        # A trailing backslash starts an escape that ends in the next chunk
+        backslashes = len(text) - len(text.rstrip(b"\\"))
+        self._escape = b"\\" if backslashes % 2 else b""
+        if self._escape:
+            text = text[:-1]
+        # JSON escapes: "\/" is "/", "\n" / "\r" line breaks are dropped
+        text = self._ESCAPE.sub(lambda m: b"/" if m.group(1) == b"/" else b"\n", text)
+        text = self._pending + self._WHITESPACE.sub(b"", text)
+        usable = len(text) - len(text) % 4
+        self._pending = text[usable:]
+        if usable:
+            self._write(text[:usable])
+
+    def _write(self, text: bytes):
+        try:
+            decoded = binascii.a2b_base64(text, strict_mode=True)
+        except binascii.Error as e:
+            raise ValueError(f"Invalid base64 data: {e}")
+        end = self._length + len(decoded)
+        if end > self.limit:
+            raise too_large(self.limit)
+        if end > len(self._buffer):
+            self._buffer.extend(bytes(end - len(self._buffer)))
+        self._buffer[self._length:end] = decoded
+        self._length = end
+
+    def finish(self) -> memoryview:
+        if self._pending:
+            # Tolerate missing "=" padding
+            self._write(self._pending + b"=" * (-len(self._pending) % 4))
+            self._pending = b""
+        return memoryview(self._buffer)[:self._length]
+
+
+_FIELD_PREFIX_MAX = 64 * 1024
+
+
+async def read_base64_field(request: Request, field: str, limit: Optional[int] = None) -> memoryview:
+    """Decode a base64 string field of a JSON request body while the body streams in.
+
+    The body is never materialized as text: bytes before the field's value
+    (at most 64 KB) are scanned for ``"field": "``, an optional
+    ``data:...;base64,`` prefix is skipped, and the value is decoded chunk by
+    chunk into a buffer of about 3/4 of the body size. The decoded upload is
+    capped at ``limit`` (default MAX_UPLOAD_SIZE).
+
+    Raises ValueError for a body without the field or with invalid base64,
+    HTTPException 413 when the decoded upload is too large.
+    """
+    limit = settings.MAX_UPLOAD_SIZE if limit is None else limit
+    content_length = request.headers.get("content-length", "")
+    size_hint = int(content_length) * 3 // 4 if content_length.isdigit() else 0
+    decoder = Base64StreamDecoder(limit, size_hint)
+    key = re.compile(rb'"' + re.escape(field.encode()) + rb'"\s*:\s*"')
+
+    head = b""
+    state = "key"  # key -> prefix (data URL header) -> value -> done
+    async for chunk in request.stream():
+        if state == "done":
+            continue
+        if state != "value":
+            head += chunk
+            if state == "key":
+                match = key.search(head)
+                if match is None:
+                    if len(head) > _FIELD_PREFIX_MAX:
+                        raise ValueError(f"Missing {field} field")
+                    continue
+                head, state = head[match.end():], "prefix"
+            if state == "prefix":
+                # "data:audio/wav;base64," header, if any, ends at the first comma
+                comma, quote = head.find(b","), head.find(b'"')
+                data_url = head.startswith(b"data:") or (len(head) < 5 and b"data:".startswith(head))
+                if data_url and comma < 0 and quote < 0:
+                    if len(head) > _FIELD_PREFIX_MAX:
+                        raise ValueError(f"Invalid {field} data URL")
+                    continue
+                if data_url and 0 <= comma and (quote < 0 or comma < quote):
+                    head = head[comma + 1:]
+                chunk, head, state = head, b"", "value"
+        end = chunk.find(b'"')
+        if end >= 0:
+            chunk, state = chunk[:end], "done"
+        decoder.feed(chunk)
+
+    if state != "done":
+        if state == "key":
+            raise ValueError(f"Missing {field} field")
+        raise ValueError("Request body is not valid JSON")
+    data = decoder.finish()
+    if data.nbytes == 0:
+        raise ValueError(f"Missing {field} field")
+    return data
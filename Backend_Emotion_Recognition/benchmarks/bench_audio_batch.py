@@ -0,0 +1,91 @@
+"""Clips/sec for offline scoring: one /audio/predict call per clip vs /audio/predict-batch.
+
+Usage (from Backend_Emotion_Recognition/):
+    python -m benchmarks.bench_audio_batch [--clips 64] [--batch 64] [--audio a.wav ...]
+
+Uses AudioService directly (no HTTP) with the prediction cache disabled.
+Clips are --audio files, repeated up to --clips, or synthetic 4 s WAVs at
+mixed sample rates. The sequential path awaits ``predict`` per clip; the batch
+path sends --batch clips per ``predict_batch`` call (process-pool feature
+extraction, one scaler call, one forward pass). Both paths must return the
+same emotion for every clip; max |prob diff| is reported.
+"""
+import argparse
+import asyncio
+import io
+import os
+import time
+
+import numpy as np
+
+os.environ["PREDICTION_CACHE_ENABLED"] = "false"
+
+from app.services.audio_service import AudioService  # noqa: E402
+
+
+def synthetic_wavs(n: int):
+    import soundfile as sf
+
+    rng = np.random.default_rng(0)
+    clips = []
+    for i in range(n):
+        sr = (16000, 22050, 44100)[i % 3]
+        t = np.arange(4 * sr) / sr
+        data = 0.2 * np.sin(2 * np.pi * (120 + 15 * i) * t) * (0.5 + 0.5 * np.sin(2 * np.pi * (1 + i % 5) * t))
+        data += 0.02 * rng.standard_normal(t.shape[0])
+        buffer = io.BytesIO()
+        sf.write(buffer, data.astype(np.float32), sr, format="WAV")
+        clips.append((f"synthetic-{i}.wav", buffer.getvalue()))
+    return clips
+
+
+async def run(service, clips, batch):
+    # Warm up: model load + graph buckets, process pool start-up
+    await service.predict(clips[0][1])
+    await service.predict_batch(clips[:batch])
+
+    started = time.perf_counter()
+    sequential = [await service.predict(contents) for _, contents in clips]
+    sequential_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batched = []
+    for i in range(0, len(clips), batch):
+        batched.extend(await service.predict_batch(clips[i:i + batch]))
+    batch_s = time.perf_counter() - started
+
+    mismatches = sum(a["emotion"] != b["emotion"] for a, b in zip(sequential, batched))
+    max_diff = max(
+        abs(a["all_emotions"][label] - b["all_emotions"][label])
+        for a, b in zip(sequential, batched)
+        for label in a["all_emotions"]
+    )
+    n = len(clips)
+    print(f"clips {n}, batch {batch}, feature workers {service.batch_executor.max_workers} ({service.batch_executor.kind})")
+    print(f"  sequential predict : {sequential_s:7.2f} s  {n / sequential_s:7.1f} clips/s")
+    print(f"  predict_batch      : {batch_s:7.2f} s  {n / batch_s:7.1f} clips/s  ({sequential_s / batch_s:.1f}x)")
+    print(f"  emotion mismatches {mismatches}, max |prob diff| {max_diff:.2e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clips", type=int, default=64)
+    parser.add_argument("--batch", type=int, default=64)
+    parser.add_argument("--audio", nargs="*", default=[])
+    args = parser.parse_args()
+
+    if args.audio:
+        files = []
+        for path in args.audio:
+            with open(path, "rb") as f:
+                files.append((os.path.basename(path), f.read()))
+        clips = [files[i % len(files)] for i in range(args.clips)]
+    else:
+        clips = synthetic_wavs(args.clips)
+
+    service = AudioService()
+    asyncio.run(run(service, clips, args.batch))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Audio decode per upload: librosa.load vs audio_decode.decode_audio, per container format.
+
+Usage (from Backend_Emotion_Recognition/):
+    python -m benchmarks.bench_audio_decode [--audio a.webm b.mp3 ...] [--sr 44100] [--repeats 30]
+                                            [--resampler soxr_hq]
+
+Clips are decoded like /audio/predict (22.05 kHz mono, 2.5 s from 0.6 s).
+Synthetic 10 s stereo clips at --sr are encoded to WAV / FLAC / OGG / MP3
+with soundfile; the browser recordings in ../export_video_audio (WebM/Opus)
+and any --audio files are added. For each clip the legacy path
+(``librosa.load`` on a BytesIO, which falls back to audioread/ffmpeg for
+formats libsndfile cannot read) and ``decode_audio`` are timed, and the two
+waveforms are compared. "failed" means the path cannot decode that file here
+(e.g. WebM without PyAV or ffmpeg).
+"""
+import argparse
+import io
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+from app.services.audio_decode import decode_audio, sniff_container
+
+SR = 22050
+DURATION = 2.5
+OFFSET = 0.6
+SAMPLES_DIR = Path(__file__).resolve().parents[2] / "export_video_audio"
+FORMATS = (("WAV", "PCM_16"), ("FLAC", "PCM_16"), ("OGG", "VORBIS"), ("MP3", "MPEG_LAYER_III"))
+
+# librosa's audioread fallback warning; the failure itself is reported
+warnings.filterwarnings("ignore", message="PySoundFile failed")
+warnings.filterwarnings("ignore", category=FutureWarning)
+
+
+def synthetic_clips(sr):
+    import soundfile as sf
+
+    rng = np.random.default_rng(0)
+    t = np.arange(10 * sr) / sr
+    mono = 0.2 * np.sin(2 * np.pi * 180 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t))
+    stereo = np.stack([mono, 0.5 * mono], axis=1) + 0.01 * rng.standard_normal((t.shape[0], 2))
+    clips = {}
+    for fmt, subtype in FORMATS:
+        buffer = io.BytesIO()
+        sf.write(buffer, stereo.astype(np.float32), sr, format=fmt, subtype=subtype)
+        clips[f"synthetic.{fmt.lower()} ({sr} Hz)"] = buffer.getvalue()
+    return clips
+
+
+def librosa_load(contents, resampler):
+    import librosa
+
+    return librosa.load(io.BytesIO(contents), sr=SR, duration=DURATION, offset=OFFSET, res_type=resampler)[0]
+
+
+def timed(fn, repeats):
+    """Mean ms per call, or the error message when the first call fails."""
+    try:
+        result = fn()
+    except Exception as e:
+        return None, f"{type(e).__name__}: {str(e)[:60]}"
+    started = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return result, (time.perf_counter() - started) / repeats * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--audio", nargs="*", default=[])
+    parser.add_argument("--sr", type=int, default=44100, help="sample rate of the synthetic clips")
+    parser.add_argument("--repeats", type=int, default=30)
+    parser.add_argument("--resampler", default="soxr_hq")
+    args = parser.parse_args()
+
+    clips = synthetic_clips(args.sr)
+    for path in sorted(SAMPLES_DIR.glob("audio*.web*")) + [Path(p) for p in args.audio]:
+        clips[path.name] = path.read_bytes()
+
+    print(f"{'clip':<28} {'format':>7} {'librosa.load ms':>16} {'decode_audio ms':>16}   max |diff|")
+    for name, contents in clips.items():
+        reference, legacy = timed(lambda: librosa_load(contents, args.resampler), args.repeats)
+        decoded, fast = timed(lambda: decode_audio(contents, SR, DURATION, OFFSET, args.resampler)[0], args.repeats)
+        if reference is not None and decoded is not None and reference.shape == decoded.shape:
+            diff = f"{np.abs(reference - decoded).max():.1e}"
+        elif reference is not None and decoded is not None:
+            diff = f"shape {reference.shape} vs {decoded.shape}"
+        else:
+            diff = "-"
+        legacy = f"{legacy:16.2f}" if isinstance(legacy, float) else f"{'failed':>16}"
+        fast_text = f"{fast:16.2f}" if isinstance(fast, float) else f"{'failed':>16}"
+        print(f"{name:<28} {sniff_container(contents):>7} {legacy} {fast_text}   {diff}")
+        if not isinstance(fast, float):
+            print(f"{'':<28} decode_audio: {fast}")
+
+
+if __name__ == "__main__":
+    main()
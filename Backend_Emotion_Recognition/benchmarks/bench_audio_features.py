@@ -0,0 +1,118 @@
+"""Audio feature extraction per clip: librosa (3 separate passes) vs the shared-STFT extractor.
+
+Usage (from Backend_Emotion_Recognition/):
+    python -m benchmarks.bench_audio_features [--audio a.wav b.wav ...] [--repeats 50] [--check]
+
+Clips are decoded like /audio/predict (22.05 kHz, 2.5 s from 0.6 s) when
+given with --audio; a set of synthetic clips (harmonic tones with noise,
+silence with a burst, a clip shorter than one frame, clipped square wave)
+is always included. For every clip the two feature vectors (2376 floats:
+ZCR | RMS | MFCC) are compared per block - this is the parity check;
+``--check`` exits non-zero when any block differs by more than its
+tolerance. Timings are the mean of --repeats warm runs per clip.
+"""
+import argparse
+import sys
+import time
+import warnings
+
+import numpy as np
+
+from app.services.audio_service import decode_and_extract, extract_features, extract_features_librosa
+
+SR = 22050
+EXPECTED_SIZE = 2376
+# Absolute tolerance per block (MFCCs are in dB, values up to ~600)
+TOLERANCE = {"zcr": 1e-6, "rms": 1e-5, "mfcc": 1e-2}
+
+# librosa warns about the sub-frame clip; both paths zero-pad it the same way
+warnings.filterwarnings("ignore", message="n_fft=.* is too large")
+
+
+def synthetic_clips():
+    rng = np.random.default_rng(0)
+    n = int(SR * 2.5)
+    t = np.arange(n) / SR
+    voiced = sum(np.sin(2 * np.pi * f0 * t) / k for k, f0 in enumerate((140, 280, 420, 1100), start=1))
+    voiced = 0.2 * voiced * (0.5 + 0.5 * np.sin(2 * np.pi * 3 * t)) + 0.01 * rng.standard_normal(n)
+    burst = np.zeros(n)
+    burst[n // 3:n // 3 + 4000] = 0.5 * rng.standard_normal(4000)
+    square = np.clip(np.sign(np.sin(2 * np.pi * 220 * t)) * 1.5, -1, 1)
+    return {
+        "voiced+noise": voiced,
+        "silence+burst": burst,
+        "short (1500 samples)": voiced[:1500],
+        "clipped square": square,
+    }
+
+
+def load_clips(paths):
+    import librosa
+
+    clips = {}
+    for path in paths:
+        data, _ = librosa.load(path, sr=SR, duration=2.5, offset=0.6)
+        clips[str(path)] = data
+    return clips
+
+
+def pad(vector):
+    out = np.zeros(EXPECTED_SIZE)
+    n = min(EXPECTED_SIZE, vector.shape[0])
+    out[:n] = vector[:n]
+    return out
+
+
+def compare(reference, fast, n_frames):
+    blocks = {"zcr": slice(0, n_frames), "rms": slice(n_frames, 2 * n_frames), "mfcc": slice(2 * n_frames, None)}
+    return {name: float(np.abs(reference[sl] - fast[sl]).max(initial=0.0)) for name, sl in blocks.items()}
+
+
+def timed(fn, repeats):
+    fn()
+    started = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - started) / repeats * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--audio", nargs="*", default=[])
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--check", action="store_true", help="fail if parity exceeds TOLERANCE")
+    args = parser.parse_args()
+
+    clips = {**synthetic_clips(), **load_clips(args.audio)}
+    failed = False
+    print(f"{'clip':<24} {'librosa ms':>10} {'shared ms':>10} {'speedup':>8}   max |diff| zcr / rms / mfcc")
+    for name, data in clips.items():
+        data = data.astype(np.float32)  # librosa.load returns float32
+        n_frames = 1 + data.shape[0] // 512
+        reference = pad(extract_features_librosa(data, SR))
+        fast = extract_features(data, SR, size=EXPECTED_SIZE)
+        diffs = compare(reference, fast, n_frames)
+        bad = [block for block, diff in diffs.items() if diff > TOLERANCE[block]]
+        failed |= bool(bad)
+
+        librosa_ms = timed(lambda: pad(extract_features_librosa(data, SR)), args.repeats)
+        shared_ms = timed(lambda: extract_features(data, SR, size=EXPECTED_SIZE), args.repeats)
+        print(
+            f"{name:<24} {librosa_ms:10.2f} {shared_ms:10.2f} {librosa_ms / shared_ms:7.1f}x   "
+            f"{diffs['zcr']:.1e} / {diffs['rms']:.1e} / {diffs['mfcc']:.1e}"
+            + (f"  !! {', '.join(bad)} above tolerance" if bad else "")
+        )
+
+    for path in args.audio:
+        # Full per-request CPU path: decode + features
+        with open(path, "rb") as f:
+            contents = f.read()
+        ms = timed(lambda: decode_and_extract(contents, SR, 2.5, 0.6, 20, EXPECTED_SIZE), args.repeats)
+        print(f"decode + features {path}: {ms:.2f} ms")
+
+    if args.check and failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""/audio/stream: per-window feature cost and end-to-end latency of a live microphone stream.
+
+Usage (from Backend_Emotion_Recognition/):
+    python -m benchmarks.bench_audio_stream [--seconds 20] [--rate 48000] [--chunk-ms 100] [--hop 0.5] [--fast]
+
+1. Feature extraction per window: every window of a 30 s recording at each
+   hop, from scratch (AudioFeatureExtractor) vs with frame reuse
+   (StreamingFeatureExtractor); max |diff| must be 0.
+2. End to end through the app (TestClient WebSocket, audio role only):
+   a synthetic s16 recording at --rate is sent in --chunk-ms chunks, paced
+   in real time unless --fast. Reports the server's last-sample-to-result
+   latency, the client-observed latency (send of the chunk holding the
+   window's last sample -> result received), dropped windows and the
+   connection's buffered memory.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+os.environ.setdefault("INFERENCE_WARMUP", "false")
+os.environ.setdefault("SERVICE_ROLES", '["audio"]')
+os.environ["PREDICTION_CACHE_ENABLED"] = "false"
+
+from app.services.audio_features import StreamingFeatureExtractor, get_feature_extractor  # noqa: E402
+
+SR = 22050
+WINDOW = int(round(2.5 * SR))
+HOP_LENGTH = 512
+
+
+def synthetic(seconds: float, sr: int) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * sr)) / sr
+    f0 = 120 + 60 * (np.floor(t / 4) % 3)
+    data = 0.25 * np.sin(2 * np.pi * np.cumsum(f0) / sr) * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t))
+    return (data + 0.02 * rng.standard_normal(t.shape[0])).astype(np.float32)
+
+
+def bench_features(hops):
+    extractor = get_feature_extractor(SR, 20)
+    recording = synthetic(30, SR)
+    print(f"{'hop s':>6} {'windows':>8} {'scratch ms':>11} {'reuse ms':>9} {'speedup':>8} {'frames reused':>14} {'max |diff|':>11}")
+    for hop_seconds in hops:
+        hop = max(1, round(hop_seconds * SR / HOP_LENGTH)) * HOP_LENGTH
+        streaming = StreamingFeatureExtractor(extractor, WINDOW)
+        starts = range(0, recording.shape[0] - WINDOW + 1, hop)
+        scratch_s = reuse_s = max_diff = 0.0
+        for start in starts:
+            window = recording[start:start + WINDOW]
+            t0 = time.perf_counter()
+            reference = extractor.extract(window, 2376)
+            t1 = time.perf_counter()
+            fast = streaming.extract(start, window, 2376)
+            reuse_s += time.perf_counter() - t1
+            scratch_s += t1 - t0
+            max_diff = max(max_diff, float(np.abs(reference - fast).max()))
+        n = len(starts)
+        reused = streaming.frames_reused / max(1, streaming.frames_reused + streaming.frames_computed)
+        print(
+            f"{hop / SR:6.3f} {n:8d} {scratch_s / n * 1000:11.2f} {reuse_s / n * 1000:9.2f} "
+            f"{scratch_s / reuse_s:7.1f}x {reused:13.0%} {max_diff:11.1e}"
+        )
+
+
+def bench_stream(seconds, rate, chunk_ms, hop, fast):
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    pcm = (np.clip(synthetic(seconds, rate), -1, 1) * 32767).astype("<i2")
+    chunk = int(rate * chunk_ms / 1000)
+    sent_at = []
+    results, latencies, client_latencies = [], [], []
+
+    with TestClient(app) as client, client.websocket_connect("/audio/stream") as ws:
+        ws.send_text(json.dumps({"type": "config", "format": "s16", "sample_rate": rate, "hop": hop}))
+        config = ws.receive_json()
+        done = threading.Event()
+
+        def receive():
+            while not done.is_set():
+                message = ws.receive_json()
+                received = time.perf_counter()
+                if message["type"] == "result":
+                    results.append(message)
+                    latencies.append(message["latency_ms"])
+                    last_chunk = max(0, int(np.ceil(message["end"] * rate / chunk)) - 1)
+                    if last_chunk < len(sent_at):
+                        client_latencies.append((received - sent_at[last_chunk]) * 1000.0)
+                elif message["type"] == "stats":
+                    results.append(message)
+                    done.set()
+
+        receiver = threading.Thread(target=receive, daemon=True)
+        receiver.start()
+        # Warm up the model outside the measurement
+        ws.send_bytes(np.zeros(int(2.6 * rate), dtype="<i2").tobytes())
+        ws.send_text(json.dumps({"type": "flush"}))
+        time.sleep(3.0)
+        del results[:], latencies[:], client_latencies[:]
+
+        started = time.perf_counter()
+        for i in range(0, pcm.shape[0], chunk):
+            if not fast:
+                delay = started + i / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            sent_at.append(time.perf_counter())
+            ws.send_bytes(pcm[i:i + chunk].tobytes())
+        time.sleep(1.0)
+        ws.send_text(json.dumps({"type": "stats"}))
+        receiver.join(timeout=30)
+        stats = results.pop() if results and results[-1]["type"] == "stats" else {}
+
+    def pct(values):
+        if not values:
+            return "-"
+        p50, p95 = np.percentile(values, [50, 95])
+        return f"p50 {p50:6.1f} ms  p95 {p95:6.1f} ms  max {max(values):6.1f} ms"
+
+    print(
+        f"\nstream: {seconds:g} s of s16 @ {rate} Hz in {chunk_ms} ms chunks, hop {config['hop']:.3f} s, "
+        f"{'unpaced' if fast else 'real time'}"
+    )
+    print(f"  windows {len(results)}, dropped {stats.get('windows_dropped', '?')}, errors {stats.get('errors', '?')}")
+    print(f"  server latency (last sample -> result): {pct(latencies)}")
+    print(f"  client latency (chunk sent -> result) : {pct(client_latencies)}")
+    print(
+        f"  connection memory {stats.get('memory_bytes', 0) / 1e3:.0f} kB, "
+        f"frames reused {stats.get('frames_reused', 0)} / computed {stats.get('frames_computed', 0)}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--rate", type=int, default=48000)
+    parser.add_argument("--chunk-ms", type=int, default=100)
+    parser.add_argument("--hop", type=float, default=0.5)
+    parser.add_argument("--fast", action="store_true", help="send as fast as possible instead of in real time")
+    args = parser.parse_args()
+
+    bench_features([0.25, 0.5, 1.0, 2.5])
+    bench_stream(args.seconds, args.rate, args.chunk_ms, args.hop, args.fast)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Timeline mode throughput and memory vs recording length.
+
+Usage (from Backend_Emotion_Recognition/):
+    python -m benchmarks.bench_audio_timeline [--minutes 1 5 20] [--hop 1.0] [--sr 16000]
+
+Writes a synthetic 16-bit mono WAV of each length to a temp dir (or analyzes
+--audio files), runs AudioService's timeline pass on the open file and reports
+windows, audio-seconds per wall-second and the peak Python/NumPy memory
+traced by tracemalloc during the pass. Peak memory should stay flat as the
+recording gets longer; the decoded waveform of a whole file is never held.
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+os.environ.setdefault("INFERENCE_WARMUP", "false")
+
+from app.services.audio_service import AudioService  # noqa: E402
+
+
+def write_recording(path: Path, minutes: float, sr: int):
+    import soundfile as sf
+
+    rng = np.random.default_rng(0)
+    with sf.SoundFile(str(path), "w", samplerate=sr, channels=1, subtype="PCM_16") as out:
+        for second in range(int(minutes * 60)):
+            t = (np.arange(sr) + second * sr) / sr
+            f0 = 120 + 80 * ((second // 7) % 3)
+            block = 0.2 * np.sin(2 * np.pi * f0 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 2 * t))
+            out.write(block + 0.02 * rng.standard_normal(sr))
+
+
+def measure(service, path, hop):
+    with open(path, "rb") as f:
+        tracemalloc.start()
+        started = time.perf_counter()
+        result = service._run_timeline(f, hop)
+        wall = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, wall, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--audio", nargs="*", default=[])
+    parser.add_argument("--hop", type=float, default=1.0)
+    parser.add_argument("--sr", type=int, default=16000, help="sample rate of the synthetic recordings")
+    args = parser.parse_args()
+
+    service = AudioService()
+    service._load_model()
+    service.backend.warmup()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [Path(p) for p in args.audio]
+        for minutes in args.minutes if not args.audio else []:
+            path = Path(tmp) / f"recording-{minutes:g}min.wav"
+            write_recording(path, minutes, args.sr)
+            paths.append(path)
+
+        print(f"{'file':<24} {'MB':>7} {'audio s':>8} {'windows':>8} {'wall s':>7} {'audio-s/s':>9} {'peak MB':>8}")
+        for path in paths:
+            result, wall, peak = measure(service, path, args.hop)
+            print(
+                f"{path.name:<24} {path.stat().st_size / 1e6:7.1f} {result['audio_seconds']:8.1f} "
+                f"{len(result['windows']):8d} {wall:7.2f} {result['audio_seconds'] / wall:9.1f} {peak / 1e6:8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""End-to-end frame latency: /face/detect + /face/predict-batch vs /face/analyze.
+
+Usage (from Backend_Emotion_Recognition/):
+    python -m benchmarks.bench_face_analyze [--image PATH] [--tile 1 2 3] [--repeats 50]
+
+The two-request flow mirrors the previous realtime client: detect with
+``include_cropped=true``, decode the base64 JPEG crops, re-upload them as
+multipart to /face/predict-batch. Both flows run in-process through the
+FastAPI TestClient, so the numbers include request parsing, decoding,
+detection, encoding and inference but no network time. ``--tile N`` repeats
+the image on an N x N grid to get frames with more faces.
+"""
+import argparse
+import base64
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+DEFAULT_IMAGE = Path(__file__).resolve().parents[2] / "export_video_audio" / "anh-1.jpg"
+
+
+def tiled_frame(image: np.ndarray, tile: int) -> bytes:
+    mosaic = np.tile(image, (tile, tile, 1))
+    ok, buffer = cv2.imencode(".jpg", mosaic, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    if not ok:
+        raise ValueError("Could not encode benchmark frame")
+    return buffer.tobytes()
+
+
+def two_request_flow(client, frame: bytes) -> int:
+    detected = client.post(
+        "/face/detect", params={"include_cropped": "true"}, files={"file": ("frame.jpg", frame, "image/jpeg")}
+    ).json()
+    crops = [
+        base64.b64decode(face["cropped_face_base64"].split(",", 1)[1])
+        for face in detected["faces"]
+    ]
+    if not crops:
+        return 0
+    files = [("files", (f"cropped_face_{i}.jpg", crop, "image/jpeg")) for i, crop in enumerate(crops)]
+    results = client.post("/face/predict-batch", files=files).json()["results"]
+    return len(results)
+
+
+def single_pass_flow(client, frame: bytes) -> int:
+    analyzed = client.post("/face/analyze", files={"file": ("frame.jpg", frame, "image/jpeg")}).json()
+    return analyzed["total_faces"]
+
+
+def measure(flow, client, frame: bytes, repeats: int):
+    faces = flow(client, frame)  # warm-up (model load, buffer pool)
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        flow(client, frame)
+        timings.append(time.perf_counter() - started)
+    timings = np.asarray(timings) * 1000.0
+    return faces, float(np.median(timings)), float(np.percentile(timings, 95))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--image", type=Path, default=DEFAULT_IMAGE)
+    parser.add_argument("--tile", nargs="+", type=int, default=[1, 2, 3])
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    image = cv2.imread(str(args.image), cv2.IMREAD_COLOR)
+    if image is None:
+        raise SystemExit(f"Cannot read image {args.image}")
+
+    with TestClient(app) as client:
+        print(f"{'flow':<28} {'frame':>11} {'faces':>5} {'p50 ms':>8} {'p95 ms':>8}")
+        for tile in args.tile:
+            frame = tiled_frame(image, tile)
+            size = f"{image.shape[1] * tile}x{image.shape[0] * tile}"
+            for label, flow in (
+                ("detect + predict-batch", two_request_flow),
+                ("analyze (single pass)", single_pass_flow),
+            ):
+                faces, p50, p95 = measure(flow, client, frame, args.repeats)
+                print(f"{label:<28} {size:>11} {faces:>5} {p50:>8.2f} {p95:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Decode + detect time and memory per large JPEG upload: full-size colour decode vs the decode planner.
+
+Usage (from Backend_Emotion_Recognition/):
+    python -m benchmarks.bench_face_decode [--sizes 1280 1920 3024 4032] [--images 4] [--profile balanced] [--check]
+
+Frames with faces from the local webcam recordings (and sample photos) are
+upscaled so their longest side matches each size and encoded as JPEG (q 90).
+"legacy" is the previous path: ``cv2.imdecode(IMREAD_COLOR)`` at full size,
+grayscale conversion, then detect_and_crop_faces. "planned" decodes with
+``decode_for_detection`` (grayscale, DCT-domain 1/2 - 1/8 scale) and runs
+detect_and_crop_faces on the DecodedImage. "decode" is the decode alone,
+"total" decode + detection + crops, "+ colour" the extra cost of the lazy
+full-resolution colour decode a result image needs. "Peak MB" is traced by
+tracemalloc (decoded arrays and detector copies). "faces" counts legacy /
+planned boxes and "matched" the pairs with IoU >= 0.5. "max |dp|" isolates
+the crop source: the largest emotion-probability difference between each
+legacy box cropped from the full-resolution image and the same box cropped
+through DecodedImage.crop_gray.
+
+Before the table, every sample photo is run as-is (its own format, e.g. the
+PNG) through both paths and the boxes compared. "recall" (legacy boxes the
+planned path also finds, IoU >= 0.5) must be 100% there: --check exits
+non-zero if it is not, or if a resized size loses a box the legacy path found.
+"""
+import sys
+import argparse
+import os
+import time
+import tracemalloc
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+os.environ.setdefault("INFERENCE_WARMUP", "false")
+
+from app.models.calibration import DEFAULT_SAMPLE_DIR, IMAGE_SUFFIXES, VIDEO_SUFFIXES  # noqa: E402
+from app.models.face_model import FaceModel  # noqa: E402
+from app.models.face_preprocess import FACE_SIZE  # noqa: E402
+from app.models.face_tracker import iou  # noqa: E402
+from app.utils.image_decode import decode_for_detection  # noqa: E402
+
+
+def load_images(sample_dir: Path, limit: int, cascade) -> list:
+    """Colour images (photos, then every 25th video frame) in which the cascade finds a face."""
+    images = []
+    for path in sorted(sample_dir.glob("*")):
+        suffix = path.suffix.lower()
+        if suffix in IMAGE_SUFFIXES:
+            candidates = [cv2.imread(str(path), cv2.IMREAD_COLOR)]
+        elif suffix in VIDEO_SUFFIXES:
+            candidates, capture, idx = [], cv2.VideoCapture(str(path)), 0
+            while True:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                if idx % 25 == 0:
+                    candidates.append(frame)
+                idx += 1
+            capture.release()
+        else:
+            continue
+        for image in candidates:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image is not None else None
+            if gray is not None and len(cascade.detectMultiScale(gray, 1.1, 5, minSize=(30, 30))):
+                images.append(image)
+            if len(images) >= limit:
+                return images
+    return images
+
+
+def encode_at(image: np.ndarray, max_side: int) -> bytes:
+    scale = max_side / max(image.shape[:2])
+    size = (round(image.shape[1] * scale), round(image.shape[0] * scale))
+    resized = cv2.resize(image, size, interpolation=cv2.INTER_CUBIC if scale > 1 else cv2.INTER_AREA)
+    return cv2.imencode(".jpg", resized, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+
+def decode_legacy(contents: bytes):
+    image = cv2.imdecode(np.frombuffer(contents, np.uint8), cv2.IMREAD_COLOR)
+    cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)  # what detection did first
+    return image
+
+
+def decode_planned(model: FaceModel, contents: bytes, profile: str):
+    image = decode_for_detection(contents, *model.decode_params(profile))
+    image.source = contents
+    return image
+
+
+def recall(reference: list, result: list) -> tuple:
+    """(legacy boxes matched by a planned box with IoU >= 0.5, legacy boxes)."""
+    boxes = [(loc["left"], loc["top"], loc["right"] - loc["left"], loc["bottom"] - loc["top"]) for loc in result]
+    matched = 0
+    for ref in reference:
+        ref_box = (ref["left"], ref["top"], ref["right"] - ref["left"], ref["bottom"] - ref["top"])
+        matched += any(iou(ref_box, box) >= 0.5 for box in boxes)
+    return matched, len(reference)
+
+
+def check_sample_files(model: FaceModel, sample_dir: Path, profile: str) -> bool:
+    """Legacy vs planned boxes on the sample photos as uploaded (any format); True if recall is 100%."""
+    ok = True
+    for path in sorted(sample_dir.glob("*")):
+        if path.suffix.lower() not in IMAGE_SUFFIXES:
+            continue
+        contents = path.read_bytes()
+        reference = model.detect_and_crop_faces(decode_legacy(contents), profile)["locations"]
+        result = model.detect_and_crop_faces(decode_planned(model, contents, profile), profile)["locations"]
+        matched, total = recall(reference, result)
+        ok &= matched == total
+        print(f"  {path.name:<20} legacy {total} / planned {len(result)} faces, recall {matched}/{total}")
+    return ok
+
+
+def measure(fn, repeats: int):
+    """(result, median ms, peak traced MB) of fn()."""
+    result, timings = None, []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, float(np.median(timings)) * 1000.0, peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples-dir", type=Path, default=DEFAULT_SAMPLE_DIR)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1280, 1920, 3024, 4032])
+    parser.add_argument("--images", type=int, default=4)
+    parser.add_argument("--profile", default=None)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--check", action="store_true", help="exit 1 if the planned path loses a legacy box")
+    args = parser.parse_args()
+
+    model = FaceModel()
+    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+    images = load_images(args.samples_dir, args.images, cascade)
+    if not images:
+        raise SystemExit(f"No images with faces under {args.samples_dir}")
+
+    def pipeline(decode):
+        return lambda: model.detect_and_crop_faces(decode(), args.profile)
+
+    print(f"sample files as uploaded, detector {model.detector.name}:")
+    ok = check_sample_files(model, args.samples_dir, args.profile)
+
+    print(f"\n{len(images)} images, detector {model.detector.name}, profile {args.profile or 'default'}, ms = median")
+    print(
+        f"{'':>8} {'---------- legacy ----------':>28} {'---------- planned ---------':>28}\n"
+        f"{'max side':>8} {'decode':>7} {'total':>7} {'peak MB':>8} {'decode':>7} {'total':>7} {'peak MB':>8} "
+        f"{'+ colour':>9} {'faces':>7} {'matched':>8} {'max |dp|':>9}"
+    )
+    for size in args.sizes:
+        rows, faces, matched, max_diff = [], [0, 0], 0, 0.0
+        for image in images:
+            contents = encode_at(image, size)
+            _, legacy_decode_ms, _ = measure(lambda: decode_legacy(contents), args.repeats)
+            reference, legacy_ms, legacy_mb = measure(pipeline(lambda: decode_legacy(contents)), args.repeats)
+            decoded, planned_decode_ms, _ = measure(lambda: decode_planned(model, contents, args.profile), args.repeats)
+            result, planned_ms, planned_mb = measure(pipeline(lambda: decode_planned(model, contents, args.profile)), args.repeats)
+            _, color_ms, _ = measure(lambda: decode_planned(model, contents, args.profile).full_color(), args.repeats)
+            rows.append((legacy_decode_ms, legacy_ms, legacy_mb, planned_decode_ms, planned_ms, planned_mb,
+                         color_ms - planned_decode_ms))
+
+            faces[0] += len(reference["locations"])
+            faces[1] += len(result["locations"])
+            matched += recall(reference["locations"], result["locations"])[0]
+            for ref, crop in zip(reference["locations"], reference["crops"]):
+                full, reduced = model.predict_emotion_batch([crop, decoded.crop_gray(ref, FACE_SIZE)])
+                max_diff = max(max_diff, max(abs(full["all_emotions"][e] - reduced["all_emotions"][e])
+                                             for e in model.emotions))
+        means = np.mean(rows, axis=0)
+        print(
+            f"{size:>8} {means[0]:>7.1f} {means[1]:>7.1f} {means[2]:>8.1f} {means[3]:>7.1f} {means[4]:>7.1f} "
+            f"{means[5]:>8.1f} {means[6]:>9.1f} {faces[0]:>3d}/{faces[1]:<3d} {matched:>8d} "
+            f"{max_diff:>9.4f}"
+        )
+        ok &= matched == faces[0]
+    if args.check and not ok:
+        print("FAILED: the planned decode lost boxes the legacy decode found")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
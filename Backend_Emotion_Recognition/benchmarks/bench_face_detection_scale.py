@@ -0,0 +1,119 @@
+"""Face detection time vs image size, full-resolution cascade vs downscaled profiles.
+
+Usage (from Backend_Emotion_Recognition/):
+    python -m benchmarks.bench_face_detection_scale [--sizes 640 1280 1920 2560 4032] [--images 4]
+
+Test images are frames with faces from the local webcam recordings (and any
+sample photos), resized so their longest side matches each size. The
+reference is the previous behaviour: detectMultiScale(1.1, 5, minSize=30) on
+the full-resolution grayscale image. Each detection profile runs through
+FaceModel.detect_boxes (downscaled to its max side, boxes mapped back).
+Recall is the share of reference boxes matched by a profile box with IoU >= 0.5.
+"""
+import argparse
+import os
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+os.environ.setdefault("INFERENCE_WARMUP", "false")
+
+from app.core.config import settings  # noqa: E402
+from app.models.calibration import IMAGE_SUFFIXES, VIDEO_SUFFIXES, DEFAULT_SAMPLE_DIR  # noqa: E402
+from app.models.face_model import FaceModel  # noqa: E402
+from app.models.face_tracker import iou  # noqa: E402
+
+
+def load_images(sample_dir: Path, limit: int, cascade) -> list:
+    """Grayscale images (photos, then video frames) in which the cascade finds a face."""
+    images = []
+    for path in sorted(sample_dir.glob("*")):
+        suffix = path.suffix.lower()
+        if suffix in IMAGE_SUFFIXES:
+            candidates = [cv2.imread(str(path), cv2.IMREAD_GRAYSCALE)]
+        elif suffix in VIDEO_SUFFIXES:
+            candidates, capture, idx = [], cv2.VideoCapture(str(path)), 0
+            while True:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                if idx % 25 == 0:
+                    candidates.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+                idx += 1
+            capture.release()
+        else:
+            continue
+        for gray in candidates:
+            if gray is not None and len(cascade.detectMultiScale(gray, 1.1, 5, minSize=(30, 30))):
+                images.append(gray)
+            if len(images) >= limit:
+                return images
+    return images
+
+
+def resize_to(gray: np.ndarray, max_side: int) -> np.ndarray:
+    scale = max_side / max(gray.shape[:2])
+    size = (round(gray.shape[1] * scale), round(gray.shape[0] * scale))
+    return cv2.resize(gray, size, interpolation=cv2.INTER_CUBIC if scale > 1 else cv2.INTER_AREA)
+
+
+def recall(reference, boxes) -> float:
+    if len(reference) == 0:
+        return 1.0
+    hits = sum(1 for ref in reference if any(iou(tuple(ref), tuple(box)) >= 0.5 for box in boxes))
+    return hits / len(reference)
+
+
+def timed(fn, repeats: int):
+    result, timings = None, []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return result, float(np.median(timings)) * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples-dir", type=Path, default=DEFAULT_SAMPLE_DIR)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[640, 1280, 1920, 2560, 4032])
+    parser.add_argument("--images", type=int, default=4)
+    parser.add_argument("--repeats", type=int, default=1)
+    args = parser.parse_args()
+
+    model = FaceModel()
+    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+    images = load_images(args.samples_dir, args.images, cascade)
+    if not images:
+        raise SystemExit(f"No images with faces under {args.samples_dir}")
+    profiles = sorted(settings.FACE_DETECTION_PROFILES)
+
+    header = f"{'max side':>8} {'full-res ms':>11}"
+    for name in profiles:
+        header += f" {name + ' ms':>13} {'recall':>7}"
+    print(f"{len(images)} images, recall vs full-resolution detection (IoU >= 0.5)")
+    print(header)
+    for size in args.sizes:
+        reference_ms, profile_ms = [], {name: [] for name in profiles}
+        profile_recall = {name: [] for name in profiles}
+        for image in images:
+            gray = resize_to(image, size)
+            reference, ms = timed(
+                lambda: cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30)),
+                args.repeats,
+            )
+            reference_ms.append(ms)
+            for name in profiles:
+                boxes, ms = timed(lambda: model.detect_boxes(gray, name), args.repeats)
+                profile_ms[name].append(ms)
+                profile_recall[name].append(recall(reference, boxes))
+        row = f"{size:>8} {np.mean(reference_ms):>11.1f}"
+        for name in profiles:
+            row += f" {np.mean(profile_ms[name]):>13.1f} {np.mean(profile_recall[name]):>7.0%}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
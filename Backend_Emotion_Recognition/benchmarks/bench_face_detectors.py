@@ -0,0 +1,118 @@
+"""Compare face detector backends: faces/sec (single and batched) and recall.
+
+Usage (from Backend_Emotion_Recognition/):
+    python -m benchmarks.bench_face_detectors [--backend haar yunet ssd] [--labels boxes.json]
+
+Images are the sample photos and every 10th frame of the webcam recordings
+under export_video_audio/ (or --samples-dir). Backends whose model files are
+missing are skipped (see FACE_YUNET_MODEL_PATH / FACE_SSD_*_PATH).
+
+Recall is measured against --labels, a JSON object mapping "<file>" or
+"<file>#<frame index>" to lists of [x, y, w, h] boxes. Without labels the
+reference is the Haar cascade with the "accurate" profile at full resolution,
+which only tells how close a backend is to the cascade, not true recall.
+"""
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+os.environ.setdefault("INFERENCE_WARMUP", "false")
+
+from app.core.config import settings  # noqa: E402
+from app.models.calibration import DEFAULT_SAMPLE_DIR, IMAGE_SUFFIXES, VIDEO_SUFFIXES  # noqa: E402
+from app.models.face_detector import FACE_DETECTOR_BACKENDS, HaarCascadeDetector, create_detector  # noqa: E402
+from app.models.face_model import FaceModel  # noqa: E402
+from app.models.face_tracker import iou  # noqa: E402
+
+
+def load_images(sample_dir: Path, every: int, limit: int):
+    """(key, BGR image) pairs from photos and video frames."""
+    images = []
+    for path in sorted(sample_dir.glob("*")):
+        suffix = path.suffix.lower()
+        if suffix in IMAGE_SUFFIXES:
+            image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+            if image is not None:
+                images.append((path.name, image))
+        elif suffix in VIDEO_SUFFIXES:
+            capture, idx = cv2.VideoCapture(str(path)), 0
+            while True:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                if idx % every == 0:
+                    images.append((f"{path.name}#{idx}", frame))
+                idx += 1
+            capture.release()
+    return images[:limit]
+
+
+def recall(reference, boxes) -> float:
+    if len(reference) == 0:
+        return float("nan")
+    hits = sum(1 for ref in reference if any(iou(tuple(ref), tuple(box)) >= 0.5 for box in boxes))
+    return hits / len(reference)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", nargs="+", choices=FACE_DETECTOR_BACKENDS, default=list(FACE_DETECTOR_BACKENDS))
+    parser.add_argument("--samples-dir", type=Path, default=DEFAULT_SAMPLE_DIR)
+    parser.add_argument("--labels", type=Path, default=None)
+    parser.add_argument("--profile", default=settings.FACE_DETECTION_PROFILE)
+    parser.add_argument("--every", type=int, default=10, help="Use every Nth video frame")
+    parser.add_argument("--limit", type=int, default=60)
+    parser.add_argument("--batch-size", type=int, default=8)
+    args = parser.parse_args()
+
+    images = load_images(args.samples_dir, args.every, args.limit)
+    if not images:
+        raise SystemExit(f"No images under {args.samples_dir}")
+    params = FaceModel.detection_profile(args.profile)
+
+    if args.labels:
+        labels = json.loads(args.labels.read_text())
+        references = [labels.get(key, []) for key, _ in images]
+        reference_name = str(args.labels)
+    else:
+        haar = HaarCascadeDetector()
+        accurate = dict(FaceModel.detection_profile("accurate"), max_side=0)
+        references = [haar.detect(image, accurate) for _, image in images]
+        reference_name = "haar/accurate at full resolution"
+
+    print(f"{len(images)} images, profile '{args.profile}', recall reference: {reference_name}")
+    print(f"{'backend':<8} {'faces':>6} {'img/s':>8} {'faces/s':>8} {'batched img/s':>14} {'recall':>7}")
+    for kind in args.backend:
+        try:
+            detector = create_detector(kind)
+        except FileNotFoundError as e:
+            print(f"{kind:<8} skipped: {e}")
+            continue
+
+        prepared = [image if detector.needs_color else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) for _, image in images]
+        detector.detect(prepared[0], params)  # warm-up
+        started = time.perf_counter()
+        results = [detector.detect(image, params) for image in prepared]
+        single_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for start in range(0, len(prepared), args.batch_size):
+            detector.detect_batch(prepared[start:start + args.batch_size], params)
+        batch_time = time.perf_counter() - started
+
+        faces = sum(len(boxes) for boxes in results)
+        recalls = [recall(ref, boxes) for ref, boxes in zip(references, results)]
+        mean_recall = np.nanmean(recalls) if not all(np.isnan(recalls)) else float("nan")
+        print(
+            f"{kind:<8} {faces:>6} {len(prepared) / single_time:>8.1f} {faces / single_time:>8.1f} "
+            f"{len(prepared) / batch_time:>14.1f} {mean_recall:>7.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Face batch pre/post-processing cost per face: per-face loop vs pooled buffers.
+
+Usage (from Backend_Emotion_Recognition/):
+    python -m benchmarks.bench_face_preprocess [--repeats 200]
+
+Only preprocessing (gray crop -> model input batch) and postprocessing
+(softmax matrix -> result dicts) are measured; the forward pass is replaced by
+a fixed softmax matrix so the numbers isolate the Python/NumPy overhead.
+"Peak KB/face" is the transient memory traced by tracemalloc per call.
+"""
+import argparse
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from app.models.face_preprocess import FaceBatchPreprocessor, postprocess_predictions
+
+EMOTIONS = ['angry', 'disgust', 'fear', 'happy', 'neutral', 'sad', 'surprise']
+BATCH_SIZES = [1, 2, 4, 8, 16, 32, 64]
+
+
+def legacy_pipeline(faces, predictions):
+    """Previous FaceModel.predict_emotion_batch, minus the forward pass."""
+    processed_faces = []
+    for face in faces:
+        gray_face = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY) if face.ndim == 3 else face
+        processed_face = cv2.resize(gray_face, (48, 48)).reshape(1, 48, 48, 1)
+        processed_faces.append(processed_face[0])
+    batch_array = np.stack(processed_faces, axis=0).astype(np.float32)
+    results = []
+    for pred in predictions[:len(batch_array)]:
+        emotion_probs = {emotion: float(prob) for emotion, prob in zip(EMOTIONS, pred)}
+        emotion_index = int(np.argmax(pred))
+        results.append({
+            "emotion": EMOTIONS[emotion_index],
+            "confidence": float(pred[emotion_index]),
+            "all_emotions": emotion_probs,
+        })
+    return results
+
+
+def make_pooled_pipeline(preprocessor):
+    def pooled_pipeline(faces, predictions):
+        with preprocessor.batch(faces):
+            outputs = predictions[:len(faces)]  # stands in for backend.predict(batch)
+        return postprocess_predictions(outputs, EMOTIONS)
+    return pooled_pipeline
+
+
+def measure(pipeline, faces, predictions, repeats):
+    pipeline(faces, predictions)  # warm the buffer pool
+    started = time.perf_counter()
+    for _ in range(repeats):
+        pipeline(faces, predictions)
+    per_face_us = (time.perf_counter() - started) / repeats / len(faces) * 1e6
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    pipeline(faces, predictions)
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    return per_face_us, peak / 1024 / len(faces)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    faces = [
+        rng.integers(0, 256, size=(int(s), int(s)), dtype=np.uint8)
+        for s in rng.integers(60, 220, size=max(BATCH_SIZES))
+    ]
+    logits = rng.standard_normal((max(BATCH_SIZES), len(EMOTIONS))).astype(np.float32)
+    predictions = np.exp(logits) / np.exp(logits).sum(axis=1, keepdims=True)
+
+    pooled = make_pooled_pipeline(FaceBatchPreprocessor([1, 8, 32, 64]))
+    print(f"{'batch':>5} {'legacy us/face':>15} {'pooled us/face':>15} {'legacy KB/face':>15} {'pooled KB/face':>15}")
+    for n in BATCH_SIZES:
+        legacy_us, legacy_kb = measure(legacy_pipeline, faces[:n], predictions, args.repeats)
+        pooled_us, pooled_kb = measure(pooled, faces[:n], predictions, args.repeats)
+        print(f"{n:>5} {legacy_us:>15.1f} {pooled_us:>15.1f} {legacy_kb:>15.2f} {pooled_kb:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
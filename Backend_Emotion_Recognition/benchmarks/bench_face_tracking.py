@@ -0,0 +1,107 @@
+"""Per-frame latency and detector calls with the stream face tracker on vs off.
+
+Usage (from Backend_Emotion_Recognition/):
+    python -m benchmarks.bench_face_tracking [--video PATH ...] [--height 720] [--detect-every 10]
+
+Frames are read from local webcam recordings, resized to --height (the
+recordings are 480p; 720p mirrors a typical webcam stream) and fed through
+the same code paths /face/stream uses: detect + crop + batched predict per
+frame (tracking off) or FaceTracker + crop + predict + smoothing (tracking on).
+"""
+import argparse
+import os
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+os.environ.setdefault("INFERENCE_WARMUP", "false")
+
+from app.models.face_model import FaceModel  # noqa: E402
+from app.models.face_tracker import FaceTracker  # noqa: E402
+
+SAMPLE_DIR = Path(__file__).resolve().parents[2] / "export_video_audio"
+
+
+def read_frames(paths, height: int):
+    frames = []
+    for path in paths:
+        capture = cv2.VideoCapture(str(path))
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            if height and frame.shape[0] != height:
+                width = int(round(frame.shape[1] * height / frame.shape[0]))
+                frame = cv2.resize(frame, (width, height))
+            frames.append(frame)
+        capture.release()
+    return frames
+
+
+def run(model, frames, tracker=None):
+    timings, faces, track_ids = [], 0, set()
+    detect_calls = 0
+    for frame in frames:
+        started = time.perf_counter()
+        if tracker is None:
+            detected = model.detect_and_crop_faces(frame)
+            detect_calls += 1
+        else:
+            detected = model.track_and_crop_faces(frame, tracker)
+        results = model.predict_emotion_batch(detected["crops"]) if detected["crops"] else []
+        if tracker is not None:
+            for track, result in zip(detected["tracks"], results):
+                tracker.smooth(track, result, model.emotions)
+                track_ids.add(track.track_id)
+        timings.append(time.perf_counter() - started)
+        faces += len(detected["crops"])
+
+    total = sum(timings)
+    timings = np.asarray(timings) * 1000.0
+    full_calls = detect_calls if tracker is None else tracker.full_detections
+    roi_calls = 0 if tracker is None else tracker.roi_detections
+    return {
+        "p50": float(np.median(timings)),
+        "p95": float(np.percentile(timings, 95)),
+        "fps": len(frames) / total,
+        "full_per_s": full_calls / total,
+        "roi_per_s": roi_calls / total,
+        "faces_per_frame": faces / len(frames),
+        "ids": len(track_ids) if tracker is not None else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--video", nargs="+", type=Path, default=sorted(SAMPLE_DIR.glob("video_cam_*.webm")))
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--detect-every", type=int, default=10)
+    args = parser.parse_args()
+
+    frames = read_frames(args.video, args.height)
+    if not frames:
+        raise SystemExit("No frames could be read from the sample videos")
+    model = FaceModel()
+    model.predict_emotion_batch([frames[0][:48, :48]])  # build the inference graph once
+
+    print(f"{len(frames)} frames at {frames[0].shape[1]}x{frames[0].shape[0]}")
+    print(
+        f"{'mode':<14} {'p50 ms':>8} {'p95 ms':>8} {'fps':>7} {'full det/s':>10} "
+        f"{'roi det/s':>10} {'faces/frame':>11} {'track ids':>9}"
+    )
+    for label, tracker in (
+        ("tracking off", None),
+        ("tracking on", FaceTracker(model.detect_boxes, detect_every=args.detect_every)),
+    ):
+        r = run(model, frames, tracker)
+        ids = "-" if r["ids"] is None else r["ids"]
+        print(
+            f"{label:<14} {r['p50']:>8.2f} {r['p95']:>8.2f} {r['fps']:>7.1f} {r['full_per_s']:>10.1f} "
+            f"{r['roi_per_s']:>10.1f} {r['faces_per_frame']:>11.2f} {ids:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Cold-start import profile of the API process, per service role.
+
+Usage (from Backend_Emotion_Recognition/):
+    python -m benchmarks.bench_import_time [--roles face,audio face audio] [--top 15] [--check]
+
+Each role set imports ``app.main`` in a fresh interpreter under
+``python -X importtime`` (SERVICE_ROLES set in its environment) and reports
+wall time, the cumulative import time of ``app.main`` and the slowest
+top-level packages. Heavy frameworks must not load at import time:
+``--check`` exits non-zero if any of FORBIDDEN shows up, or if a face-only /
+audio-only process imports the other role's stack (ROLE_MODULES).
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Must only be imported when a model is actually loaded / used
+FORBIDDEN = ("tensorflow", "keras", "librosa", "onnxruntime", "sklearn", "numba")
+# Each role's stack, which a process not serving that role must not import
+ROLE_MODULES = {
+    "face": ("app.models.face_model", "app.services.face_service"),
+    "audio": ("app.services.audio_service",),
+}
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def profile(roles):
+    env = dict(os.environ, SERVICE_ROLES=json.dumps(roles), PYTHONPATH=str(ROOT))
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise RuntimeError(f"import app.main failed for roles {roles}:\n{proc.stderr[-2000:]}")
+
+    modules = {}
+    for match in LINE.finditer(proc.stderr):
+        _, cumulative, indent, name = match.groups()
+        modules[name] = (int(cumulative), len(indent))
+    return wall, modules
+
+
+def report(roles, wall, modules, top):
+    total = modules.get("app.main", (0, 0))[0] / 1e6
+    print(f"\nroles={','.join(roles)}  wall {wall:.2f}s  import app.main {total:.2f}s  modules {len(modules)}")
+    # Packages imported at the top level of some import chain (cumulative time)
+    roots = {}
+    for name, (cumulative, _) in modules.items():
+        root = name.split(".")[0]
+        roots[root] = max(roots.get(root, 0), cumulative)
+    for root, cumulative in sorted(roots.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {cumulative / 1000:9.1f} ms  {root}")
+
+
+def violations(roles, modules):
+    forbidden = list(FORBIDDEN)
+    for role, role_modules in ROLE_MODULES.items():
+        if role not in roles:
+            forbidden.extend(role_modules)
+    return sorted(name for name in forbidden if name in modules)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--roles", nargs="+", default=["face,audio", "face", "audio"],
+                        help="comma-separated role sets to profile")
+    parser.add_argument("--top", type=int, default=12)
+    parser.add_argument("--check", action="store_true", help="fail if a heavy module is imported")
+    args = parser.parse_args()
+
+    failed = False
+    for spec in args.roles:
+        roles = [role for role in spec.split(",") if role]
+        wall, modules = profile(roles)
+        report(roles, wall, modules, args.top)
+        bad = violations(roles, modules)
+        if bad:
+            failed = True
+            print(f"  !! imported at startup: {', '.join(bad)}")
+    if args.check and failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Per-call inference latency: eager ``model.predict()`` vs the traced graph backend.
+
+Usage (from Backend_Emotion_Recognition/):
+    python -m benchmarks.bench_inference_backend [--repeats 50] [--batch-sizes 1 8 32]
+
+The audio model is built from CNN_model.json; its trained weights are loaded
+when present (random weights are fine for latency). Exported ONNX / TFLite
+models (python -m app.models.export) are included when present.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+os.environ.setdefault("INFERENCE_WARMUP", "false")
+# FaceModel must hold the Keras model; every backend is built explicitly below
+os.environ["INFERENCE_BACKEND"] = "keras"
+
+from app.core.config import settings  # noqa: E402
+from app.models.inference_backend import OnnxBackend, TFLiteBackend, create_backend  # noqa: E402
+
+EXPORTED = {
+    "face": {"onnx": settings.FACE_ONNX_PATH, "tflite": settings.FACE_TFLITE_PATH},
+    "audio": {"onnx": settings.AUDIO_ONNX_PATH, "tflite": settings.AUDIO_TFLITE_PATH},
+}
+EXPORTED_BACKENDS = {"onnx": OnnxBackend, "tflite": TFLiteBackend}
+
+
+def load_models():
+    from app.models.face_model import FaceModel
+    from tensorflow.keras.models import model_from_json
+
+    face = FaceModel().model
+
+    audio_dir = settings.MODEL_DIR / "audio"
+    with open(audio_dir / "CNN_model.json", "r") as f:
+        audio = model_from_json(f.read())
+    weights = audio_dir / "best_model1_weights.h5"
+    if weights.exists():
+        audio.load_weights(str(weights))
+    return {"face": (face, (48, 48, 1)), "audio": (audio, (2376, 1))}
+
+
+def time_backend(backend, input_shape, batch_size, repeats):
+    batch = np.random.rand(batch_size, *input_shape).astype(np.float32)
+    for _ in range(3):
+        backend.predict(batch)
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        backend.predict(batch)
+        samples.append(time.perf_counter() - started)
+    samples = np.array(samples) * 1000.0
+    return float(np.median(samples)), float(np.percentile(samples, 95))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+
+    print(f"{'model':<6} {'backend':<7} {'batch':>5} {'p50 ms':>9} {'p95 ms':>9} {'ms/item':>8}")
+    for name, (model, input_shape) in load_models().items():
+        backends = [
+            create_backend(model, input_shape, kind=kind, batch_buckets=args.batch_sizes)
+            for kind in ("keras", "graph")
+        ]
+        for kind, path in EXPORTED[name].items():
+            if path.exists():
+                backends.append(EXPORTED_BACKENDS[kind](path, input_shape, batch_buckets=args.batch_sizes))
+        for backend in backends:
+            kind = backend.name
+            for batch_size in args.batch_sizes:
+                p50, p95 = time_backend(backend, input_shape, batch_size, args.repeats)
+                print(f"{name:<6} {kind:<7} {batch_size:>5} {p50:>9.2f} {p95:>9.2f} {p50 / batch_size:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
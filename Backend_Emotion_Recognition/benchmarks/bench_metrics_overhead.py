@@ -0,0 +1,124 @@
+"""Cost of the request metrics (stage timers, histograms, middleware, Server-Timing), on vs off.
+
+Usage (from Backend_Emotion_Recognition/):
+    python -m benchmarks.bench_metrics_overhead [--calls 200000] [--requests 200]
+
+- "stage": one ``with stage(...)`` block around nothing (gauge up/down,
+  histogram observe, request list append), from 1 and from 4 threads at
+  once (the registry lock is shared);
+- "middleware": MetricsMiddleware around a bare ASGI app that answers
+  at once, called directly (no HTTP client noise), i.e. its fixed cost;
+- "GET /health": an almost empty request through the TestClient;
+- "POST /face/predict": a 1280 px upload (skip_save, cache off), about ten
+  stages per request.
+"Off" is METRICS_ENABLED=false (toggled at runtime; both read it per call).
+"""
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+os.environ.setdefault("SERVICE_ROLES", '["face"]')
+os.environ.setdefault("MODEL_LOADING", "lazy")
+os.environ.setdefault("INFERENCE_WARMUP", "false")
+os.environ["PREDICTION_CACHE_ENABLED"] = "false"
+
+from app.core.config import settings  # noqa: E402
+from app.core.metrics import MetricsMiddleware, stage  # noqa: E402
+
+
+def stage_cost_ns(calls: int, threads: int) -> float:
+    def run(n):
+        for _ in range(n):
+            with stage("bench"):
+                pass
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(run, [calls // threads] * threads))
+    return (time.perf_counter() - started) / calls * 1e9
+
+
+def middleware_cost_us(calls: int) -> float:
+    async def bare(scope, receive, send):
+        await receive()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    async def run():
+        app = MetricsMiddleware(bare)
+        started = time.perf_counter()
+        for _ in range(calls):
+            await app({"type": "http", "path": "/health", "method": "GET", "headers": []}, receive, send)
+        return (time.perf_counter() - started) / calls * 1e6
+
+    return asyncio.run(run())
+
+
+def median_ms(fn, requests: int) -> float:
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings)) * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--predict-requests", type=int, default=20)
+    args = parser.parse_args()
+
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from app.models.calibration import DEFAULT_SAMPLE_DIR
+    from benchmarks.bench_face_decode import encode_at, load_images
+
+    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+    upload = encode_at(load_images(DEFAULT_SAMPLE_DIR, 1, cascade)[0], 1280)
+
+    with TestClient(app) as client:
+        def predict():
+            response = client.post("/face/predict?skip_save=true", files={"file": ("b.jpg", upload, "image/jpeg")})
+            assert response.status_code == 200, response.text
+
+        predict()  # load the model
+        rows = {}
+        for enabled in (False, True, False, True):  # twice each, interleaved; the second run is kept
+            settings.METRICS_ENABLED = enabled
+            rows[enabled] = (
+                stage_cost_ns(args.calls, 1),
+                stage_cost_ns(args.calls, 4),
+                middleware_cost_us(args.calls // 4),
+                median_ms(lambda: client.get("/health"), args.requests),
+                median_ms(predict, args.predict_requests),
+            )
+        settings.METRICS_ENABLED = True
+        timing = client.post("/face/predict?skip_save=true",
+                             files={"file": ("b.jpg", upload, "image/jpeg")}).headers.get("server-timing")
+
+    print(f"{'':>8} {'stage ns':>9} {'4 threads':>10} {'middleware us':>14} {'GET /health ms':>15} "
+          f"{'POST /face/predict ms':>22}")
+    for enabled in (False, True):
+        label = "on" if enabled else "off"
+        stage_ns, threaded_ns, middleware_us, health, predict_ms = rows[enabled]
+        print(f"{label:>8} {stage_ns:>9.0f} {threaded_ns:>10.0f} {middleware_us:>14.1f} {health:>15.3f} "
+              f"{predict_ms:>22.1f}")
+    print(f"\nServer-Timing: {timing}")
+
+
+if __name__ == "__main__":
+    main()
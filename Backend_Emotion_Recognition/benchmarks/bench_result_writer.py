@@ -0,0 +1,161 @@
+"""/face/predict response time: result image written in the request vs by the background writer.
+
+Usage (from Backend_Emotion_Recognition/):
+    python -m benchmarks.bench_result_writer [--sizes 1280 4032] [--requests 8] [--burst 32]
+
+Frames with faces from the local recordings are upscaled to each size and
+JPEG-encoded. Per size, the median response time of:
+- "no image": ``skip_save=true``, the floor;
+- "sync write": a route mounted by this script that reproduces the previous
+  handler (full colour decode, copy, draw and ``cv2.imwrite`` before the
+  response);
+- "background jpeg" / "background webp": the app's route, the writer renders
+  after the response; "ready" is response -> result file on disk and "KB"
+  the result file size.
+Then a burst of --burst concurrent distinct uploads (WebP, the slower
+encoder, by default) against a writer queue bounded to --burst-max-pending
+shows dropping (dropped responses carry no result_url), and repeating them
+shows coalescing.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+os.environ.setdefault("SERVICE_ROLES", '["face"]')
+os.environ.setdefault("MODEL_LOADING", "lazy")
+os.environ.setdefault("INFERENCE_WARMUP", "false")
+os.environ["PREDICTION_CACHE_ENABLED"] = "false"
+
+from benchmarks.bench_face_decode import encode_at, load_images  # noqa: E402
+from app.models.calibration import DEFAULT_SAMPLE_DIR  # noqa: E402
+
+
+def add_legacy_route(app):
+    """The previous /face/predict: result image drawn and written before responding."""
+    from fastapi import File, UploadFile
+
+    from app.api.face_routes import get_face_service
+    from app.utils.image_utils import decode_image, save_result_image
+
+    @app.post("/legacy/face/predict")
+    async def legacy_predict(file: UploadFile = File(...)):
+        svc = await get_face_service()
+        result = await svc.predict_emotion(file, skip_save=True)
+        await file.seek(0)
+        original = await svc.executor.run(decode_image, await file.read())
+        path = await svc.executor.run(
+            save_result_image, original, result["face_location"], result["emotion"], result["confidence"],
+            f"result_{file.filename}",
+        )
+        os.unlink(path)
+        return result
+
+
+def median_ms(client, url: str, contents: bytes, requests: int) -> tuple:
+    timings, last = [], None
+    for idx in range(requests):
+        started = time.perf_counter()
+        last = client.post(url, files={"file": (f"bench{idx}.jpg", contents, "image/jpeg")})
+        timings.append(time.perf_counter() - started)
+        assert last.status_code == 200, last.text
+    return float(np.median(timings)) * 1000.0, last.json()
+
+
+def distinct_uploads(image: np.ndarray, size: int, count: int) -> list:
+    uploads = []
+    for idx in range(count):
+        variant = image.copy()
+        variant[:16, :16] = (idx * 4 % 256, idx * 4 // 256 * 32, 0)  # different bytes, same face
+        uploads.append(encode_at(variant, size))
+    return uploads
+
+
+def burst(client, uploads: list, fmt: str) -> list:
+    def post(contents):
+        response = client.post(f"/face/predict?result_format={fmt}",
+                               files={"file": ("burst.jpg", contents, "image/jpeg")})
+        return {"status": response.status_code, **response.json()}
+
+    with ThreadPoolExecutor(max_workers=len(uploads)) as pool:
+        return list(pool.map(post, uploads))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1280, 4032])
+    parser.add_argument("--requests", type=int, default=8)
+    parser.add_argument("--burst", type=int, default=32)
+    parser.add_argument("--burst-format", default="webp", choices=["jpeg", "webp"])
+    parser.add_argument("--burst-max-pending", type=int, default=4, help="writer queue bound during the burst")
+    args = parser.parse_args()
+
+    from fastapi.testclient import TestClient
+
+    from app.core.result_writer import get_result_writer
+    from app.main import app
+
+    add_legacy_route(app)
+    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+    image = load_images(DEFAULT_SAMPLE_DIR, 1, cascade)[0]
+    writer = get_result_writer()
+    written = []
+
+    with TestClient(app) as client:
+        client.post("/face/predict?skip_save=true", files={"file": ("w.jpg", encode_at(image, 640), "image/jpeg")})
+        print(f"{'max side':>8} {'no image ms':>12} {'sync write ms':>14} {'background jpeg ms':>19} "
+              f"{'ready ms':>9} {'KB':>6} {'background webp ms':>19} {'ready ms':>9} {'KB':>6}")
+        for size in args.sizes:
+            contents = encode_at(image, size)
+            floor, _ = median_ms(client, "/face/predict?skip_save=true", contents, args.requests)
+            sync, _ = median_ms(client, "/legacy/face/predict", contents, args.requests)
+            row = f"{size:>8} {floor:>12.1f} {sync:>14.1f}"
+            for fmt in ("jpeg", "webp"):
+                # Distinct uploads per request, otherwise later requests coalesce onto the first file
+                uploads = distinct_uploads(image, size, args.requests)
+                timings, ready = [], []
+                for upload in uploads:
+                    started = time.perf_counter()
+                    response = client.post(f"/face/predict?result_format={fmt}",
+                                           files={"file": ("bench.jpg", upload, "image/jpeg")}).json()
+                    responded = time.perf_counter()
+                    while not os.path.exists(response["result_image"]):
+                        time.sleep(0.001)
+                    timings.append(responded - started)
+                    ready.append((time.perf_counter() - responded) * 1000.0)
+                    written.append(response["result_image"])
+                kb = os.path.getsize(written[-1]) / 1024
+                row += f" {np.median(timings) * 1000:>19.1f} {np.median(ready):>9.1f} {kb:>6.0f}"
+            print(row)
+
+        writer.max_pending = args.burst_max_pending
+        print(f"\nburst: {args.burst} concurrent distinct {args.sizes[-1]}px uploads, {args.burst_format}, "
+              f"max pending {writer.max_pending} / {writer.max_pending_bytes / 1e6:.0f} MB")
+        uploads = distinct_uploads(image, args.sizes[-1], args.burst)[::-1]  # not yet written ones first
+        for label in ("first", "repeat"):
+            before = writer.stats()
+            started = time.perf_counter()
+            results = burst(client, uploads, args.burst_format)
+            elapsed = time.perf_counter() - started
+            writer.drain()
+            after = writer.stats()
+            ok = sum(r["status"] == 200 for r in results)
+            with_url = sum("result_url" in r for r in results)
+            written.extend(r["result_image"] for r in results if "result_image" in r)
+            print(
+                f"  {label:<6}: {ok}/{len(results)} ok ({len(results) - ok} rejected 503), {with_url} with result_url, "
+                f"{elapsed:.1f} s, "
+                f"written {after['written'] - before['written']}, coalesced {after['coalesced'] - before['coalesced']}, "
+                f"dropped {after['dropped'] - before['dropped']}, errors {after['errors'] - before['errors']}"
+            )
+
+    for path in set(written):
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Storage cleanup cost on a large result directory: directory-scan pass vs the indexed janitor.
+
+Usage (from Backend_Emotion_Recognition/):
+    python -m benchmarks.bench_storage_janitor [--files 50000] [--batch 1000]
+
+A temporary directory is filled with --files small files whose times are
+spread over the last 48 h. "scan pass" is ``clean_old_files`` (glob + stat
+of every file) with nothing old enough to delete, i.e. the cost of every
+periodic pass. For the janitor: the startup index (total time and the
+longest single ``scan_step``, the worst stall between sweeps), a sweep with
+nothing to evict, and the TTL eviction of the files older than 24 h. Then
+--writes files of --write-kb are recorded one by one into a store with a
+--quota-mb quota (evicting on every write, as the janitor does when a write
+goes over quota); "peak MB" is the largest on-disk total seen.
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from app.core.storage import FileStore
+from app.utils.common import clean_old_files
+
+
+def populate(directory: Path, count: int, size: int, now: float) -> None:
+    payload = b"\0" * size
+    for idx in range(count):
+        path = directory / f"{idx:08d}.jpg"
+        path.write_bytes(payload)
+        created = now - 48 * 3600 * idx / count
+        os.utime(path, (created, created))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=50000)
+    parser.add_argument("--file-kb", type=int, default=1)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--write-kb", type=int, default=64)
+    parser.add_argument("--quota-mb", type=float, default=32)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp) / "results"
+        directory.mkdir()
+        now = time.time()
+        populate(directory, args.files, args.file_kb * 1024, now)
+
+        started = time.perf_counter()
+        clean_old_files(directory, max_age_hours=72)
+        scan_pass = time.perf_counter() - started
+        print(f"{args.files} files")
+        print(f"  scan pass (clean_old_files, nothing deleted): {scan_pass * 1000:8.1f} ms per pass")
+
+        store = FileStore("results", directory, ttl=24 * 3600, max_bytes=0)
+        store.start_scan()
+        steps, started = [], time.perf_counter()
+        while True:
+            step = time.perf_counter()
+            done = store.scan_step(args.batch)
+            steps.append(time.perf_counter() - step)
+            if done:
+                break
+        index_time = time.perf_counter() - started
+        print(f"  janitor index at startup: {index_time * 1000:8.1f} ms total in {len(steps)} steps, "
+              f"longest step {max(steps) * 1000:.1f} ms ({store.stats()['files']} files)")
+
+        store.ttl = 72 * 3600
+        started = time.perf_counter()
+        store.evict()
+        print(f"  janitor sweep, nothing to evict: {(time.perf_counter() - started) * 1e6:8.1f} us")
+        store.ttl = 24 * 3600
+        started = time.perf_counter()
+        removed = store.evict()
+        print(f"  janitor TTL eviction: {removed} files in {(time.perf_counter() - started) * 1000:.1f} ms "
+              f"({len(os.listdir(directory))} left on disk)")
+
+        store.max_bytes = int(args.quota_mb * 1e6)
+        payload = b"\0" * (args.write_kb * 1024)
+        peak, started = 0, time.perf_counter()
+        for idx in range(args.writes):
+            path = directory / f"new{idx:08d}.jpg"
+            path.write_bytes(payload)
+            store.record(path, len(payload))
+            peak = max(peak, store.total_bytes)
+            if store.over_quota:
+                store.evict()
+        elapsed = time.perf_counter() - started
+        on_disk = sum(entry.stat().st_size for entry in os.scandir(directory))
+        stats = store.stats()
+        print(f"  {args.writes} writes of {args.write_kb} KB, quota {args.quota_mb:.0f} MB: peak {peak / 1e6:.1f} MB, "
+              f"on disk {on_disk / 1e6:.1f} MB, {stats['evicted_quota']} evicted by quota, "
+              f"{elapsed / args.writes * 1e6:.0f} us per write + record")
+
+
+if __name__ == "__main__":
+    main()
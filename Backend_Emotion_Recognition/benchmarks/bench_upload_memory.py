@@ -0,0 +1,181 @@
+"""Peak RSS per request for 10 MB uploads: whole-body reads vs the streaming ingestion layer.
+
+Usage (from Backend_Emotion_Recognition/):
+    python -m benchmarks.bench_upload_memory [--mb 10] [--oversize-mb 64]
+
+Each case runs in a fresh interpreter (audio role, TestClient): the request
+body is encoded and the model warmed up with a small request first, then the
+process's peak RSS is reset (Linux ``/proc/self/clear_refs``) and its growth
+over the RSS before the measured request is reported. "legacy" routes
+mounted by this script reproduce the previous handlers (``await file.read()``, ``request.json()`` + ``split`` +
+``b64decode``, no request size limit); "streaming" is the app's own route.
+"""
+import argparse
+import base64
+import gc
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+import wave
+
+import numpy as np
+
+CASES = {
+    "predict-base64": "POST /audio/predict-base64 (JSON, base64 WAV)",
+    "upload": "POST /audio/upload (saved to disk)",
+    "predict": "POST /audio/predict (multipart WAV)",
+    "oversize": "POST /audio/predict, body over the limit",
+}
+
+
+def _status_kb(field: str) -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+
+def reset_peak_rss():
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+
+
+def make_wav(size_mb: float) -> bytes:
+    """16-bit mono 22.05 kHz WAV of about ``size_mb`` * 10^6 bytes (one second of tone, repeated)."""
+    sr = 22050
+    t = np.arange(sr) / sr
+    second = (np.sin(2 * np.pi * 180 * t) * (0.3 + 0.1 * np.sin(2 * np.pi * 2 * t)) * 32767 * 0.5).astype("<i2").tobytes()
+    frames = second * int(size_mb * 1e6 // len(second)) + second[:int(size_mb * 1e6) % len(second) // 2 * 2]
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(sr)
+        out.writeframes(frames)
+    return buffer.getvalue()
+
+
+def multipart(payload: bytes, filename: str = "bench.wav"):
+    boundary = "benchboundary7d1f"
+    body = b"".join([
+        f"--{boundary}\r\n".encode(),
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'.encode(),
+        b"Content-Type: audio/wav\r\n\r\n",
+        payload,
+        f"\r\n--{boundary}--\r\n".encode(),
+    ])
+    return body, {"content-type": f"multipart/form-data; boundary={boundary}"}
+
+
+def json_base64(payload: bytes):
+    body = b'{"audio_base64": "data:audio/wav;base64,' + base64.b64encode(payload) + b'"}'
+    return body, {"content-type": "application/json"}
+
+
+def add_legacy_routes(app):
+    """The handlers as they were before app.utils.upload."""
+    import aiofiles
+    from fastapi import File, Request, UploadFile
+
+    from app.api.audio_routes import get_audio_service
+    from app.core.config import settings
+
+    settings.REQUEST_SIZE_LIMITS["/legacy"] = 1 << 40  # no streaming limit
+
+    @app.post("/legacy/audio/predict-base64")
+    async def legacy_base64(request: Request):
+        data = await request.json()
+        audio_b64 = data.get("audio_base64", "")
+        b64_data = audio_b64.split(",", 1)[1] if "," in audio_b64 else audio_b64
+        audio_bytes = base64.b64decode(b64_data)
+        return await (await get_audio_service()).predict(audio_bytes)
+
+    @app.post("/legacy/audio/upload")
+    async def legacy_upload(file: UploadFile = File(...)):
+        path = settings.UPLOAD_DIR / "audios" / "bench-legacy.wav"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        async with aiofiles.open(path, "wb") as f:
+            content = await file.read()
+            await f.write(content)
+        path.unlink()
+        return {"file_path": str(path)}
+
+    @app.post("/legacy/audio/predict")
+    async def legacy_predict(file: UploadFile = File(...)):
+        contents = await file.read()
+        return await (await get_audio_service()).predict(contents)
+
+
+def run_case(case: str, mode: str, size_mb: float, oversize_mb: float):
+    os.environ.setdefault("SERVICE_ROLES", '["audio"]')
+    os.environ.setdefault("MODEL_LOADING", "lazy")
+    os.environ["PREDICTION_CACHE_ENABLED"] = "false"
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    add_legacy_routes(app)
+    prefix = "/legacy" if mode == "legacy" else ""
+    client = TestClient(app)
+
+    path = {"predict-base64": "/audio/predict-base64", "upload": "/audio/upload"}.get(case, "/audio/predict")
+    encode = json_base64 if case == "predict-base64" else multipart
+    wav = make_wav(oversize_mb if case == "oversize" else size_mb)
+    body, headers = encode(wav)
+    input_mb = len(wav) / 1e6
+    del wav
+
+    client.post(f"{prefix}{path}", content=encode(make_wav(0.2))[0], headers=headers)  # model load, imports
+    gc.collect()
+    before = _status_kb("VmRSS")
+    reset_peak_rss()
+    started = time.perf_counter()
+    response = client.post(f"{prefix}{path}", content=body, headers=headers)
+    wall = time.perf_counter() - started
+    peak = _status_kb("VmHWM")
+    if case == "upload" and response.status_code == 200 and mode != "legacy":
+        os.unlink(response.json()["file_path"])
+    print(json.dumps({
+        "status": response.status_code,
+        "input_mb": input_mb,
+        "peak_growth_mb": (peak - before) / 1024.0,
+        "wall_ms": wall * 1000.0,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=float, default=10.0, help="upload size in MB (10^6 bytes)")
+    parser.add_argument("--oversize-mb", type=float, default=64.0)
+    parser.add_argument("--case", choices=list(CASES), help=argparse.SUPPRESS)
+    parser.add_argument("--mode", choices=["legacy", "streaming"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        run_case(args.case, args.mode, args.mb, args.oversize_mb)
+        return
+
+    print(f"{'case':<48} {'mode':<10} {'input MB':>8} {'status':>6} {'peak RSS +MB':>12} {'wall ms':>8}")
+    for case, title in CASES.items():
+        for mode in ("legacy", "streaming"):
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_upload_memory", "--case", case, "--mode", mode,
+                 "--mb", str(args.mb), "--oversize-mb", str(args.oversize_mb)],
+                capture_output=True, text=True,
+            ).stdout.strip().splitlines()
+            result = json.loads(output[-1]) if output else None
+            if result is None:
+                print(f"{title:<48} {mode:<10} failed")
+                continue
+            print(
+                f"{title:<48} {mode:<10} {result['input_mb']:8.1f} {result['status']:6d} "
+                f"{result['peak_growth_mb']:12.1f} {result['wall_ms']:8.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
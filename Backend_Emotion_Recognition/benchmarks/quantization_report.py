@@ -0,0 +1,87 @@
+"""Accuracy / latency / size report for quantized models against float32.
+
+Usage (from Backend_Emotion_Recognition/):
+    python -m app.models.export --format tflite --quantize dynamic float16 int8
+    python -m benchmarks.quantization_report [--model face audio] [--samples-dir DIR ...]
+
+The reference is the float32 Keras model served through the graph backend.
+Every TFLite variant that has been exported is evaluated on the same fixed
+evaluation set (app.models.calibration) and reported with top-1 agreement,
+max / mean probability delta, latency at batch 1 and 8, and file size.
+"""
+import argparse
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+os.environ.setdefault("INFERENCE_WARMUP", "false")
+
+from app.models.calibration import model_samples  # noqa: E402
+from app.models.export import MODELS, load_keras_model  # noqa: E402
+from app.models.inference_backend import (  # noqa: E402
+    QUANTIZED_PRECISIONS,
+    GraphBackend,
+    TFLiteBackend,
+    quantized_path,
+)
+
+
+def latency_ms(backend, samples: np.ndarray, batch_size: int, repeats: int) -> float:
+    batch = samples[:batch_size]
+    if len(batch) < batch_size:
+        batch = np.resize(samples, (batch_size,) + samples.shape[1:])
+    backend.predict(batch)
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        backend.predict(batch)
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings) * 1000.0)
+
+
+def report(name: str, samples: np.ndarray, repeats: int):
+    spec = MODELS[name]
+    model = load_keras_model(name)
+    reference = GraphBackend(model, spec["input_shape"], batch_buckets=[1, 8])
+    expected = reference.predict(samples)
+
+    variants = [("float32 (keras graph)", reference, spec["keras"])]
+    tflite_path = Path(spec["tflite"])
+    if tflite_path.exists():
+        variants.append(("float32 tflite", TFLiteBackend(tflite_path, spec["input_shape"], [1, 8]), tflite_path))
+    for precision in QUANTIZED_PRECISIONS:
+        path = quantized_path(tflite_path, precision)
+        if path.exists():
+            variants.append((precision, TFLiteBackend(path, spec["input_shape"], [1, 8]), path))
+
+    print(f"\n{name} model, {len(samples)} evaluation samples")
+    print(
+        f"{'variant':<22} {'top-1 agree':>11} {'max |dp|':>9} {'mean |dp|':>9} "
+        f"{'bs=1 ms':>8} {'bs=8 ms':>8} {'size MB':>8}"
+    )
+    for label, backend, path in variants:
+        actual = backend.predict(samples)
+        delta = np.abs(actual - expected)
+        agreement = float(np.mean(actual.argmax(axis=1) == expected.argmax(axis=1)))
+        size = f"{Path(path).stat().st_size / 1e6:8.2f}" if path and Path(path).exists() else f"{'-':>8}"
+        print(
+            f"{label:<22} {agreement:>11.1%} {delta.max():>9.4f} {delta.mean():>9.5f} "
+            f"{latency_ms(backend, samples, 1, repeats):>8.2f} {latency_ms(backend, samples, 8, repeats):>8.2f} {size}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", nargs="+", choices=sorted(MODELS), default=sorted(MODELS))
+    parser.add_argument("--samples-dir", nargs="*", type=Path, default=None)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    for name in args.model:
+        report(name, model_samples(name, args.samples_dir), args.repeats)
+
+
+if __name__ == "__main__":
+    main()
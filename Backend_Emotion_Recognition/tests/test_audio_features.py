@@ -0,0 +1,114 @@
+"""Parity of the shared-STFT audio features with the librosa training pipeline.
+
+AudioFeatureExtractor.extract and StreamingFeatureExtractor.extract must give
+the vector of extract_features_librosa (ZCR | RMS | MFCC) within per-block
+tolerances, on synthetic clips including ones shorter than one STFT frame.
+"""
+import warnings
+
+import numpy as np
+import pytest
+
+pytest.importorskip("librosa")
+
+from app.services.audio_features import AudioFeatureExtractor, StreamingFeatureExtractor  # noqa: E402
+from app.services.audio_service import extract_features_librosa  # noqa: E402
+
+SR = 22050
+N_MFCC = 20
+HOP = 512
+# Absolute tolerance per block (MFCCs are in dB, values up to ~600)
+TOLERANCE = {"zcr": 1e-6, "rms": 1e-5, "mfcc": 1e-2}
+
+
+def synthetic_clips():
+    rng = np.random.default_rng(0)
+    n = int(SR * 2.5)
+    t = np.arange(n) / SR
+    voiced = sum(np.sin(2 * np.pi * f0 * t) / k for k, f0 in enumerate((140, 280, 420, 1100), start=1))
+    voiced = 0.2 * voiced * (0.5 + 0.5 * np.sin(2 * np.pi * 3 * t)) + 0.01 * rng.standard_normal(n)
+    burst = np.zeros(n)
+    burst[n // 3:n // 3 + 4000] = 0.5 * rng.standard_normal(4000)
+    return {
+        "voiced+noise": voiced,
+        "silence+burst": burst,
+        "silence": np.zeros(n),
+        "clipped square": np.clip(np.sign(np.sin(2 * np.pi * 220 * t)) * 1.5, -1, 1),
+        "odd length": voiced[:n - 77],
+        # Shorter than one 2048-sample frame
+        "short 1500": voiced[:1500],
+        "short 300": voiced[:300],
+        "one hop": voiced[:HOP],
+    }
+
+
+def reference(data: np.ndarray) -> np.ndarray:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # "n_fft=2048 is too large" for sub-frame clips
+        return extract_features_librosa(data, sr=SR, n_mfcc=N_MFCC)
+
+
+def assert_blocks_close(actual: np.ndarray, expected: np.ndarray, n_frames: int):
+    assert actual.shape == expected.shape
+    bounds = {"zcr": (0, n_frames), "rms": (n_frames, 2 * n_frames), "mfcc": (2 * n_frames, None)}
+    for block, (start, end) in bounds.items():
+        delta = np.abs(actual[start:end] - expected[start:end]).max()
+        assert delta <= TOLERANCE[block], f"{block}: max |delta| {delta:.3g} > {TOLERANCE[block]}"
+
+
+@pytest.fixture(scope="module")
+def extractor():
+    return AudioFeatureExtractor(SR, N_MFCC, 2048, HOP)
+
+
+@pytest.mark.parametrize("name", list(synthetic_clips()))
+def test_extract_matches_librosa(extractor, name):
+    data = synthetic_clips()[name]
+    assert_blocks_close(extractor.extract(data), reference(data), extractor.n_frames(data.shape[0]))
+
+
+@pytest.mark.parametrize("size", [2376, 500, 10000])
+def test_extract_size_truncates_or_pads(extractor, size):
+    data = synthetic_clips()["voiced+noise"]
+    expected = np.zeros(size)
+    natural = reference(data)[:size]
+    expected[:natural.shape[0]] = natural
+    out = np.full(size, np.nan)
+    result = extractor.extract(data, size=size, out=out)
+    assert result is out
+    assert np.abs(result - expected).max() <= TOLERANCE["mfcc"]
+    assert not np.isnan(result).any()
+
+
+def test_extract_rejects_empty(extractor):
+    with pytest.raises(ValueError):
+        extractor.extract(np.zeros(0))
+
+
+def test_streaming_windows_match(extractor):
+    window = int(SR * 2.5)
+    hop = 43 * HOP  # ~1 s, whole STFT hops as /audio/stream uses
+    rng = np.random.default_rng(1)
+    stream = np.concatenate([synthetic_clips()["voiced+noise"], 0.1 * rng.standard_normal(window)])
+    streaming = StreamingFeatureExtractor(extractor, window)
+    n_frames = extractor.n_frames(window)
+
+    for start in range(0, stream.shape[0] - window + 1, hop):
+        data = stream[start:start + window]
+        actual = streaming.extract(start, data)
+        np.testing.assert_allclose(actual, extractor.extract(data), rtol=0, atol=1e-9)
+        assert_blocks_close(actual, reference(data), n_frames)
+    assert streaming.frames_reused > 0
+    # Only one window of frames is cached
+    assert len(streaming._cache) <= n_frames
+
+
+@pytest.mark.parametrize("start, length", [(100, int(SR * 2.5)), (0, 1500), (HOP, 3000)])
+def test_streaming_unaligned_or_partial_window(extractor, start, length):
+    """Unaligned starts and flushed partial windows fall back to a full extraction."""
+    window = int(SR * 2.5)
+    streaming = StreamingFeatureExtractor(extractor, window)
+    data = synthetic_clips()["voiced+noise"][:length]
+    actual = streaming.extract(start, data, size=2376)
+    np.testing.assert_allclose(actual, extractor.extract(data, size=2376), rtol=0, atol=1e-9)
+    assert streaming.frames_reused == 0
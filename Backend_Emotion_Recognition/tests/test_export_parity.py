@@ -0,0 +1,66 @@
+"""Keras / graph / ONNX / TFLite parity of app.models.export on toy models.
+
+Each toy model has the real model's input shape (check_parity feeds it the
+same fixed batch as ``python -m app.models.export``) but only a few weights,
+so exporting takes seconds. ONNX cases are skipped without onnxruntime /
+tf2onnx, TFLite cases without an interpreter.
+"""
+import pytest
+
+tf = pytest.importorskip("tensorflow")
+
+from app.models.export import MODELS, check_parity, export_onnx, export_tflite  # noqa: E402
+from app.models.inference_backend import GraphBackend, OnnxBackend, TFLiteBackend, _tflite_interpreter_class  # noqa: E402
+
+TOLERANCE = 1e-4
+
+
+def toy_model(name: str):
+    """A few conv weights + softmax over 7 emotions, same input shape as the real model."""
+    tf.keras.utils.set_random_seed(0)
+    input_shape = MODELS[name]["input_shape"]
+    if name == "face":
+        layers = [
+            tf.keras.layers.Rescaling(1.0 / 255),
+            tf.keras.layers.Conv2D(4, 3, strides=4, activation="relu"),
+            tf.keras.layers.GlobalAveragePooling2D(),
+        ]
+    else:
+        layers = [
+            tf.keras.layers.Conv1D(4, 5, strides=8, activation="relu"),
+            tf.keras.layers.GlobalAveragePooling1D(),
+        ]
+    return tf.keras.Sequential(
+        [tf.keras.Input(shape=input_shape), *layers, tf.keras.layers.Dense(7, activation="softmax")]
+    )
+
+
+@pytest.fixture(scope="module", params=sorted(MODELS))
+def model(request):
+    return request.param, toy_model(request.param)
+
+
+def test_graph_backend_parity(model):
+    name, keras_model = model
+    backend = GraphBackend(keras_model, MODELS[name]["input_shape"])
+    assert check_parity(name, keras_model, backend, TOLERANCE)
+
+
+def test_onnx_parity(model, tmp_path):
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("tf2onnx")
+    name, keras_model = model
+    path = export_onnx(keras_model, MODELS[name]["input_shape"], tmp_path / f"{name}.onnx")
+    backend = OnnxBackend(path, MODELS[name]["input_shape"])
+    assert check_parity(name, keras_model, backend, TOLERANCE)
+
+
+def test_tflite_parity(model, tmp_path):
+    try:
+        _tflite_interpreter_class()
+    except RuntimeError as e:
+        pytest.skip(str(e))
+    name, keras_model = model
+    path = export_tflite(keras_model, MODELS[name]["input_shape"], tmp_path / f"{name}.tflite")
+    backend = TFLiteBackend(path, MODELS[name]["input_shape"])
+    assert check_parity(name, keras_model, backend, TOLERANCE)
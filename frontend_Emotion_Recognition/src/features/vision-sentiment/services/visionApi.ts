@@ -31,6 +31,21 @@ export type FaceBatchPredictResponse = {
   results: FacePredictResponse[];
 };
 
+export type AnalyzedFace = {
+  face_id: number;
+  location: FaceLocation;
+  emotion: string;
+  confidence: number;
+  all_emotions: Record<string, number>;
+};
+
+export type FaceAnalyzeResponse = {
+  faces: AnalyzedFace[];
+  total_faces: number;
+  image_width: number;
+  image_height: number;
+};
+
 const BASE = import.meta.env.VITE_API_BASE || "http://localhost:8000";
 
 /**
@@ -132,8 +147,80 @@ export const predictEmotionBatch = async (
   return await res.json();
 };
 
+/**
+ * Detect all faces and predict their emotions in a single request
+ * (replaces detect + crop + predict-batch for realtime frames)
+ */
+export const analyzeFacesFromBlob = async (
+  blob: Blob
+): Promise<FaceAnalyzeResponse> => {
+  const fd = new FormData();
+  fd.append("file", blob, "frame.jpg");
+
+  const res = await fetch(`${BASE}/face/analyze`, {
+    method: "POST",
+    body: fd,
+  });
+
+  if (!res.ok) {
+    const txt = await res.text().catch(() => "");
+    throw new Error(`Analyze faces failed: ${res.status} ${res.statusText} ${txt}`);
+  }
+
+  return await res.json();
+};
+
+export type FaceStreamResult = FaceAnalyzeResponse & {
+  type: "result";
+  frame_id: number;
+  lag_ms: number;
+  frames_dropped: number;
+};
+
+export type FaceStreamHandle = {
+  sendFrame: (frame: Blob | ArrayBuffer) => void;
+  requestStats: () => void;
+  close: () => void;
+};
+
+/**
+ * Open a /face/stream WebSocket for realtime webcam analysis.
+ * Frames can be sent as fast as the camera produces them: the server only
+ * analyzes the newest one and pushes results back through onResult.
+ */
+export const openFaceStream = (
+  onResult: (result: FaceStreamResult) => void,
+  onMessage?: (message: Record<string, unknown>) => void
+): FaceStreamHandle => {
+  const url = new URL(`${BASE}/face/stream`);
+  url.protocol = url.protocol === "https:" ? "wss:" : "ws:";
+  const ws = new WebSocket(url.toString());
+  ws.binaryType = "arraybuffer";
+
+  ws.onmessage = (event) => {
+    const message = JSON.parse(event.data);
+    if (message.type === "result") {
+      onResult(message as FaceStreamResult);
+    } else {
+      onMessage?.(message);
+    }
+  };
+
+  return {
+    sendFrame: (frame) => {
+      if (ws.readyState === WebSocket.OPEN) ws.send(frame);
+    },
+    requestStats: () => {
+      if (ws.readyState === WebSocket.OPEN) ws.send(JSON.stringify({ type: "stats" }));
+    },
+    close: () => ws.close(),
+  };
+};
+
 export default { 
   detectFacesFromBlob,
+  analyzeFacesFromBlob,
+  openFaceStream,
   detectFacesFromDataUrl,
   predictEmotionFromCroppedFace,
   predictEmotionBatch